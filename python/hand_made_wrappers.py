@@ -10,11 +10,14 @@ WRAPPER_DEFINITION_RVector3=\
 """
 #include <numpy/arrayobject.h>
 
-PyObject * RVector3_getArray(GIMLI::RVector3 & vec){
+PyObject * RVector3_getArray(boost::python::object pyVec){
     import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    GIMLI::RVector3 & vec = boost::python::extract< GIMLI::RVector3 & >(pyVec);
     npy_intp length = 3;
     PyObject * ret = PyArray_SimpleNewFromData(1, &length, NPY_DOUBLE, &vec[0]);
-    //Py_DECREF(ret);
+    // the array is a view, so it has to keep the RVector3 alive
+    Py_INCREF(pyVec.ptr());
+    PyArray_SetBaseObject((PyArrayObject *)ret, pyVec.ptr());
     return ret;
 }
 
@@ -35,13 +38,15 @@ boost::python::tuple RVector_getData(GIMLI::RVector & vec){
     return boost::python::make_tuple( "none", 0 ); 
 }
 
-PyObject * RVector_getArray(GIMLI::RVector & vec){
+PyObject * RVector_getArray(boost::python::object pyVec){
     import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    GIMLI::RVector & vec = boost::python::extract< GIMLI::RVector & >(pyVec);
     npy_intp length = vec.size();
-    PyObject * ret = PyArray_SimpleNewFromData(1, &length, NPY_DOUBLE, &vec[0]);
-    //PyArray_XINCREF(ret);
-    Py_INCREF(ret); // das scheint ignoriert zu werden darum muessen wir aussen noch kopieren
-    //Py_DECREF(ret);
+    PyObject * ret = PyArray_SimpleNewFromData(1, &length, NPY_DOUBLE,
+                                               length ? &vec[0] : NULL);
+    // the array is a view, so it has to keep the RVector alive
+    Py_INCREF(pyVec.ptr());
+    PyArray_SetBaseObject((PyArrayObject *)ret, pyVec.ptr());
     return ret;
 }
 
@@ -51,7 +56,487 @@ WRAPPER_REGISTRATION_RVector = [
                 "PyGIMLI Helper Function: extract an python object from a RVector ");""",
 """def("array",
        &RVector_getArray, 
-       "PyGIMLI Helper Function: extract a numpy array object from a RVector ");""",
+       "PyGIMLI Helper Function: numpy array view (no copy) of a RVector ");""",
+]
+
+WRAPPER_DEFINITION_Vector_Template=\
+"""
+#include <numpy/arrayobject.h>
+
+PyObject * %(name)s_getArray(boost::python::object pyVec){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    GIMLI::%(name)s & vec = boost::python::extract< GIMLI::%(name)s & >(pyVec);
+    npy_intp length = vec.size();
+    PyObject * ret = PyArray_SimpleNewFromData(1, &length, %(npyType)s,
+                                               length ? &vec[0] : NULL);
+    // the array is a view, so it has to keep the vector alive
+    Py_INCREF(pyVec.ptr());
+    PyArray_SetBaseObject((PyArrayObject *)ret, pyVec.ptr());
+    return ret;
+}
+
+"""
+WRAPPER_REGISTRATION_Vector_Template = [
+"""def("array",
+       &%(name)s_getArray,
+       "PyGIMLI Helper Function: numpy array view (no copy) of a %(name)s ");""",
+]
+
+# further vector types with numpy array views:
+# (typedef, numpy type). The class is looked up through the typedef, since
+# e.g. IVector = Vector<SIndex> is Vector<long> or Vector<long long>, while
+# Vector<int> is instantiated separately (pygimli.h).
+NUMPY_VECTOR_TYPES = [
+    ('CVector', 'NPY_CDOUBLE'),
+    ('IVector', 'NPY_INTP'),
+    ('BVector', 'NPY_BOOL'),
+]
+
+
+def typedefClass(mb, name):
+    """Class declaration of the typedef name or None."""
+    from pygccxml import declarations
+
+    tds = mb.global_ns.typedefs(name, allow_empty=True)
+    if len(tds) == 0:
+        return None
+    t = getattr(tds[0], 'decl_type', None) or tds[0].type
+    return declarations.class_traits.get_declaration(
+        declarations.remove_alias(t))
+
+WRAPPER_DEFINITION_Matrix_Template=\
+"""
+#include <numpy/arrayobject.h>
+#include <stdexcept>
+
+// 1d index array with all values in [0, size). On failure the array and
+// release (an already converted index array or NULL) are freed.
+PyArrayObject * %(name)s_indexArray(PyObject * obj, npy_intp size,
+                                    PyArrayObject * release){
+    PyArrayObject * ret = (PyArrayObject *)PyArray_FROMANY(obj, NPY_INTP, 1, 1,
+                                                           NPY_ARRAY_CARRAY);
+    if (!ret) {
+        PyErr_Clear();
+        Py_XDECREF(release);
+        throw std::invalid_argument("%(name)s: index needs to be a 1d integer array");
+    }
+    const npy_intp * idx = (const npy_intp *)PyArray_DATA(ret);
+    for (npy_intp i = 0; i < PyArray_DIM(ret, 0); i ++){
+        if (idx[i] < 0 || idx[i] >= size){
+            Py_DECREF(ret);
+            Py_XDECREF(release);
+            throw std::out_of_range("%(name)s: index out of range");
+        }
+    }
+    return ret;
+}
+
+PyObject * %(name)s_getSubArray(GIMLI::%(name)s & mat,
+                                PyObject * rowIdx, PyObject * colIdx){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    PyArrayObject * r = %(name)s_indexArray(rowIdx, (npy_intp)mat.rows(), NULL);
+    PyArrayObject * c = %(name)s_indexArray(colIdx, (npy_intp)mat.cols(), r);
+    npy_intp nr = PyArray_DIM(r, 0);
+    npy_intp nc = PyArray_DIM(c, 0);
+    const npy_intp * ri = (const npy_intp *)PyArray_DATA(r);
+    const npy_intp * ci = (const npy_intp *)PyArray_DATA(c);
+
+    npy_intp dims[2] = {nr, nc};
+    PyObject * ret = PyArray_SimpleNew(2, dims, %(npyType)s);
+    if (!ret) {
+        Py_DECREF(r);
+        Py_DECREF(c);
+        boost::python::throw_error_already_set();
+    }
+    %(valueType)s * data = (%(valueType)s *)PyArray_DATA((PyArrayObject *)ret);
+
+    for (npy_intp i = 0; i < nr; i ++){
+        const GIMLI::Vector< %(valueType)s > & row = mat[ri[i]];
+        for (npy_intp j = 0; j < nc; j ++) data[i * nc + j] = row[ci[j]];
+    }
+    Py_DECREF(r);
+    Py_DECREF(c);
+    return ret;
+}
+
+PyObject * %(name)s_getArray(GIMLI::%(name)s & mat){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    npy_intp dims[2] = {(npy_intp)mat.rows(), (npy_intp)mat.cols()};
+    PyObject * ret = PyArray_SimpleNew(2, dims, %(npyType)s);
+    %(valueType)s * data = (%(valueType)s *)PyArray_DATA((PyArrayObject *)ret);
+
+    for (GIMLI::Index i = 0; i < mat.rows(); i ++){
+        const GIMLI::Vector< %(valueType)s > & row = mat[i];
+        std::copy(row.begin().ptr(), row.begin().ptr() + dims[1],
+                  data + i * dims[1]);
+    }
+    return ret;
+}
+
+bool %(name)s_setSubArray(GIMLI::%(name)s & mat,
+                          PyObject * rowIdx, PyObject * colIdx, PyObject * obj){
+    import_array1(false);
+    PyArrayObject * r = %(name)s_indexArray(rowIdx, (npy_intp)mat.rows(), NULL);
+    PyArrayObject * c = %(name)s_indexArray(colIdx, (npy_intp)mat.cols(), r);
+    PyArrayObject * a = (PyArrayObject *)PyArray_FROMANY(obj, %(npyType)s, 2, 2,
+                                                         NPY_ARRAY_CARRAY);
+    if (!a || PyArray_DIM(a, 0) != PyArray_DIM(r, 0)
+           || PyArray_DIM(a, 1) != PyArray_DIM(c, 0)){
+        PyErr_Clear();
+        Py_XDECREF(a);
+        Py_DECREF(r);
+        Py_DECREF(c);
+        throw std::invalid_argument("%(name)s: values need the shape of the index");
+    }
+    npy_intp nr = PyArray_DIM(r, 0);
+    npy_intp nc = PyArray_DIM(c, 0);
+    const npy_intp * ri = (const npy_intp *)PyArray_DATA(r);
+    const npy_intp * ci = (const npy_intp *)PyArray_DATA(c);
+    const %(valueType)s * data = (const %(valueType)s *)PyArray_DATA(a);
+
+    for (npy_intp i = 0; i < nr; i ++){
+        GIMLI::Vector< %(valueType)s > & row = mat.rowR(ri[i]);
+        for (npy_intp j = 0; j < nc; j ++) row[ci[j]] = data[i * nc + j];
+    }
+    Py_DECREF(a);
+    Py_DECREF(r);
+    Py_DECREF(c);
+    return true;
+}
+
+bool %(name)s_setArray(GIMLI::%(name)s & mat, PyObject * obj){
+    import_array1(false);
+    PyArrayObject * a = (PyArrayObject *)PyArray_FROMANY(obj, %(npyType)s, 2, 2,
+                                                         NPY_ARRAY_CARRAY);
+    if (!a) {
+        PyErr_Clear();
+        throw std::invalid_argument("%(name)s: setArray needs a 2d array");
+    }
+    npy_intp nr = PyArray_DIM(a, 0);
+    npy_intp nc = PyArray_DIM(a, 1);
+    const %(valueType)s * data = (const %(valueType)s *)PyArray_DATA(a);
+
+    mat.resize(nr, nc);
+    for (npy_intp i = 0; i < nr; i ++){
+        GIMLI::Vector< %(valueType)s > & row = mat.rowR(i);
+        std::copy(data + i * nc, data + (i + 1) * nc, row.begin().ptr());
+    }
+    Py_DECREF(a);
+    return true;
+}
+
+"""
+WRAPPER_REGISTRATION_Matrix_Template = [
+"""def("array", &%(name)s_getArray,
+       "PyGIMLI Helper Function: numpy array (bulk copy) of a %(name)s ");""",
+"""def("subArray", &%(name)s_getSubArray,
+       "PyGIMLI Helper Function: numpy array (bulk copy) of the rows and columns given by two index arrays");""",
+"""def("setArray", &%(name)s_setArray,
+       "PyGIMLI Helper Function: resize and fill %(name)s from a 2d numpy array");""",
+"""def("setSubArray", &%(name)s_setSubArray,
+       "PyGIMLI Helper Function: fill the rows and columns given by two index arrays from a 2d numpy array");""",
+]
+
+# matrix types with bulk numpy copies:
+# (class name, typedef, numpy type, value type)
+NUMPY_MATRIX_TYPES = [
+    ('Matrix<double>', 'RMatrix', 'NPY_DOUBLE', 'double'),
+    ('Matrix<std::complex<double> >', 'CMatrix', 'NPY_CDOUBLE',
+     'std::complex<double>'),
+]
+
+WRAPPER_DEFINITION_SparseMatrix_Template=\
+"""
+#include <numpy/arrayobject.h>
+#include <stdexcept>
+
+PyObject * %(name)s_viewArray(boost::python::object pyMat, void * data,
+                              npy_intp length, int npyType){
+    PyObject * ret = PyArray_SimpleNewFromData(1, &length, npyType,
+                                               length ? data : NULL);
+    // the array is a view, so it has to keep the matrix alive
+    Py_INCREF(pyMat.ptr());
+    PyArray_SetBaseObject((PyArrayObject *)ret, pyMat.ptr());
+    return ret;
+}
+
+PyObject * %(name)s_colPtrArray(boost::python::object pyMat){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    GIMLI::%(name)s & mat = boost::python::extract< GIMLI::%(name)s & >(pyMat);
+    const std::vector < int > & v = mat.vecColPtr();
+    return %(name)s_viewArray(pyMat, (void*)(v.size() ? &v[0] : NULL),
+                              v.size(), NPY_INT);
+}
+
+PyObject * %(name)s_rowIdxArray(boost::python::object pyMat){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    GIMLI::%(name)s & mat = boost::python::extract< GIMLI::%(name)s & >(pyMat);
+    const std::vector < int > & v = mat.vecRowIdx();
+    return %(name)s_viewArray(pyMat, (void*)(v.size() ? &v[0] : NULL),
+                              v.size(), NPY_INT);
+}
+
+PyObject * %(name)s_valsArray(boost::python::object pyMat){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    GIMLI::%(name)s & mat = boost::python::extract< GIMLI::%(name)s & >(pyMat);
+    GIMLI::Vector< %(valueType)s > & v = mat.vecVals();
+    return %(name)s_viewArray(pyMat, (void*)(v.size() ? &v[0] : NULL),
+                              v.size(), %(npyType)s);
+}
+
+bool %(name)s_setArrayData(GIMLI::%(name)s & mat, PyObject * colPtr,
+                           PyObject * rowIdx, PyObject * vals, int stype){
+    import_array1(false);
+    PyArrayObject * c = (PyArrayObject *)PyArray_FROMANY(colPtr, NPY_INT, 1, 1,
+                                                         NPY_ARRAY_CARRAY);
+    PyArrayObject * r = (PyArrayObject *)PyArray_FROMANY(rowIdx, NPY_INT, 1, 1,
+                                                         NPY_ARRAY_CARRAY);
+    PyArrayObject * v = (PyArrayObject *)PyArray_FROMANY(vals, %(npyType)s, 1, 1,
+                                                         NPY_ARRAY_CARRAY);
+    if (!c || !r || !v || PyArray_DIM(r, 0) != PyArray_DIM(v, 0)){
+        PyErr_Clear();
+        Py_XDECREF(c);
+        Py_XDECREF(r);
+        Py_XDECREF(v);
+        throw std::invalid_argument("%(name)s: setArrayData needs 1d arrays with len(rowIdx) == len(vals)");
+    }
+    const int * cp = (const int *)PyArray_DATA(c);
+    const int * rp = (const int *)PyArray_DATA(r);
+    const %(valueType)s * vp = (const %(valueType)s *)PyArray_DATA(v);
+    npy_intp nc = PyArray_DIM(c, 0);
+    npy_intp nv = PyArray_DIM(v, 0);
+
+    std::vector < int > colVec(cp, cp + nc);
+    std::vector < int > rowVec(rp, rp + nv);
+    GIMLI::Vector< %(valueType)s > valVec(nv);
+    std::copy(vp, vp + nv, valVec.begin().ptr());
+
+    Py_DECREF(c);
+    Py_DECREF(r);
+    Py_DECREF(v);
+
+    // setArrays checks colPtr and the row indices before anything is changed
+    try {
+        mat.setArrays(colVec, rowVec, valVec, stype);
+    } catch (std::length_error & e){
+        throw std::invalid_argument(e.what());
+    }
+    return true;
+}
+
+"""
+WRAPPER_REGISTRATION_SparseMatrix_Template = [
+"""def("colPtrArray", &%(name)s_colPtrArray,
+       "PyGIMLI Helper Function: numpy array view (no copy) of vecColPtr ");""",
+"""def("rowIdxArray", &%(name)s_rowIdxArray,
+       "PyGIMLI Helper Function: numpy array view (no copy) of vecRowIdx ");""",
+"""def("valsArray", &%(name)s_valsArray,
+       "PyGIMLI Helper Function: numpy array view (no copy) of vecVals ");""",
+"""def("setArrayData", &%(name)s_setArrayData,
+       "PyGIMLI Helper Function: set colPtr, rowIdx, vals and stype from numpy arrays at once");""",
+]
+
+# sparse matrix types with numpy array views:
+# (class name, typedef, numpy type, value type)
+NUMPY_SPARSEMATRIX_TYPES = [
+    ('SparseMatrix<double>', 'RSparseMatrix', 'NPY_DOUBLE', 'double'),
+    ('SparseMatrix<std::complex<double> >', 'CSparseMatrix', 'NPY_CDOUBLE',
+     'std::complex<double>'),
+]
+
+WRAPPER_DEFINITION_SparseMapMatrix_Template=\
+"""
+#include <numpy/arrayobject.h>
+#include <stdexcept>
+
+bool %(name)s_addArrayData(GIMLI::%(name)s & mat, PyObject * rowIdx,
+                           PyObject * colIdx, PyObject * vals){
+    import_array1(false);
+    PyArrayObject * r = (PyArrayObject *)PyArray_FROMANY(rowIdx, NPY_INTP, 1, 1,
+                                                         NPY_ARRAY_CARRAY);
+    PyArrayObject * c = (PyArrayObject *)PyArray_FROMANY(colIdx, NPY_INTP, 1, 1,
+                                                         NPY_ARRAY_CARRAY);
+    PyArrayObject * v = (PyArrayObject *)PyArray_FROMANY(vals, %(npyType)s, 1, 1,
+                                                         NPY_ARRAY_CARRAY);
+    if (!r || !c || !v || PyArray_DIM(c, 0) != PyArray_DIM(r, 0)
+                       || PyArray_DIM(v, 0) != PyArray_DIM(r, 0)){
+        PyErr_Clear();
+        Py_XDECREF(r);
+        Py_XDECREF(c);
+        Py_XDECREF(v);
+        throw std::invalid_argument("%(name)s: addArrayData needs 1d arrays of equal length");
+    }
+    npy_intp n = PyArray_DIM(v, 0);
+    const npy_intp * ri = (const npy_intp *)PyArray_DATA(r);
+    const npy_intp * ci = (const npy_intp *)PyArray_DATA(c);
+    const %(valueType)s * vp = (const %(valueType)s *)PyArray_DATA(v);
+
+    npy_intp i = 0;
+    for (; i < n; i ++){
+        if (ri[i] < 0 || ri[i] >= (npy_intp)mat.rows() ||
+            ci[i] < 0 || ci[i] >= (npy_intp)mat.cols()) break;
+        mat.addVal(ri[i], ci[i], vp[i]);
+    }
+    Py_DECREF(r);
+    Py_DECREF(c);
+    Py_DECREF(v);
+    if (i < n){
+        throw std::out_of_range("%(name)s: addArrayData index out of range");
+    }
+    return true;
+}
+
+"""
+WRAPPER_REGISTRATION_SparseMapMatrix_Template = [
+"""def("addArrayData", &%(name)s_addArrayData,
+       "PyGIMLI Helper Function: add the values of the (row, col, val) numpy arrays, duplicates are summed up");""",
+]
+
+# sparse map matrix types with bulk numpy import:
+# (class name, typedef, numpy type, value type)
+NUMPY_SPARSEMAPMATRIX_TYPES = [
+    ('SparseMapMatrix<double, unsigned long>', 'RSparseMapMatrix',
+     'NPY_DOUBLE', 'double'),
+]
+
+WRAPPER_DEFINITION_Mesh=\
+"""
+#include <numpy/arrayobject.h>
+#include <stdexcept>
+
+struct Mesh_PyArray{
+    // owns the reference of a numpy array, NULL for None
+    Mesh_PyArray(PyObject * obj, int npyType, int nd, const char * name){
+        a = NULL;
+        if (obj == Py_None) return;
+        a = (PyArrayObject *)PyArray_FROMANY(obj, npyType, nd, nd,
+                                             NPY_ARRAY_CARRAY | NPY_ARRAY_FORCECAST);
+        if (!a) {
+            PyErr_Clear();
+            throw std::invalid_argument(std::string("Mesh: ") + name +
+                " needs to be a " + GIMLI::str(nd) + "d array or None");
+        }
+    }
+    ~Mesh_PyArray(){ Py_XDECREF(a); }
+
+    npy_intp dim(int i) const { return a ? PyArray_DIM(a, i) : 0; }
+
+    PyArrayObject * a;
+};
+
+GIMLI::IVector Mesh_markers(const Mesh_PyArray & m){
+    GIMLI::IVector ret(m.dim(0));
+    const int * p = m.a ? (const int *)PyArray_DATA(m.a) : NULL;
+    for (npy_intp i = 0; i < m.dim(0); i ++) ret[i] = p[i];
+    return ret;
+}
+
+GIMLI::IndexArray Mesh_ids(const Mesh_PyArray & m, GIMLI::Index nodeCount){
+    GIMLI::IndexArray ret(m.dim(0) * m.dim(1));
+    const npy_intp * p = m.a ? (const npy_intp *)PyArray_DATA(m.a) : NULL;
+    // -1 becomes Index(-1) and is skipped by createCells/createBoundaries
+    for (GIMLI::Index i = 0; i < ret.size(); i ++){
+        if (p[i] < -1 || p[i] >= (npy_intp)nodeCount){
+            throw std::out_of_range("Mesh: invalid node id " + GIMLI::str(p[i]) +
+                " (range: -1.." + GIMLI::str(nodeCount) + ")");
+        }
+        ret[i] = GIMLI::Index(p[i]);
+    }
+    return ret;
+}
+
+bool Mesh_createFromArrays(GIMLI::Mesh & mesh, PyObject * nodes,
+                           PyObject * cells, PyObject * cellMarkers,
+                           PyObject * boundaries, PyObject * boundaryMarkers,
+                           PyObject * nodeMarkers){
+    import_array1(false);
+    Mesh_PyArray n(nodes, NPY_DOUBLE, 2, "nodes");
+    Mesh_PyArray nm(nodeMarkers, NPY_INT, 1, "nodeMarkers");
+    Mesh_PyArray c(cells, NPY_INTP, 2, "cells");
+    Mesh_PyArray cm(cellMarkers, NPY_INT, 1, "cellMarkers");
+    Mesh_PyArray b(boundaries, NPY_INTP, 2, "boundaries");
+    Mesh_PyArray bm(boundaryMarkers, NPY_INT, 1, "boundaryMarkers");
+
+    if (n.a){
+        if (n.dim(1) != 3){
+            throw std::invalid_argument("Mesh: nodes need to be a (N, 3) array");
+        }
+        const double * p = (const double *)PyArray_DATA(n.a);
+        GIMLI::RVector x(n.dim(0)), y(n.dim(0)), z(n.dim(0));
+        for (npy_intp i = 0; i < n.dim(0); i ++){
+            x[i] = p[3 * i]; y[i] = p[3 * i + 1]; z[i] = p[3 * i + 2];
+        }
+        mesh.createNodes(x, y, z, Mesh_markers(nm));
+    }
+    if (c.a) mesh.createCells(Mesh_ids(c, mesh.nodeCount()), c.dim(1),
+                              Mesh_markers(cm));
+
+    if (b.a){
+        // boundaries of the cells already exist and only get the marker
+        if (mesh.cellCount()) mesh.createNeighbourInfos();
+        mesh.createBoundaries(Mesh_ids(b, mesh.nodeCount()), b.dim(1),
+                              Mesh_markers(bm));
+    }
+    return true;
+}
+
+PyObject * Mesh_posArray(const std::vector < GIMLI::RVector3 > & pos){
+    npy_intp dims[2] = {(npy_intp)pos.size(), 3};
+    PyObject * ret = PyArray_SimpleNew(2, dims, NPY_DOUBLE);
+    double * p = (double *)PyArray_DATA((PyArrayObject *)ret);
+    for (GIMLI::Index i = 0; i < pos.size(); i ++){
+        p[3 * i] = pos[i][0]; p[3 * i + 1] = pos[i][1]; p[3 * i + 2] = pos[i][2];
+    }
+    return ret;
+}
+
+PyObject * Mesh_positionArray(const GIMLI::Mesh & mesh){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    return Mesh_posArray(mesh.positions());
+}
+
+PyObject * Mesh_cellCenterArray(const GIMLI::Mesh & mesh){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    return Mesh_posArray(mesh.cellCenters());
+}
+
+template < class Entity > PyObject * Mesh_idArray(const std::vector < Entity * > & e){
+    GIMLI::Index nMax = 0;
+    for (GIMLI::Index i = 0; i < e.size(); i ++) nMax = std::max(nMax, (GIMLI::Index)e[i]->nodeCount());
+
+    npy_intp dims[2] = {(npy_intp)e.size(), (npy_intp)nMax};
+    PyObject * ret = PyArray_SimpleNew(2, dims, NPY_INTP);
+    npy_intp * p = (npy_intp *)PyArray_DATA((PyArrayObject *)ret);
+    for (GIMLI::Index i = 0; i < e.size(); i ++){
+        for (GIMLI::Index j = 0; j < nMax; j ++){
+            p[i * nMax + j] = j < e[i]->nodeCount() ? e[i]->node(j).id() : -1;
+        }
+    }
+    return ret;
+}
+
+PyObject * Mesh_cellNodeIdArray(const GIMLI::Mesh & mesh){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    return Mesh_idArray(mesh.cells());
+}
+
+PyObject * Mesh_boundaryNodeIdArray(const GIMLI::Mesh & mesh){
+    import_array2("Cannot import numpy c-api from pygimli hand_make_wrapper2", NULL);
+    return Mesh_idArray(mesh.boundaries());
+}
+
+"""
+WRAPPER_REGISTRATION_Mesh = [
+"""def("createFromArrays", &Mesh_createFromArrays,
+       "PyGIMLI Helper Function: create nodes, cells and boundaries from numpy arrays (nodes, cells, cellMarkers, boundaries, boundaryMarkers, nodeMarkers) at once, None skips an entry");""",
+"""def("positionArray", &Mesh_positionArray,
+       "PyGIMLI Helper Function: (N, 3) numpy array (bulk copy) of all node positions");""",
+"""def("cellCenterArray", &Mesh_cellCenterArray,
+       "PyGIMLI Helper Function: (M, 3) numpy array (bulk copy) of all cell centers");""",
+"""def("cellNodeIdArray", &Mesh_cellNodeIdArray,
+       "PyGIMLI Helper Function: (M, k) numpy array of the node ids of all cells, padded with -1");""",
+"""def("boundaryNodeIdArray", &Mesh_boundaryNodeIdArray,
+       "PyGIMLI Helper Function: (B, k) numpy array of the node ids of all boundaries, padded with -1");""",
 ]
 
 WRAPPER_DEFINITION_General = \
@@ -107,7 +592,56 @@ def apply(mb):
     rt = mb.class_('Vector<double>')
     rt.add_declaration_code(WRAPPER_DEFINITION_RVector)
     apply_reg(rt, WRAPPER_REGISTRATION_RVector)
+
+    for name, npyType in NUMPY_VECTOR_TYPES:
+        rt = typedefClass(mb, name)
+        if rt is None:
+            print("No numpy array view for:", name)
+            continue
+        args = {'name': name, 'npyType': npyType}
+        rt.add_declaration_code(WRAPPER_DEFINITION_Vector_Template % args)
+        apply_reg(rt, [c % args for c in WRAPPER_REGISTRATION_Vector_Template])
+
+    for clsName, name, npyType, valueType in NUMPY_MATRIX_TYPES:
+        cls = mb.classes(lambda c: c.name == clsName, allow_empty=True)
+        if len(cls) == 0:
+            print("No numpy array conversion for:", name)
+            continue
+        rt = cls[0]
+        args = {'name': name, 'npyType': npyType, 'valueType': valueType}
+        rt.add_declaration_code(WRAPPER_DEFINITION_Matrix_Template % args)
+        apply_reg(rt, [c % args for c in WRAPPER_REGISTRATION_Matrix_Template])
+
+    for clsName, name, npyType, valueType in NUMPY_SPARSEMATRIX_TYPES:
+        cls = mb.classes(lambda c: c.name == clsName, allow_empty=True)
+        if len(cls) == 0:
+            print("No numpy array views for:", name)
+            continue
+        rt = cls[0]
+        args = {'name': name, 'npyType': npyType, 'valueType': valueType}
+        rt.add_declaration_code(WRAPPER_DEFINITION_SparseMatrix_Template % args)
+        apply_reg(rt, [c % args for c in
+                       WRAPPER_REGISTRATION_SparseMatrix_Template])
     
+    for clsName, name, npyType, valueType in NUMPY_SPARSEMAPMATRIX_TYPES:
+        cls = mb.classes(lambda c: c.name == clsName, allow_empty=True)
+        if len(cls) == 0:
+            print("No numpy array import for:", name)
+            continue
+        rt = cls[0]
+        args = {'name': name, 'npyType': npyType, 'valueType': valueType}
+        rt.add_declaration_code(WRAPPER_DEFINITION_SparseMapMatrix_Template %
+                                args)
+        apply_reg(rt, [c % args for c in
+                       WRAPPER_REGISTRATION_SparseMapMatrix_Template])
+
+    cls = mb.classes(lambda c: c.name == 'Mesh', allow_empty=True)
+    if len(cls) == 0:
+        print("No numpy array conversion for: Mesh")
+    else:
+        cls[0].add_declaration_code(WRAPPER_DEFINITION_Mesh)
+        apply_reg(cls[0], WRAPPER_REGISTRATION_Mesh)
+
     try:
         rt = mb.class_('Pos<double>')
         rt.add_declaration_code(WRAPPER_DEFINITION_RVector3)
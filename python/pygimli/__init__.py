@@ -23,6 +23,9 @@ except ImportError:
     pass
 
 import sys
+import importlib
+
+import numpy as np
 
 if sys.platform == 'win32':
     os.environ['PATH'] = __path__[0] + ';' + os.environ['PATH']
@@ -41,6 +44,9 @@ import locale
 def checkAndFixLocaleDecimal_point(verbose=False):
     """
     """
+    if locale.localeconv()['decimal_point'] == '.':
+        return
+
     if locale.localeconv()['decimal_point'] == ',':
         if verbose:
             print("Found locale decimal_point ',' "
@@ -64,13 +70,48 @@ checkAndFixLocaleDecimal_point(verbose=True)
 
 ############################
 ###  Global shortcutes #####
+# Submodules and matplotlib are imported on first use only, so a plain
+# 'import pygimli' stays cheap. See tests/testImportTime.py.
 _pygimli_.load = None
-from pygimli.ioutils import load
-from pygimli.viewer import show, showLater, plt
+
+__lazySubmodules__ = ['curvefit', 'gui', 'importexport', 'ioutils',
+                      'meshtools', 'misc', 'mplviewer', 'physics',
+                      'polytools', 'solver', 'utils', 'viewer']
+
+def __lazyFunction(module, name):
+    """Shortcut to module.name that imports module on the first call."""
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+    call.__name__ = name
+    call.__doc__ = ("Shortcut for :py:func:`" + module + "." + name +
+                    "`. The module is imported on the first call.")
+    return call
+
+load = __lazyFunction('pygimli.ioutils', 'load')
+show = __lazyFunction('pygimli.viewer', 'show')
+showLater = __lazyFunction('pygimli.viewer', 'showLater')
 
 def showNow():
     showLater(0)
 
+def __getattr__(name):
+    """Import submodules, plt and the svn version on first access."""
+    if name in __lazySubmodules__:
+        return importlib.import_module('pygimli.' + name)
+    elif name == 'plt':
+        import matplotlib.pyplot as plt
+        globals()['plt'] = plt
+        return plt
+    elif name == '__version__':
+        globals()['__version__'] = __versionStr__()
+        return globals()['__version__']
+    raise AttributeError("module 'pygimli' has no attribute '" + name + "'")
+
+if sys.version_info < (3, 7):
+    # no module __getattr__ (PEP 562), so keep the former eager imports
+    import pygimli.ioutils
+    from pygimli.viewer import plt
+
 ############################
 
 
@@ -199,98 +240,150 @@ _pygimli_.RVector.__pow__ = __RVectorPower
 ############################
 # Indexing [] operator for RVector, CVector, RVector3, RMatrix, CMatrix
 ############################
+def __vectorFromArray(vecType, arr):
+    """Create a vector of vecType with one bulk copy of the numpy array."""
+    ret = vecType(len(arr))
+    if len(arr):
+        ret.array()[:] = arr
+    return ret
+
+
 def __getVal(self, idx):
     """
-        Hell slow
+        Single values and plain slices are taken natively, strided slices,
+        index lists and numpy integer or boolean arrays are taken from the
+        numpy view of the vector at once.
     """
-    #print("__getVal")
     if isinstance(idx, BVector) or isinstance(idx, IVector):
         return self(idx)
     elif isinstance(idx, stdVectorI) or isinstance(idx, stdVectorUL):
         return self(idx)
-    elif isinstance(idx, list) or hasattr(idx, '__iter__'):
-        raise "TODO Implement with IVector"
-        idxL = _pygimli_.stdVectorUL()
-        for i, ix in enumerate(idx):
-            if type(ix) == int:
-                idxL.append(int(ix))
-            elif ix.dtype == bool:
-                if ix:
-                    idxL.append(i)
-            else:
-                idxL.append(int(ix))
-                
-        return self(idxL)
-
     elif isinstance(idx, slice):
-        if idx.step is None:
-            s = idx.start
-            e = idx.stop
-            if s == None: s = 0
-            if e == None: e = len(self)
-#            print('#'*100, s, e)
-            return self.getVal(int(s), int(e))
-        else:
-            ids = range(idx.start, idx.stop, idx.step)
-            if len(ids):
-                return self(ids)
-            else:
-                raise Exception("slice invalid")
+        s, e, step = idx.indices(len(self))
+        if step == 1:
+            return self.getVal(s, max(s, e))
+        return __vectorFromArray(type(self), self.array()[idx])
+    elif isinstance(idx, list) or hasattr(idx, '__iter__'):
+        return __vectorFromArray(type(self), self.array()[np.asarray(idx)])
 
-    elif idx == -1:
-        idx = len(self) - 1
+    idx = int(idx)
+    if idx < 0:
+        idx += len(self)
 
-    return self.getVal(int(idx))
+    return self.getVal(idx)
 # def __getVal(...)
 
 def __setVal(self, idx, val):
 
     if isinstance(idx, slice):
-        if idx.step is None:
-            self.setVal(float(val), int(idx.start), int(idx.stop))
+        if idx.step is None and not hasattr(val, '__iter__'):
+            s, e, step = idx.indices(len(self))
+            self.setVal(val, s, max(s, e))
             return
         else:
-            "not yet implemented"
+            self.array()[idx] = val
+            return
     elif isinstance(idx, tuple):
         #print(idx, type(idx))
         self.rowR(int(idx[0])).setVal(val, int(idx[1]))
         return
-    
+    elif isinstance(idx, list) or hasattr(idx, '__iter__'):
+        self.array()[np.asarray(idx)] = val
+        return
+
     #print(idx, type(idx))
     self.setVal(val, idx)
 
+def __isIndex(idx):
+    return isinstance(idx, int) or isinstance(idx, np.integer)
+
+def __matrixIndex(n, idx):
+    """Integer index array for row or column index (slice, list, mask)."""
+    if isinstance(idx, slice) and idx == slice(None):
+        return np.arange(n)
+    return np.atleast_1d(np.arange(n)[idx])
+
 def __getValMatrix(self, idx):
+    """
+        A[i] and A[i, j] return a row reference and a value, A[i, cols] and
+        A[rows, j] return vectors. All other (strided, indexed or masked)
+        row and column combinations return a numpy array copied at once.
+        Unlike numpy, index arrays for rows and columns select the whole
+        block A[rows][:, cols].
+    """
+    if isinstance(idx, tuple):
+        rIdx, cIdx = idx
+        if __isIndex(rIdx):
+            return __getValMatrix(self, rIdx).__getitem__(cIdx)
+        elif __isIndex(cIdx):
+            cIdx = int(cIdx)
+            if cIdx < 0:
+                cIdx += self.cols()
+            col = self.col(cIdx)
+            if isinstance(rIdx, slice) and rIdx == slice(None):
+                return col
+            return col[rIdx]
+
+        return self.subArray(__matrixIndex(self.rows(), rIdx),
+                             __matrixIndex(self.cols(), cIdx))
+
+    elif isinstance(idx, slice) or isinstance(idx, list) or \
+            hasattr(idx, '__iter__'):
+        if isinstance(idx, slice) and idx == slice(None):
+            return self.array()
+        return self.subArray(__matrixIndex(self.rows(), idx),
+                             np.arange(self.cols()))
+
+    idx = int(idx)
+    if idx < 0:
+        idx += len(self)
 
-#    print(idx, type(idx))
-    if isinstance(idx, slice):
-        step = idx.step
-        if step is None:
-            step = 1
-        start = idx.start
-        if start is None:
-            start = 0
-        stop = idx.stop
-        if stop is None:
-            stop = len(self)
-
-        return [self.rowR(i) for i in range(start, stop, step)]
+    return self.rowR(idx)
 
-    elif isinstance(idx, tuple):
-        #print(idx, type(idx))
-        if isinstance(idx[0], slice):
-            if isinstance(idx[1], int):
-                tmp = self.__getitem__(idx[0])
-                ret = _pygimli_.RVector(len(tmp))
-                for i, t in enumerate(tmp):
-                    ret[i] = t[idx[1]]
-                return ret
-        else:
-            return self.rowR(int(idx[0])).__getitem__(idx[1])
+def __setValMatrix(self, idx, val):
+    """
+        Set a row, a value or any row and column combination, see
+        __getValMatrix. Values are broadcasted to the shape of the index.
+    """
+    if isinstance(idx, tuple):
+        rIdx, cIdx = idx
+        if __isIndex(rIdx):
+            rIdx = int(rIdx)
+            if rIdx < 0:
+                rIdx += self.rows()
+            if __isIndex(cIdx):
+                cIdx = int(cIdx)
+                if cIdx < 0:
+                    cIdx += self.cols()
+                self.rowR(rIdx).setVal(val, cIdx)
+            else:
+                self.rowR(rIdx)[cIdx] = val
+            return
 
-    if idx == -1:
-        idx = len(self) - 1
+        rows = __matrixIndex(self.rows(), rIdx)
+        cols = __matrixIndex(self.cols(), cIdx)
+    elif isinstance(idx, slice) or isinstance(idx, list) or \
+            hasattr(idx, '__iter__'):
+        rows = __matrixIndex(self.rows(), idx)
+        cols = np.arange(self.cols())
+    else:
+        idx = int(idx)
+        if idx < 0:
+            idx += self.rows()
+        self.setVal(val, idx)
+        return
 
-    return self.rowR(idx)
+    if isinstance(self, _pygimli_.CMatrix):
+        vals = np.empty((len(rows), len(cols)), dtype=complex)
+    else:
+        vals = np.empty((len(rows), len(cols)), dtype=float)
+
+    if isinstance(idx, tuple) and __isIndex(idx[1]):
+        # A[rows, j] = column values
+        vals[:, 0] = val
+    else:
+        vals[:] = val
+    self.setSubArray(rows, cols, vals)
 
 _pygimli_.RVector.__setitem__ = __setVal
 _pygimli_.RVector.__getitem__ = __getVal # very slow -- inline is better
@@ -306,11 +399,11 @@ _pygimli_.IVector.__getitem__ = __getVal # very slow -- inline is better
 
 _pygimli_.RVector3.__setitem__ = __setVal
 
-_pygimli_.RMatrix.__getitem__ = __getValMatrix # very slow -- inline is better
-_pygimli_.RMatrix.__setitem__ = __setVal
+_pygimli_.RMatrix.__getitem__ = __getValMatrix
+_pygimli_.RMatrix.__setitem__ = __setValMatrix
 
-_pygimli_.CMatrix.__getitem__ = __getValMatrix # very slow -- inline is better
-_pygimli_.CMatrix.__setitem__ = __setVal
+_pygimli_.CMatrix.__getitem__ = __getValMatrix
+_pygimli_.CMatrix.__setitem__ = __setValMatrix
 
 
 ############################
@@ -356,10 +449,22 @@ def __VectorIterCall__(self):
     # vectors are collected
     #return _pygimli_.RVectorIter(self.beginPyIter())
 
-_pygimli_.RVector.__iter__ = __VectorIterCall__
-_pygimli_.BVector.__iter__ = __VectorIterCall__
-_pygimli_.IVector.__iter__ = __VectorIterCall__
-_pygimli_.CVector.__iter__ = __VectorIterCall__
+def __VectorArrayIterCall__(self):
+    # iterate the numpy view, i.e., without a call per element
+    return iter(self.array())
+
+def __VectorListIterCall__(self):
+    # python int and bool values, converted at once
+    return iter(self.array().tolist())
+
+for __vecType__, __iterCall__ in [(_pygimli_.RVector, __VectorArrayIterCall__),
+                                  (_pygimli_.CVector, __VectorArrayIterCall__),
+                                  (_pygimli_.BVector, __VectorListIterCall__),
+                                  (_pygimli_.IVector, __VectorListIterCall__)]:
+    if hasattr(__vecType__, 'array'):
+        __vecType__.__iter__ = __iterCall__
+    else:
+        __vecType__.__iter__ = __VectorIterCall__
 
 class DefaultContainerIter:
     def __init__(self, vec):
@@ -403,7 +508,7 @@ _pygimli_.RVector3.__iter__ = __Vector3IterCall__
 
 ########## c to python converter ######
 # default converter from RVector3 to numpy array 
-def __RVector3ArrayCall__(self, idx=None):
+def __RVector3ArrayCall__(self, idx=None, copy=None):
     if idx:
         print(self)
         print(idx)
@@ -411,20 +516,32 @@ def __RVector3ArrayCall__(self, idx=None):
     import numpy as np
     return np.array([self.getVal(0), self.getVal(1), self.getVal(2)])
 
-# default converter from RVector to numpy array 
-def __RVectorArrayCall__(self, idx=None):
-    if idx:
-        print(self)
-        print(idx)
-        raise Exception("we need to fix this")
-    import numpy as np
-    # we need to copy the array until we can handle increasing the reference 
-    # counter in self.array() else it leads to strange behaviour
+# default converter from RVector, CVector, BVector, IVector to numpy array 
+def __RVectorArrayCall__(self, dtype=None, copy=None):
+    # self.array() is a view on the vector data that holds a reference to
+    # the vector, so np.asarray(vec) does not copy. The view points to the
+    # memory of the vector at creation time: after vec.resize() (or any
+    # other reallocation) it dangles, so do not keep it across a resize.
+    # The same holds for vectors returned by reference, e.g.,
+    # np.asarray(S.vecVals()), which do not keep their owner S alive.
+    # np.array(vec) or copy=True (NumPy >= 2) return an independent copy.
     # test in testRValueConverter.py:testNumpyFromRVec()
-    return np.array(self.array())
-    #return self.array()
+    if copy:
+        if dtype is None:
+            return self.array().copy()
+        return self.array().astype(dtype)
+    if dtype is None:
+        return self.array()
+    return self.array().astype(dtype, copy=False)
     
 _pygimli_.RVector.__array__ = __RVectorArrayCall__
+_pygimli_.CVector.__array__ = __RVectorArrayCall__
+_pygimli_.BVector.__array__ = __RVectorArrayCall__
+_pygimli_.IVector.__array__ = __RVectorArrayCall__
+
+# default converter from RMatrix, CMatrix to numpy array (one bulk copy)
+_pygimli_.RMatrix.__array__ = __RVectorArrayCall__
+_pygimli_.CMatrix.__array__ = __RVectorArrayCall__
 _pygimli_.RVector3.__array__ = __RVector3ArrayCall__
 #_pygimli_.RVector3.__array__ = _pygimli_.RVector3.array
 #del _pygimli_.RVector.__array__
@@ -470,10 +587,7 @@ _pygimli_.stdVectorI.__eq__ = __EQ_stdVectorI__
 # usefull stuff
 ############################
 def toIVector(v):
-    ret = _pygimli_.IVector(len(v), 0)
-    for i, r in enumerate(v):
-        ret[i] = int(r)
-    return ret
+    return __vectorFromArray(_pygimli_.IVector, np.asarray(v).astype(int))
         
 
 # DEPRECATED for backward compatibility should be removed
@@ -508,7 +622,11 @@ def __svnversion__(path=__path__[0]):
     (stdout, stderr) = p.communicate()
     return str(stdout)
 
-__version__ = _pygimli_.versionStr() + "_rev" + __svnversion__()
+def __versionStr__():
+    return _pygimli_.versionStr() + "_rev" + __svnversion__()
+
+if sys.version_info < (3, 7):
+    __version__ = __versionStr__()
 
 ###########################
 # unsorted stuff
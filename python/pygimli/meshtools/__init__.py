@@ -13,3 +13,4 @@ This package provides functions for mesh generation and modification.
 
 from .grid import *
 from .mesh import *
+from .adjacency import *
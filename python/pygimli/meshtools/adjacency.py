@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+    Compact mesh topology as integer (CSR) index arrays.
+
+    Algorithms that walk through a mesh, e.g., fast marching or streamlines,
+    can use these arrays instead of calling commonNodes, findBoundary,
+    leftCell/rightCell or findCell through the bindings for every step.
+"""
+
+import hashlib
+
+import numpy as np
+import pygimli as pg
+
+
+def _csr(rows, cols, n):
+    """Compress (rows, cols) pairs into indptr and indices sorted by row."""
+    perm = np.lexsort((cols, rows))
+    ptr = np.zeros(n + 1, dtype=int)
+    ptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+    return ptr, np.asarray(cols, dtype=int)[perm]
+
+
+def _signature(mesh):
+    """Fingerprint of the mesh topology and node positions."""
+    p = mesh.positions()
+    pos = np.vstack([np.asarray(pg.x(p)), np.asarray(pg.y(p)),
+                     np.asarray(pg.z(p))]).T
+    return (mesh.nodeCount(), mesh.cellCount(), mesh.boundaryCount(),
+            hashlib.sha1(np.ascontiguousarray(pos)).hexdigest()), pos
+
+
+class MeshAdjacency(object):
+    """
+    Snapshot of the mesh topology as NumPy CSR arrays.
+
+    The i-th row of a relation X -> Y are the entries
+    Y[XPtr[i]:XPtr[i+1]]. Use :py:func:`meshAdjacency` to get a cached
+    instance that is rebuilt if the mesh changes.
+
+    Attributes
+    ----------
+    pos : array (N, 3)
+        Node positions.
+
+    cellPtr, cellNodes : array
+        cell -> nodes.
+
+    nodeCellPtr, nodeCells : array
+        node -> cells.
+
+    nodeNodePtr, nodeNodes : array
+        node -> nodes sharing a cell (without the node itself).
+
+    cellCellPtr, cellCells : array
+        cell -> neighbour cells sharing a boundary.
+
+    boundaryPtr, boundaryNodes : array
+        boundary -> nodes.
+
+    boundaryLeft, boundaryRight : array
+        Left and right cell of each boundary, -1 if there is none.
+    """
+    def __init__(self, mesh):
+        # may create missing boundaries, so counts and signature come after
+        mesh.createNeighbourInfos()
+
+        self.signature, self.pos = _signature(mesh)
+        self.dim = mesh.dimension()
+
+        nNodes = mesh.nodeCount()
+        nCells = mesh.cellCount()
+        nBounds = mesh.boundaryCount()
+
+        # cell -> nodes
+        ids = [c.ids() for c in mesh.cells()]
+        nCellNodes = np.asarray([len(i) for i in ids], dtype=int)
+        self.cellPtr = np.zeros(nCells + 1, dtype=int)
+        self.cellPtr[1:] = np.cumsum(nCellNodes)
+        self.cellNodes = np.asarray([n for i in ids for n in i], dtype=int)
+
+        # node -> cells
+        cellOfEntry = np.repeat(np.arange(nCells), nCellNodes)
+        self.nodeCellPtr, self.nodeCells = _csr(self.cellNodes, cellOfEntry,
+                                                nNodes)
+
+        # node -> nodes of the same cells
+        rows, cols = [], []
+        for k in np.unique(nCellNodes):
+            cIds = np.nonzero(nCellNodes == k)[0]
+            cn = self.cellNodes[self.cellPtr[cIds][:, None] + np.arange(k)]
+            rows.append(np.repeat(cn, k, axis=1).ravel())
+            cols.append(np.tile(cn, (1, k)).ravel())
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=int)
+        keys = np.unique(rows[rows != cols] * nNodes + cols[rows != cols])
+        self.nodeNodePtr, self.nodeNodes = _csr(keys // nNodes, keys % nNodes,
+                                                nNodes)
+
+        # boundaries with left and right cells
+        bIds = []
+        self.boundaryLeft = np.full(nBounds, -1, dtype=int)
+        self.boundaryRight = np.full(nBounds, -1, dtype=int)
+        for b in mesh.boundaries():
+            bIds.append(b.ids())
+            if b.leftCell() is not None:
+                self.boundaryLeft[b.id()] = b.leftCell().id()
+            if b.rightCell() is not None:
+                self.boundaryRight[b.id()] = b.rightCell().id()
+
+        self.boundaryPtr = np.zeros(nBounds + 1, dtype=int)
+        self.boundaryPtr[1:] = np.cumsum([len(i) for i in bIds])
+        self.boundaryNodes = np.asarray([n for i in bIds for n in i],
+                                        dtype=int)
+        self._boundaryKeys = dict((tuple(sorted(i)), bi)
+                                  for bi, i in enumerate(bIds))
+
+        # cell -> cells over inner boundaries
+        inner = (self.boundaryLeft >= 0) & (self.boundaryRight >= 0)
+        l, r = self.boundaryLeft[inner], self.boundaryRight[inner]
+        self.cellCellPtr, self.cellCells = _csr(np.concatenate([l, r]),
+                                                np.concatenate([r, l]),
+                                                nCells)
+
+        self._simplex = None
+
+    def isValid(self, mesh):
+        """Check if the snapshot still fits the mesh."""
+        return _signature(mesh)[0] == self.signature
+
+    def nodeNeighbours(self, node):
+        """Ids of all nodes sharing a cell with node."""
+        return self.nodeNodes[self.nodeNodePtr[node]:self.nodeNodePtr[node + 1]]
+
+    def nodeCellIds(self, node):
+        """Ids of all cells of node."""
+        return self.nodeCells[self.nodeCellPtr[node]:self.nodeCellPtr[node + 1]]
+
+    def cellNodeIds(self, cell):
+        """Node ids of cell."""
+        return self.cellNodes[self.cellPtr[cell]:self.cellPtr[cell + 1]]
+
+    def cellNeighbours(self, cell):
+        """Ids of the cells sharing a boundary with cell."""
+        return self.cellCells[self.cellCellPtr[cell]:self.cellCellPtr[cell + 1]]
+
+    def findBoundary(self, *nodes):
+        """Id of the boundary with the given node ids or -1."""
+        return self._boundaryKeys.get(tuple(sorted(nodes)), -1)
+
+    def leftRight(self, boundary):
+        """Left and right cell id of the boundary (-1 for none)."""
+        return self.boundaryLeft[boundary], self.boundaryRight[boundary]
+
+    def cellSize(self, cell):
+        """Distance from the cell center to its first node."""
+        p = self.pos[self.cellNodeIds(cell)]
+        return np.sqrt(np.sum((p.mean(axis=0) - p[0])**2))
+
+    def _simplexData(self):
+        """
+        Barycentric transformation and the neighbour across the face
+        opposite to each node for simplex meshes, None otherwise.
+        """
+        if self._simplex is None:
+            dim = self.dim
+            nCells = len(self.cellPtr) - 1
+            if nCells == 0 or not np.all(np.diff(self.cellPtr) == dim + 1):
+                self._simplex = False
+                return None
+
+            ids = self.cellNodes.reshape(nCells, dim + 1)
+            p = self.pos[:, :dim]
+            T = p[ids[:, 1:]] - p[ids[:, 0]][:, None, :]
+            Tinv = np.linalg.inv(T.transpose(0, 2, 1))
+
+            opposite = np.full((nCells, dim + 1), -1, dtype=int)
+            for c in range(nCells):
+                for k in range(dim + 1):
+                    b = self.findBoundary(*np.delete(ids[c], k))
+                    if b >= 0:
+                        l, r = self.leftRight(b)
+                        opposite[c, k] = r if l == c else l
+
+            self._simplex = (ids, Tinv, opposite)
+
+        return self._simplex or None
+
+    def isSimplex(self):
+        """True if all cells are triangles (2D) or tetrahedrons (3D)."""
+        return self._simplexData() is not None
+
+    def findCell(self, pos, start=None, maxSteps=None):
+        """
+        Id of the cell containing pos or -1.
+
+        The search walks from the start cell through the neighbour cells, so
+        successive searches for close positions, e.g., along a streamline,
+        only touch a few cells. Only simplex meshes are supported, see
+        :py:meth:`isSimplex`, for other meshes an exception is raised and
+        :gimliapi:`GIMLI::Mesh::findCell` should be used.
+        """
+        sim = self._simplexData()
+        if not sim:
+            raise Exception("MeshAdjacency.findCell needs a mesh of "
+                            "triangles or tetrahedrons.")
+
+        pos = np.asarray([pos[i] for i in range(self.dim)], dtype=float)
+
+        ids, Tinv, opposite = sim
+        x0 = self.pos[ids[:, 0], :self.dim]
+
+        if start is None or start < 0:
+            # nearest cell node as start
+            d = np.sum((self.pos[:, :self.dim] - pos)**2, axis=1)
+            start = self.nodeCellIds(int(np.argmin(d)))[0]
+
+        c = int(start)
+        visited = set()
+        if maxSteps is None:
+            maxSteps = len(ids)
+
+        for i in range(maxSteps):
+            lam = Tinv[c].dot(pos - x0[c])
+            bary = np.concatenate([[1.0 - lam.sum()], lam])
+            k = int(np.argmin(bary))
+            if bary[k] >= -1e-12:
+                return c
+
+            visited.add(c)
+            nxt = opposite[c, k]
+            if nxt < 0 or nxt in visited:
+                # left the mesh or stuck at a concave boundary, brute force
+                lam = np.einsum('mij,mj->mi', Tinv, pos - x0)
+                inside = np.nonzero((lam.min(axis=1) >= -1e-12) &
+                                    (lam.sum(axis=1) <= 1.0 + 1e-12))[0]
+                return int(inside[0]) if len(inside) else -1
+            c = nxt
+
+        return -1
+
+
+def meshAdjacency(mesh):
+    """
+    Return the cached :py:class:`MeshAdjacency` for the mesh.
+
+    The snapshot is rebuilt if the node, cell or boundary count or any
+    node position has changed since it was created.
+    """
+    key = id(mesh)
+    adj = __adjacencyCache__.get(key, None)
+
+    if adj is None or not adj.isValid(mesh):
+        if len(__adjacencyCache__) >= 8:
+            __adjacencyCache__.pop(list(__adjacencyCache__.keys())[0])
+        adj = MeshAdjacency(mesh)
+        __adjacencyCache__[key] = adj
+
+    return adj
+
+__adjacencyCache__ = dict()
@@ -87,16 +87,315 @@ def createMesh(poly, quality=30, area=0.0,
         raise('not yet implemented')
 
 
+__gmshNodesPerElement__ = {1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6,
+                           10: 9, 11: 10, 12: 27, 13: 18, 14: 14, 15: 1,
+                           16: 8, 17: 20, 18: 15, 19: 13, 20: 9, 21: 10,
+                           22: 12, 23: 15, 24: 15, 25: 21, 26: 4, 27: 5,
+                           28: 6, 29: 20, 30: 35, 31: 56, 92: 64, 93: 125}
+
+
+def _gmshNodesPerElement(elementType):
+    """Number of nodes for a Gmsh element type."""
+    if elementType not in __gmshNodesPerElement__:
+        raise Exception("Unknown Gmsh element type: " + str(elementType))
+    return __gmshNodesPerElement__[elementType]
+
+
+class _GmshBuffer(object):
+    """Read position in the raw bytes of a binary Gmsh file."""
+    def __init__(self, raw, offset, endian='<', sizeT='u8'):
+        self.raw = raw
+        self.offset = offset
+        self.endian = endian
+        self.sizeT = sizeT
+
+    def line(self):
+        """Read up to the next newline (ASCII header lines)."""
+        eol = self.raw.find(b'\n', self.offset)
+        line = self.raw[self.offset:eol]
+        self.offset = eol + 1
+        return line
+
+    def read(self, dtype, count=1):
+        """Read count values of dtype ('i4', 'f8' or 'size_t')."""
+        if dtype == 'size_t':
+            dtype = self.sizeT
+        a = np.frombuffer(self.raw, dtype=self.endian + dtype, count=count,
+                          offset=self.offset)
+        self.offset += a.nbytes
+        if a.dtype.kind in 'iu':
+            return a.astype(np.int64)
+        return a
+
+
+def _gmshTokensPerLine(text):
+    """Number of whitespace separated tokens for every line of text."""
+    b = np.frombuffer(text.encode(), dtype=np.uint8)
+    space = (b == 32) | (b == 9) | (b == 10) | (b == 13)
+    start = ~space
+    start[1:] &= space[:-1]
+    lineIds = np.cumsum(b == 10) - (b == 10)
+    counts = np.bincount(lineIds[start], minlength=lineIds[-1] + 1 if len(b)
+                         else 0)
+    return counts[counts > 0]
+
+
+def _readGmshEntitiesASCII(text, version):
+    """First physical tag for every (dim, entity tag) of a MSH 4 file."""
+    tok = np.fromstring(text, sep=' ')
+    counts = tok[:4].astype(int)
+    i = 4
+    physical = dict()
+    for dim in range(4):
+        for e in range(counts[dim]):
+            tag = int(tok[i])
+            # points have a position in 4.1, all others a bounding box
+            i += 4 if (dim == 0 and version >= 4.1) else 7
+            nPhys = int(tok[i])
+            physical[(dim, tag)] = int(tok[i + 1]) if nPhys > 0 else 0
+            i += 1 + nPhys
+            if dim > 0:
+                i += 1 + int(tok[i])
+    return physical
+
+
+def _readGmshEntitiesBinary(buf):
+    """First physical tag for every (dim, entity tag) of a MSH 4.1 file."""
+    counts = buf.read('size_t', 4)
+    physical = dict()
+    for dim in range(4):
+        for e in range(counts[dim]):
+            tag = int(buf.read('i4')[0])
+            buf.read('f8', 3 if dim == 0 else 6)
+            nPhys = int(buf.read('size_t')[0])
+            phys = buf.read('i4', nPhys)
+            physical[(dim, tag)] = int(phys[0]) if nPhys > 0 else 0
+            if dim > 0:
+                buf.read('i4', int(buf.read('size_t')[0]))
+    return physical
+
+
+def _readGmshNodesASCII(text, version):
+    """Node tags and positions of the $Nodes section."""
+    tok = np.fromstring(text, sep=' ')
+
+    if version < 4:
+        n = int(tok[0])
+        a = tok[1:1 + 4 * n].reshape(n, 4)
+        return a[:, 0].astype(np.int64), a[:, 1:]
+
+    nBlocks = int(tok[0])
+    i = 4 if version >= 4.1 else 2
+    tags, pos = [], []
+    for b in range(nBlocks):
+        parametric, n = int(tok[i + 2]), int(tok[i + 3])
+        if parametric:
+            raise Exception("Parametric Gmsh nodes are not supported.")
+        i += 4
+        if version >= 4.1:
+            tags.append(tok[i:i + n])
+            pos.append(tok[i + n:i + 4 * n].reshape(n, 3))
+        else:
+            a = tok[i:i + 4 * n].reshape(n, 4)
+            tags.append(a[:, 0])
+            pos.append(a[:, 1:])
+        i += 4 * n
+
+    return np.concatenate(tags).astype(np.int64), np.vstack(pos)
+
+
+def _readGmshNodesBinary(buf, version):
+    """Node tags and positions of a binary $Nodes section."""
+    if version < 4:
+        n = int(buf.line())
+        rec = np.frombuffer(buf.raw, dtype=np.dtype([
+            ('tag', buf.endian + 'i4'), ('pos', buf.endian + 'f8', 3)]),
+            count=n, offset=buf.offset)
+        buf.offset += rec.nbytes
+        return rec['tag'].astype(np.int64), np.array(rec['pos'])
+
+    nBlocks = int(buf.read('size_t', 4)[0])
+    tags, pos = [], []
+    for b in range(nBlocks):
+        dim, tag, parametric = buf.read('i4', 3)
+        n = int(buf.read('size_t')[0])
+        if parametric:
+            raise Exception("Parametric Gmsh nodes are not supported.")
+        tags.append(buf.read('size_t', n))
+        pos.append(buf.read('f8', 3 * n).reshape(n, 3))
+
+    return np.concatenate(tags), np.vstack(pos)
+
+
+def _readGmshElementsASCII(text, version, physical):
+    """List of (element type, physical tags, node tags) blocks."""
+    blocks = []
+
+    if version < 4:
+        # elm-number elm-type number-of-tags <tags> node-number-list
+        body = text[text.find('\n') + 1:]
+        tok = np.fromstring(body, sep=' ', dtype=np.int64)
+        counts = _gmshTokensPerLine(body)
+        offset = np.cumsum(counts) - counts
+        types = tok[offset + 1]
+        nTags = tok[offset + 2]
+
+        for t in np.unique(types):
+            rows = np.nonzero(types == t)[0]
+            start = offset[rows] + 3 + nTags[rows]
+            nn = counts[rows[0]] - 3 - nTags[rows[0]]
+            phys = np.where(nTags[rows] > 0, tok[offset[rows] + 3], 0)
+            blocks.append((int(t), phys, tok[start[:, None] + np.arange(nn)]))
+        return blocks
+
+    tok = np.fromstring(text, sep=' ', dtype=np.int64)
+    nBlocks = int(tok[0])
+    i = 4 if version >= 4.1 else 2
+    for b in range(nBlocks):
+        if version >= 4.1:
+            dim, tag, t, n = tok[i:i + 4]
+        else:
+            tag, dim, t, n = tok[i:i + 4]
+        i += 4
+        nn = _gmshNodesPerElement(t)
+        a = tok[i:i + n * (1 + nn)].reshape(n, 1 + nn)
+        i += n * (1 + nn)
+        blocks.append((int(t), np.full(n, physical.get((dim, tag), 0)),
+                       a[:, 1:]))
+    return blocks
+
+
+def _readGmshElementsBinary(buf, version, physical):
+    """List of (element type, physical tags, node tags) blocks."""
+    blocks = []
+
+    if version < 4:
+        n = int(buf.line())
+        count = 0
+        while count < n:
+            t, m, nTags = buf.read('i4', 3)
+            nn = _gmshNodesPerElement(t)
+            a = buf.read('i4', m * (1 + nTags + nn)).reshape(m, -1)
+            phys = a[:, 1] if nTags > 0 else np.zeros(m, dtype=np.int64)
+            blocks.append((int(t), phys, a[:, 1 + nTags:]))
+            count += m
+        return blocks
+
+    nBlocks = int(buf.read('size_t', 4)[0])
+    for b in range(nBlocks):
+        dim, tag, t = buf.read('i4', 3)
+        n = int(buf.read('size_t')[0])
+        nn = _gmshNodesPerElement(t)
+        a = buf.read('size_t', n * (1 + nn)).reshape(n, 1 + nn)
+        blocks.append((int(t), np.full(n, physical.get((dim, tag), 0)),
+                       a[:, 1:]))
+    return blocks
+
+
+def readGmshArrays(fname):
+    """
+    Read nodes and elements of a :term:`Gmsh` file as NumPy arrays.
+
+    Supports MSH 2 and 4.x ASCII and MSH 2 and 4.1 binary files. The
+    sections are read in bulk, not line by line.
+
+    Parameters
+    ----------
+    fname : string
+        Filename of the file to read (\\*.msh).
+
+    Returns
+    -------
+    nodes : array (N, 3)
+        Node positions.
+
+    elements : dict
+        Gmsh element type -> (nodes (M, k), physical) with zero based node
+        indices into nodes and the physical tag of each element. For MSH 4
+        the physical tag is the first one of the element's entity, 0 if
+        there is none.
+    """
+    with open(fname, 'rb') as fi:
+        raw = fi.read()
+
+    version, binary, buf = 2.2, False, None
+    physical = dict()
+    nodeTags, nodes, blocks = None, None, []
+
+    pos = raw.find(b'$')
+    while pos >= 0:
+        eol = raw.find(b'\n', pos)
+        name = raw[pos + 1:eol].strip().decode()
+        body = eol + 1
+
+        if name == 'MeshFormat':
+            fmt = raw[body:raw.find(b'\n', body)].split()
+            version, binary = float(fmt[0]), int(fmt[1]) == 1
+            if binary:
+                buf = _GmshBuffer(raw, raw.find(b'\n', body) + 1,
+                                  sizeT='u8' if int(fmt[2]) == 8 else 'u4')
+                if buf.read('i4')[0] != 1:
+                    buf.endian = '>'
+                if version >= 4 and version < 4.1:
+                    raise Exception("Binary MSH 4.0 is not supported, "
+                                    "please use MSH 4.1 or 2.")
+        elif name in ('Entities', 'Nodes', 'Elements'):
+            if binary:
+                buf.offset = body
+                if name == 'Entities':
+                    physical = _readGmshEntitiesBinary(buf)
+                elif name == 'Nodes':
+                    nodeTags, nodes = _readGmshNodesBinary(buf, version)
+                else:
+                    blocks = _readGmshElementsBinary(buf, version, physical)
+                body = buf.offset
+            else:
+                text = raw[body:raw.find(b'$End' + name.encode(),
+                                         body)].decode()
+                if name == 'Entities':
+                    physical = _readGmshEntitiesASCII(text, version)
+                elif name == 'Nodes':
+                    nodeTags, nodes = _readGmshNodesASCII(text, version)
+                else:
+                    blocks = _readGmshElementsASCII(text, version, physical)
+
+        end = raw.find(b'$End' + name.encode(), body)
+        if end < 0:
+            raise Exception("Invalid Gmsh file, missing $End" + name)
+        pos = raw.find(b'$', end + 4 + len(name))
+
+    if nodes is None:
+        raise Exception("No nodes found in Gmsh file: " + fname)
+
+    # translate node tags into node indices
+    index = np.full(nodeTags.max() + 1, -1, dtype=int)
+    index[nodeTags] = np.arange(len(nodeTags))
+
+    elements = dict()
+    for t in set(b[0] for b in blocks):
+        tb = [b for b in blocks if b[0] == t]
+        tags = np.vstack([b[2] for b in tb])
+        valid = (tags >= 0) & (tags < len(index))
+        ids = np.where(valid, index[np.where(valid, tags, 0)], -1)
+        if (ids < 0).any():
+            raise Exception("Gmsh element references unknown node tag " +
+                            str(tags[ids < 0][0]) + " in " + fname)
+        elements[t] = (ids, np.concatenate([b[1] for b in tb]).astype(int))
+
+    return nodes, elements
+
+
 def readGmsh(fname, verbose=False):
     """
-    Read :term:`Gmsh` ASCII file and return instance of GIMLI::Mesh class.
+    Read :term:`Gmsh` file and return instance of GIMLI::Mesh class.
 
     Parameters
     ----------
     fname : string
         Filename of the file to read (\\*.msh). The file must conform
-        to the `MSH ASCII file version 2 <http://geuz.org/gmsh/doc/
-        texinfo/gmsh.html#MSH-ASCII-file-format>`_ format.
+        to the `MSH file format <http://gmsh.info/doc/texinfo/
+        gmsh.html#MSH-file-format>`_ version 2 or 4.x in ASCII or binary
+        (version 2 and 4.1) encoding.
     verbose : boolean, optional
         Be verbose during import.
 
@@ -115,140 +414,200 @@ def readGmsh(fname, verbose=False):
         - Physical Number >= 2: Inversion region
 
     """
-    inNodes, inElements, ncount, ecount = 0, 0, 0, 0
-    fid = open(fname)
     if verbose:
         print('Reading %s... \n' % fname)
 
-    for line in fid:
-
-        if line[0] == '$':
-            if line.find('Nodes') > 0:
-                inNodes = 1
-            if line.find('EndNodes') > 0:
-                inNodes = 0
-            if line.find('Elements') > 0:
-                inElements = 1
-            if line.find('EndElements') > 0:
-                inElements = 0
+    nodes, elements = readGmshArrays(fname)
 
-        else:
-            if inNodes == 1:
-                if len(line.split()) == 1:
-                    nodes = np.zeros((int(line), 3))
-                    if verbose:
-                        print('  Nodes: %s' % int(line))
-                else:
-                    nodes[ncount, :] = np.array(line.split(), 'float')[1:]
-                    ncount += 1
+    def _elements(t, k):
+        return elements.get(t, (np.zeros((0, k), dtype=int),
+                                np.zeros(0, dtype=int)))
 
-            elif inElements == 1:
-                if len(line.split()) == 1:
-                    if verbose:
-                        print('  Entries: %s' % int(line))
-                    points, lines, triangles, tets = [], [], [], []
-
-                else:
-                    entry = list(map(int, line.split()))[1:]
-
-                    if entry[0] == 15:
-                        points.append((entry[-2], entry[-3]))
-                    elif entry[0] == 1:
-                        lines.append((entry[-2], entry[-1], entry[2]))
-                    elif entry[0] == 2:
-                        triangles.append((entry[-3], entry[-2],
-                                          entry[-1], entry[2]))
-                    elif entry[0] == 4:
-                        tets.append((entry[-4], entry[-3], entry[-2],
-                                     entry[-1], entry[2]))
-    fid.close()
-
-    lines = np.asarray(lines)
-    triangles = np.asarray(triangles)
-    tets = np.asarray(tets)
+    points = _elements(15, 1)
+    lines = _elements(1, 2)
+    triangles = _elements(2, 3)
+    tets = _elements(4, 4)
 
     if verbose:
-        print('    Points: %s' % len(points))
-        print('    Lines: %s' % len(lines))
-        print('    Triangles: %s' % len(triangles))
-        print('    Tetrahedra: %s \n' % len(tets))
+        print('  Nodes: %s' % len(nodes))
+        print('    Points: %s' % len(points[0]))
+        print('    Lines: %s' % len(lines[0]))
+        print('    Triangles: %s' % len(triangles[0]))
+        print('    Tetrahedra: %s \n' % len(tets[0]))
         print('Creating mesh object... \n')
 
     # check dimension
-    if len(tets) == 0:
+    if len(tets[0]) == 0:
         dim, bounds, cells = 2, lines, triangles
         zero_dim = np.abs(nodes.sum(0)).argmin()  # identify zero dimension
+        nodes = np.vstack([nodes[:, 0], nodes[:, 3 - zero_dim],
+                           np.zeros(len(nodes))]).T
     else:
         dim, bounds, cells = 3, triangles, tets
     if verbose:
         print('  Dimension: %s-D' % dim)
 
-    # creating instance of GIMLI::Mesh class
-    mesh = pg.Mesh(dim)
-
     # replacing boundary markers (gmsh does not allow negative phys. regions)
     bound_marker = (pg.MARKER_BOUND_HOMOGEN_NEUMANN, pg.MARKER_BOUND_MIXED,
                     pg.MARKER_BOUND_HOMOGEN_DIRICHLET,
                     pg.MARKER_BOUND_DIRICHLET)
+    boundMarkers = bounds[1].copy()
     for i in range(4):
-        bounds[:, dim][bounds[:, dim] == i + 1] = bound_marker[i]
+        boundMarkers[bounds[1] == i + 1] = bound_marker[i]
 
     # account for CEM markers
-    bounds[:, dim][bounds[:, dim] >= 10000] *= -1
+    boundMarkers[boundMarkers >= 10000] *= -1
 
     if verbose:
-        bound_types = np.unique(bounds[:, dim])
-        regions = np.unique(cells[:, dim + 1])
+        bound_types = np.unique(boundMarkers)
+        regions = np.unique(cells[1])
         print('  Regions: %s ' % len(regions) + str(tuple(regions)))
         print('  Boundary types: %s ' % len(bound_types) +
               str(tuple(bound_types)))
 
-    for node in nodes:
-        if dim == 2:
-            mesh.createNode(node[0], node[3 - zero_dim], 0)
-        else:
-            mesh.createNode(node)
-
-    for cell in cells:
-        if dim == 2:
-            mesh.createTriangle(
-                mesh.node(int(cell[0] - 1)), mesh.node(int(cell[1] - 1)),
-                mesh.node(int(cell[2] - 1)), marker=int(cell[3]))
-        else:
-            mesh.createTetrahedron(
-                mesh.node(int(cell[0] - 1)), mesh.node(int(cell[1] - 1)),
-                mesh.node(int(cell[2] - 1)), mesh.node(
-                    int(cell[3] - 1)),
-                marker=int(cell[4]))
-
-    mesh.createNeighbourInfos()
-
-    for bound in bounds:
-        if dim == 2:
-            mesh.createEdge(
-                mesh.node(int(bound[0] - 1)),
-                mesh.node(int(bound[1] - 1)),
-                marker=int(bound[2]))
-        else:
-            mesh.createTriangleFace(
-                mesh.node(int(bound[0] - 1)), mesh.node(int(bound[1] - 1)),
-                mesh.node(int(bound[2] - 1)), marker=int(bound[3]))
-
     # assign marker to corresponding nodes (sensors, reference nodes, etc.)
-    if len(points) > 0:
-        for point in points:
-            mesh.node(point[0] - 1).setMarker(-point[1])
+    nodeMarkers = np.zeros(len(nodes), dtype=int)
+    nodeMarkers[points[0][:, 0]] = -points[1]
+
+    mesh = createMeshFromArrays(nodes, cells[0], cells[1], bounds[0],
+                                boundMarkers, nodeMarkers, dim=dim)
 
     if verbose:
-        if len(points) > 0:
-            points = np.asarray(points)
-            node_types = np.unique(points[:, 1])
-            print('  Marked nodes: %s ' % len(points) + str(tuple(node_types)))
+        if len(points[0]) > 0:
+            node_types = np.unique(points[1])
+            print('  Marked nodes: %s ' % len(points[0]) +
+                  str(tuple(node_types)))
         print('\nDone. \n')
         print('  ' + str(mesh))
 
     return mesh
 
+
+def createMeshFromArrays(nodes, cells=None, cellMarkers=None, boundaries=None,
+                         boundaryMarkers=None, nodeMarkers=None, dim=None):
+    """
+    Create a mesh from node, cell and boundary arrays in one call.
+
+    Parameters
+    ----------
+    nodes : array (N, 2) or (N, 3)
+        Node positions.
+    cells : array (M, k), optional
+        Zero based node indices of the cells. The cell type follows from k
+        and the dimension, e.g., triangles (2D) or tetrahedrons (3D) for
+        k=3 and k=4. Cells with fewer nodes can be padded with -1.
+    cellMarkers : array (M), optional
+        Cell markers, default 0.
+    boundaries : array (B, l), optional
+        Zero based node indices of the boundaries. They are created after
+        the neighbour infos of the cells, i.e., existing boundaries only get
+        the marker.
+    boundaryMarkers : array (B), optional
+        Boundary markers, default 0.
+    nodeMarkers : array (N), optional
+        Node markers, default 0.
+    dim : int, optional
+        Mesh dimension, default is the number of node coordinates.
+
+    Returns
+    -------
+    mesh : :gimliapi:`GIMLI::Mesh`
+
+    See Also
+    --------
+    meshToArrays : The arrays of a mesh.
+    """
+    nodes = np.asarray(nodes, dtype=float)
+    if dim is None:
+        dim = nodes.shape[1]
+    if nodes.shape[1] < 3:
+        nodes = np.hstack([nodes, np.zeros((len(nodes), 3 - nodes.shape[1]))])
+
+    def _ids(a):
+        return None if a is None else np.atleast_2d(np.asarray(a, dtype=int))
+
+    def _markers(m):
+        return None if m is None else np.asarray(m, dtype=np.int32)
+
+    mesh = pg.Mesh(dim)
+    mesh.createFromArrays(nodes, _ids(cells), _markers(cellMarkers),
+                          _ids(boundaries), _markers(boundaryMarkers),
+                          _markers(nodeMarkers))
+    return mesh
+
+
+def meshToArrays(mesh):
+    """
+    Return all nodes, cells and boundaries of a mesh as NumPy arrays.
+
+    The node ids of cells and boundaries with different node counts are
+    padded with -1. The result can be passed to
+    :py:func:`createMeshFromArrays`, i.e.,
+    createMeshFromArrays(\\*\\*meshToArrays(mesh)) copies the mesh.
+
+    Returns
+    -------
+    arrays : dict
+        nodes (N, 3), nodeMarkers, cells (M, k), cellMarkers,
+        boundaries (B, l), boundaryMarkers and dim.
+    """
+    return dict(nodes=mesh.positionArray(),
+                nodeMarkers=np.asarray(mesh.nodeMarker()),
+                cells=mesh.cellNodeIdArray(),
+                cellMarkers=np.asarray(mesh.cellMarker()),
+                boundaries=mesh.boundaryNodeIdArray(),
+                boundaryMarkers=np.asarray(mesh.boundaryMarker()),
+                dim=mesh.dimension())
+
+
+def _readTriangleFile(fname):
+    """
+    Numbers of a :term:`Triangle`/:term:`Tetgen` file without comments as
+    2d array and the header line.
+    """
+    with open(fname) as fi:
+        lines = [l.split('#')[0] for l in fi]
+    lines = [l for l in lines if l.strip()]
+    header = [int(float(v)) for v in lines[0].split()]
+    body = np.fromstring(' '.join(lines[1:]), sep=' ')
+    return header, body.reshape(header[0], -1) if header[0] else \
+        np.zeros((0, 1))
+
+
+def _readTriangleMesh(fname, dim, boundaryExt, verbose=False):
+    """Read .node, .ele and optional boundary files of Triangle/Tetgen."""
+    import os
+
+    base = os.path.splitext(fname)[0] if os.path.splitext(fname)[1] in \
+        ('.node', '.ele', '.edge', '.face', '.n', '.e', '.f') else fname
+
+    # node: id x y [z] [attributes] [boundary marker]
+    header, node = _readTriangleFile(base + '.node')
+    offset = int(node[0, 0]) if len(node) else 0
+    nodes = node[:, 1:1 + dim]
+    nodeMarkers = node[:, -1].astype(int) if header[3] > 0 else None
+
+    # ele: id n1 n2 n3 [n4] [region attribute]
+    header, ele = _readTriangleFile(base + '.ele')
+    cells = ele[:, 1:1 + header[1]].astype(int) - offset
+    cellMarkers = ele[:, 1 + header[1]].astype(int) if header[2] > 0 else None
+
+    # edge/face: id n1 n2 [n3] [boundary marker]
+    bounds, boundMarkers = None, None
+    if os.path.exists(base + boundaryExt):
+        header, bound = _readTriangleFile(base + boundaryExt)
+        bounds = bound[:, 1:1 + dim].astype(int) - offset
+        if header[1] > 0:
+            boundMarkers = bound[:, 1 + dim].astype(int)
+
+    if verbose:
+        print('Nodes: %s Cells: %s Boundaries: %s' % (len(nodes), len(cells),
+              0 if bounds is None else len(bounds)))
+
+    return createMeshFromArrays(nodes, cells, cellMarkers, bounds,
+                                boundMarkers, nodeMarkers, dim=dim)
+
+
 def readTriangle(fname, verbose=False):
     """
     Read :term:`Triangle` :cite:`Shewchuk96b`  ASCII files and return instance of GIMLI::Mesh class.
@@ -257,17 +616,16 @@ def readTriangle(fname, verbose=False):
     Parameters
     ----------
     fname : string
-        Filename of the file to read (\\*.n, \\*.e)
+        Filename of the file to read (\\*.node, \\*.ele and optional
+        \\*.edge), with or without extension.
         
     verbose : boolean, optional
         Be verbose during import.
 
     """
-    
-    raise("implement me!")
-    os.system('meshconvert -d2 ' + fname)
-    return Mesh(2)
-    
+    return _readTriangleMesh(fname, 2, '.edge', verbose)
+
+
 def readTetgen(fname, verbose=False):
     """
     Read :term:`Tetgen` :cite:`Si2004` ASCII files and return instance of GIMLI::Mesh class.
@@ -276,16 +634,16 @@ def readTetgen(fname, verbose=False):
     Parameters
     ----------
     fname : string
-        Filename of the file to read (\\*.n, \\*.e \\*.f)
+        Filename of the file to read (\\*.node, \\*.ele and optional
+        \\*.face), with or without extension.
         
     verbose : boolean, optional
         Be verbose during import.
 
     """
-    raise("implement me!")
-    os.system('meshconvert -d3 -D ..' + fname)
-    return Mesh(3)
-        
+    return _readTriangleMesh(fname, 3, '.face', verbose)
+
+
 def readHydrus2dMesh(fname='MESHTRIA.TXT'):
     """
     Import mesh from Hydrus2D.
@@ -303,34 +661,25 @@ def readHydrus2dMesh(fname='MESHTRIA.TXT'):
     ----------
     .. [1] http://www.pc-progress.com/en/Default.aspx?h3d-description
     """
-    fid = open(fname)
-    line = fid.readline().split()
+    with open(fname) as fid:
+        lines = fid.readlines()
+
+    line = lines[0].split()
     nnodes = int(line[1])
     ncells = int(line[3])
-    mesh = pg.Mesh()
-    for i in range(nnodes):
-        line = fid.readline().split()
-        mesh.createNode(
-            pg.RVector3(float(line[1]) / 100., float(line[2]) / 100., 0.))
-
-    for i in range(3):
-        line = fid.readline()
-
-    for i in range(ncells):
-        line = fid.readline().split()
-        if len(line) == 4:
-            mesh.createTriangle(
-                mesh.node(int(line[1]) - 1),
-                mesh.node(int(line[2]) - 1),
-                mesh.node(int(line[3]) - 1),
-                1)
-        elif len(line) == 5:
-            mesh.createTetrahedron(
-                mesh.node(int(line[1]) - 1), mesh.node(int(line[2]) - 1),
-                mesh.node(int(line[3]) - 1), mesh.node(int(line[4]) - 1), 1)
-
-    fid.close()
-    return mesh
+
+    node = np.fromstring(' '.join(lines[1:1 + nnodes]), sep=' ')
+    node = node.reshape(nnodes, -1)
+    nodes = node[:, 1:3] / 100.
+
+    # triangles (4 entries) or tetrahedrons (5 entries), padded with -1
+    rows = [l.split()[1:] for l in lines[4 + nnodes:4 + nnodes + ncells]]
+    cells = -np.ones((ncells, max(len(r) for r in rows)), dtype=int)
+    for i, r in enumerate(rows):
+        cells[i, :len(r)] = np.asarray(r, dtype=int) - 1
+
+    return createMeshFromArrays(nodes, cells, np.ones(ncells, dtype=int),
+                                dim=2)
 
 
 def readHydrus3dMesh(filename='MESHTRIA.TXT'):
@@ -350,41 +699,24 @@ def readHydrus3dMesh(filename='MESHTRIA.TXT'):
     ----------
     .. [1] http://www.pc-progress.com/en/Default.aspx?h3d-description
     """
-    f = open(filename, 'r')
-    for i in range(6):
-        line1 = f.readline()
+    with open(filename, 'r') as f:
+        lines = f.readlines()
 
-    nnodes = int(line1.split()[0])
-    ncells = int(line1.split()[1])
+    nnodes = int(lines[5].split()[0])
+    ncells = int(lines[5].split()[1])
     print(nnodes, ncells)
-    line1 = f.readline()
-    nodes = []
+
     dx = 0.01
-    mesh = pg.Mesh()
-    for ni in range(nnodes):
-        pos = f.readline().split()
-        p = pg.RVector3(
-            float(pos[1]) * dx,
-            float(pos[2]) * dx,
-            float(pos[3]) * dx * (-1.))
-        n = mesh.createNode(p)
-        nodes.append(n)
-
-    line1 = f.readline()
-    line1 = f.readline()
-    cells = []
-    for ci in range(ncells):
-        pos = f.readline().split()
-        i, j, k, l = int(pos[1]), int(pos[2]), int(pos[3]), int(pos[4]),
-        c = mesh.createTetrahedron(
-            nodes[i - 1],
-            nodes[j - 1],
-            nodes[k - 1],
-            nodes[l - 1])
-        cells.append(c)
-
-    f.close()
-    return mesh
+    node = np.fromstring(' '.join(lines[7:7 + nnodes]), sep=' ')
+    node = node.reshape(nnodes, -1)
+    nodes = node[:, 1:4] * dx
+    nodes[:, 2] *= -1.
+
+    cell = np.fromstring(' '.join(lines[9 + nnodes:9 + nnodes + ncells]),
+                         sep=' ').reshape(ncells, -1)
+    cells = cell[:, 1:5].astype(int) - 1
+
+    return createMeshFromArrays(nodes, cells, dim=3)
 
 
 def transform2DMeshTo3D(mesh, x, y, z=None):
@@ -441,55 +773,152 @@ def rot2DGridToWorld(mesh, start, end):
     mesh.translate(start)
 
 
-def merge2Meshes(m1, m2):
-    """Merge two meshes into one new mesh and return combined mesh."""
-
-    mesh = pg.Mesh(m1)
-
-    for c in m2.cells():
-        mesh.copyCell(c)
+def weldNodes(pos, tol=1e-6):
+    """
+    Find coincident nodes with a spatial hash.
 
-    for b in m2.boundaries():
-        mesh.copyBoundary(b)
+    The positions are hashed into a grid of cells with size tol, so only
+    nodes of the same or a neighbouring grid cell are compared. Nodes
+    closer than tol are welded, also over chains of nodes.
 
-    for key in list(mesh.exportDataMap().keys()):
-        d = mesh.exportDataMap()[key]
-        print(d)
-        d.resize(mesh.cellCount())
-        d.setVal(m1.exportDataMap()[key], 0, m1.cellCount())
-        d.setVal(
-            m2.exportDataMap()[key],
-            m1.cellCount(),
-            m1.cellCount() + m2.cellCount())
-        mesh.addExportData(key, d)
+    Parameters
+    ----------
+    pos : array (N, 3)
+        Node positions.
+    tol : float [1e-6]
+        Distance below which two nodes are the same.
 
-    return mesh
+    Returns
+    -------
+    ids : array (N)
+        New node id for every position.
+    first : array
+        Index of the first position of every new node, i.e., the new
+        positions are pos[first].
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    pos = np.asarray(pos, dtype=float)
+    n = len(pos)
+    if n == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    keys = np.floor((pos - pos.min(axis=0)) / tol).astype(np.int64)
+
+    def _hash(k):
+        # wrap around is fine, collisions are removed by the distance check
+        k = k.astype(np.uint64)
+        return (k[:, 0] * np.uint64(73856093)) ^ \
+            (k[:, 1] * np.uint64(19349663)) ^ (k[:, 2] * np.uint64(83492791))
+
+    h = _hash(keys)
+    perm = np.argsort(h, kind='mergesort')
+    hSorted = h[perm]
+
+    rows, cols = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                hq = _hash(keys + np.array([dx, dy, dz]))
+                lo = np.searchsorted(hSorted, hq, side='left')
+                hi = np.searchsorted(hSorted, hq, side='right')
+                count = hi - lo
+                if count.sum() == 0:
+                    continue
+                i = np.repeat(np.arange(n), count)
+                j = perm[np.repeat(lo - np.cumsum(count) + count, count) +
+                         np.arange(count.sum())]
+                close = (i < j) & \
+                    (np.sum((pos[i] - pos[j])**2, axis=1) < tol * tol)
+                rows.append(i[close])
+                cols.append(j[close])
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    graph = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+    nGroups, group = connected_components(graph, directed=False)
+
+    # new ids in the order of the first occurrence
+    first = np.full(nGroups, n, dtype=int)
+    np.minimum.at(first, group, np.arange(n))
+    order = np.argsort(first, kind='mergesort')
+    newId = np.empty(nGroups, dtype=int)
+    newId[order] = np.arange(nGroups)
+    return newId[group], first[order]
+
+
+def merge2Meshes(m1, m2, tol=1e-6):
+    """Merge two meshes into one new mesh and return combined mesh."""
+    return mergeMeshes([m1, m2], tol=tol)
 
 
-def mergeMeshes(meshlist):
+def mergeMeshes(meshlist, tol=1e-6):
     """
     Merge several meshes into one new mesh and return the new mesh.
 
+    All meshes are merged at once. Coincident nodes are welded with
+    :py:func:`weldNodes`, node markers of later meshes win if they are not
+    0. Cells keep their marker and attribute, the export data of the first
+    mesh is concatenated over all meshes.
+
     Parameters
     ----------
     meshlist : list
         List of at least two meshes to be merged.
+    tol : float [1e-6]
+        Distance below which two nodes are the same.
 
     See Also
     --------
     merge2Meshes
     """
 
-    if not isinstance(meshlist, list):
-        raise "argument meshlist is no list"
+    if not isinstance(meshlist, (list, tuple)):
+        raise Exception("argument meshlist is no list")
 
     if len(meshlist) < 2:
-        raise "to few meshes in meshlist"
-
-    mesh = meshlist[0]
-
-    for m in range(1, len(meshlist)):
-        mesh = merge2Meshes(mesh, meshlist[m])
+        raise Exception("to few meshes in meshlist")
+
+    arrays = [meshToArrays(m) for m in meshlist]
+    nNodes = np.cumsum([0] + [len(a['nodes']) for a in arrays])
+
+    ids, first = weldNodes(np.vstack([a['nodes'] for a in arrays]), tol)
+    nodes = np.vstack([a['nodes'] for a in arrays])[first]
+
+    nodeMarkers = np.zeros(len(first), dtype=int)
+    allMarkers = np.concatenate([a['nodeMarkers'] for a in arrays])
+    marked = np.nonzero(allMarkers)[0]
+    nodeMarkers[ids[marked]] = allMarkers[marked]
+
+    def _connectivity(name):
+        k = max(a[name].shape[1] for a in arrays)
+        con = -np.ones((sum(len(a[name]) for a in arrays), k), dtype=int)
+        i = 0
+        for a, offset in zip(arrays, nNodes):
+            c = a[name]
+            con[i:i + len(c), :c.shape[1]] = np.where(c >= 0,
+                                                      ids[c + offset], -1)
+            i += len(c)
+        return con
+
+    mesh = createMeshFromArrays(
+        nodes, _connectivity('cells'),
+        np.concatenate([a['cellMarkers'] for a in arrays]),
+        _connectivity('boundaries'),
+        np.concatenate([a['boundaryMarkers'] for a in arrays]),
+        nodeMarkers, dim=meshlist[0].dimension())
+
+    mesh.setCellAttributes(pg.RVector(np.concatenate(
+        [np.asarray(m.cellAttributes()) for m in meshlist])))
+
+    for key in list(meshlist[0].exportDataMap().keys()):
+        for m in meshlist:
+            if key not in m.exportDataMap():
+                raise Exception("export data '" + key + "' is missing in "
+                                "one of the meshes.")
+        mesh.addExportData(key, pg.RVector(np.concatenate(
+            [np.asarray(m.exportData(key)) for m in meshlist])))
 
     return mesh
 
@@ -679,8 +1108,7 @@ def createParaMesh2dGrid(sensors, paraDX=1, paraDZ=1, paraDepth=0, nLayers=11,
     y = -pg.increasingRange(dz, paraDepth, nLayers)
 
     mesh.createGrid(x, y)
-
-    list(map(lambda cell: cell.setMarker(2), mesh.cells()))
+    mesh.setCellMarker(pg.RVector(mesh.cellCount(), 2))
 
     paraXLimits = [xmin, xmax]
 #    paraYLimits = [min(y), max(y)]  # not used
@@ -3,6 +3,7 @@
 from __future__ import print_function
 
 import pygimli as pg
+from pygimli.meshtools import meshAdjacency
 
 def rot2DGridToWorld(mesh, start, end):
     print(mesh, start, end)
@@ -20,16 +21,27 @@ def rot2DGridToWorld(mesh, start, end):
 
 def streamline(mesh, field, startCoord, dLengthSteps, 
                dataMesh=None,
-               maxSteps=1000, verbose=False, koords=[0, 1]):
+               maxSteps=1000, verbose=False, koords=[0, 1],
+               adjacency=None, dataAdjacency=None):
     """
         Create a streamline from startCoord and following a vector field in up 
         and down direction.
+
+        adjacency and dataAdjacency are the
+        :py:class:`pygimli.meshtools.MeshAdjacency` of mesh and dataMesh.
+        Pass them if you draw many streamlines for the same meshes.
     """
+    if adjacency is None:
+        adjacency = meshAdjacency(mesh)
+    if dataMesh is not None and dataAdjacency is None:
+        dataAdjacency = meshAdjacency(dataMesh)
+
     xd, yd = streamlineDir(mesh, field, startCoord, 
                            dLengthSteps,
                            dataMesh=dataMesh,
                            maxSteps=maxSteps,
-                           down=True, verbose=verbose, koords=koords)
+                           down=True, verbose=verbose, koords=koords,
+                           adjacency=adjacency, dataAdjacency=dataAdjacency)
     
     c = mesh.findCell(startCoord)
     
@@ -40,17 +52,42 @@ def streamline(mesh, field, startCoord, dLengthSteps,
                            dLengthSteps,
                            dataMesh=dataMesh,
                            maxSteps=maxSteps,
-                           down=False, verbose=verbose, koords=koords)
+                           down=False, verbose=verbose, koords=koords,
+                           adjacency=adjacency, dataAdjacency=dataAdjacency)
     
     return xd + xu[1:], yd + yu[1:]
 
+
+def findCellFrom(mesh, adjacency, pos, lastCell=None):
+    """
+        Find the cell containing pos by walking from lastCell through the
+        neighbour cells of the mesh adjacency. Falls back to mesh.findCell
+        for non simplex meshes.
+    """
+    if not adjacency.isSimplex():
+        return mesh.findCell(pos, False)
+
+    cId = adjacency.findCell(pos, start=None if lastCell is None else
+                             lastCell.id())
+    if cId < 0:
+        return None
+    return mesh.cell(cId)
+
+
 def streamlineDir(mesh, field, startCoord, dLengthSteps,
                   dataMesh=None,
                   maxSteps=1000, down=True,
-                  verbose=False, koords=[0, 1]):
+                  verbose=False, koords=[0, 1],
+                  adjacency=None, dataAdjacency=None):
     """
         down = -1, up = 1, both = 0
     """
+    if adjacency is None:
+        adjacency = meshAdjacency(mesh)
+    if dataMesh is not None and dataAdjacency is None:
+        dataAdjacency = meshAdjacency(dataMesh)
+    cd = None
+
     xd = []
     yd = []
     counter = 0
@@ -78,7 +115,7 @@ def streamlineDir(mesh, field, startCoord, dLengthSteps,
     # search downward
     pos = pg.RVector3(startCoord)
     c = mesh.findCell(startCoord)
-    dLength = c.center().dist(c.node(0).pos()) / dLengthSteps
+    dLength = adjacency.cellSize(c.id()) / dLengthSteps
     
     if c is not None:
         xd.append(pos[koords[0]])
@@ -99,7 +136,7 @@ def streamlineDir(mesh, field, startCoord, dLengthSteps,
             if len(vx) == mesh.cellCount():
                 d = pg.RVector3(vx[c.id()], vy[c.id()])
             elif dataMesh:
-                cd = dataMesh.findCell(pos)
+                cd = findCellFrom(dataMesh, dataAdjacency, pos, cd)
                 if len(vx) == dataMesh.cellCount():
                     d = pg.RVector3(vx[cd.id()], vy[cd.id()])
                 else:
@@ -108,7 +145,7 @@ def streamlineDir(mesh, field, startCoord, dLengthSteps,
                 raise ADDME
         else:
             if dataMesh:
-                cd = dataMesh.findCell(pos)
+                cd = findCellFrom(dataMesh, dataAdjacency, pos, cd)
                 if not cd:
                     break
                 
@@ -129,7 +166,7 @@ def streamlineDir(mesh, field, startCoord, dLengthSteps,
             if u < lastU: break
 
         pos += direction * d/d.length() * dLength# * min(1.0, ((startCoord - pos).length()))
-        c = mesh.findCell(pos, False)
+        c = findCellFrom(mesh, adjacency, pos, c)
 
         #Change cell here .. set old cell to be processed
         if c is not None:
@@ -143,7 +180,7 @@ def streamlineDir(mesh, field, startCoord, dLengthSteps,
             if c.id() != lastC.id():
                 lastC.setValid(False)
                 lastC = c
-                dLength = c.center().dist(c.node(0).pos()) / dLengthSteps
+                dLength = adjacency.cellSize(c.id()) / dLengthSteps
         else:
             #There is no new cell .. the last active contains a stream element
             lastC.setValid(False)
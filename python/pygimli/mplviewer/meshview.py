@@ -9,7 +9,8 @@ import textwrap
 
 from .colorbar import addCoverageAlpha, cmapFromName, createLinLevs, autolevel
 import pygimli as pg
-from pygimli.misc import streamline  # , streamlineDir # (not used)
+from pygimli.misc import streamline, findCellFrom
+from pygimli.meshtools import meshAdjacency
 
 
 class CellBrowser:
@@ -645,13 +646,24 @@ def drawStreamLine(axes, mesh, c, data, dataMesh=None, *args, **kwargs):
         
             Optionally mesh that for the data. If you want high resolution 
             data to plot on coarse draw mesh.
+
+        adjacency, dataAdjacency : :py:class:`pygimli.meshtools.MeshAdjacency`
+            Optionally topology of mesh and dataMesh, see
+            :py:func:`pygimli.meshtools.meshAdjacency`.
     """
+    adjacency = kwargs.pop('adjacency', None)
+    dataAdjacency = kwargs.pop('dataAdjacency', None)
+    if adjacency is None:
+        adjacency = meshAdjacency(mesh)
+
     x, y = streamline(mesh, data, startCoord=c.center(),
                       dLengthSteps=5,
                       dataMesh=dataMesh,
                       maxSteps=10000,
                       verbose=False,
-                      koords=[0, 1])
+                      koords=[0, 1],
+                      adjacency=adjacency,
+                      dataAdjacency=dataAdjacency)
 
     if 'color' not in kwargs:
         kwargs['color'] = 'black'
@@ -665,8 +677,8 @@ def drawStreamLine(axes, mesh, c, data, dataMesh=None, *args, **kwargs):
         ymid = int(len(y) / 2)
         dx = x[xmid + 1] - x[xmid]
         dy = y[ymid + 1] - y[ymid]
-        c = mesh.findCell([x[xmid], y[ymid]])
-        dLength = c.center().dist(c.node(0).pos())/4.
+        c = findCellFrom(mesh, adjacency, [x[xmid], y[ymid]], c)
+        dLength = adjacency.cellSize(c.id())/4.
 
         axes.arrow(x[xmid], y[ymid], dx, dy, width=dLength/15.,
                    head_starts_at_zero=True,
@@ -697,6 +709,11 @@ def drawStreams(axes, mesh, data, startStream=3, *args, **kwargs):
 
     viewMesh.createNeighbourInfos()
 
+    # the topology is the same for all stream lines
+    kwargs['adjacency'] = meshAdjacency(viewMesh)
+    if dataMesh is not None:
+        kwargs['dataAdjacency'] = meshAdjacency(dataMesh)
+
     for c in viewMesh.cells():
         c.setValid(True)
 
@@ -5,9 +5,11 @@
 '''
 
 import sys
+import multiprocessing
 
 import pygimli as pg
 from pygimli.viewer import show1dmodel, drawModel1D
+from pygimli.utils import gmat2numpy
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -75,12 +77,54 @@ class FDEM2dFOPold(pg.ModellingBase):
         return resp
 
 
+__FDEM1dFOP__ = None
+
+
+def _initFDEM1dWorker(nlay, freq, coilSpacing, z):
+    """Create the 1D forward operator once per worker process."""
+    global __FDEM1dFOP__
+    if np.ndim(coilSpacing) > 0:
+        coilSpacing = pg.RVector(np.asarray(coilSpacing, dtype=float))
+    __FDEM1dFOP__ = pg.FDEM1dModelling(nlay, pg.RVector(freq),
+                                       coilSpacing, z)
+
+
+def _FDEM1dColumns(args):
+    """Responses or jacobians of a chunk of soundings in a worker process."""
+    models, jacobian = args
+    fop = __FDEM1dFOP__
+    resp = []
+    jac = []
+    for modi in models:
+        modi = pg.RVector(modi)
+        if jacobian:
+            fop.createJacobian(modi)
+            jac.append(gmat2numpy(fop.jacobianRef()))
+        else:
+            resp.append(np.asarray(fop.response(modi)))
+
+    return resp, jac
+
+
 class FDEM2dFOP(pg.ModellingBase):
     """
     FDEM 2d-LCI modelling class based on BlockMatrices
+
+    The soundings are independent 1D problems. With nProcs > 1 they are
+    evaluated in chunks on a pool of worker processes, each holding its own
+    :gimliapi:`GIMLI::FDEM1dModelling`. Responses are written into a
+    preallocated vector and jacobians into the blocks of the block jacobian.
     """
-    def __init__(self, data, nlay=2, verbose=False):
+    def __init__(self, data, nlay=2, verbose=False, nProcs=1):
         """
+        Parameters
+        ----------
+        data : FDEMData
+        nlay : int [2]
+            Number of layers.
+        verbose : bool [False]
+        nProcs : int [1]
+            Number of worker processes. 0 uses all cores.
         """
         super(FDEM2dFOP, self).__init__(verbose)
         self.nlay = nlay
@@ -102,22 +146,72 @@ class FDEM2dFOP(pg.ModellingBase):
             self.J.addMatrixEntry(n, self.nf*2*i, npar*i)
 
         self.J.recalcMatrixSize()
-        print(self.J.rows(), self.J.cols())
+        if verbose:
+            print(self.J.rows(), self.J.cols())
+
+        if nProcs == 0:
+            nProcs = multiprocessing.cpu_count()
+        self.nProcs = nProcs
+        self.pool = None
+        if nProcs > 1:
+            self.pool = multiprocessing.Pool(
+                nProcs, _initFDEM1dWorker,
+                (nlay, np.asarray(data.freq()), data.coilSpacing,
+                 -data.height))
+
+    def __del__(self):
+        if self.pool is not None:
+            self.pool.terminate()
+
+    def columnModels(self, model):
+        """Model vector as (nx, 2*nlay-1) array of sounding models."""
+        return np.asarray(model).reshape((self.nlay*2-1, self.nx)).T
+
+    def mapColumns(self, modA, jacobian=False):
+        """Evaluate all soundings on the pool.
+
+        Returns the responses (nx, 2nf), or fills the jacobian blocks and
+        returns None if jacobian is True.
+        """
+        nChunks = min(self.nx, self.nProcs * 4)
+        chunks = [(modA[i::nChunks], jacobian) for i in range(nChunks)]
+        results = self.pool.map(_FDEM1dColumns, chunks)
+
+        if jacobian:
+            for i, (_, jaci) in enumerate(results):
+                for j, Ji in enumerate(jaci):
+                    self.FOP1d[i + j * nChunks].jacobianRef().setArray(Ji)
+            return None
+
+        resp = np.zeros((self.nx, self.nf * 2))
+        for i, (respi, _) in enumerate(results):
+            resp[i::nChunks] = respi
+
+        return resp
 
     def response(self, model):
         """
         """
-        modA = np.asarray(model).reshape((self.nlay*2-1, self.nx)).T
-        resp = pg.RVector(0)
-        for modi in modA:
-            resp = pg.cat(resp, self.FOP.response(modi))
+        modA = self.columnModels(model)
+        if self.pool is not None:
+            return pg.RVector(self.mapColumns(modA).ravel())
+
+        nd = self.nf * 2
+        resp = pg.RVector(self.nx * nd)
+        for i, modi in enumerate(modA):
+            resp.setVal(self.FOP.response(modi), i * nd, (i + 1) * nd)
 
         return resp
 
     def createJacobian(self, model):
-        modA = np.asarray(model).reshape((self.nlay*2-1, self.nx)).T
-        for i in range(self.nx):
-            self.FOP1d[i].createJacobian(modA[i])
+        modA = self.columnModels(model)
+        if self.pool is not None:
+            self.mapColumns(modA, jacobian=True)
+        else:
+            for i in range(self.nx):
+                self.FOP1d[i].createJacobian(modA[i])
+
+        self.J.recalcMatrixSize()
 
 
 class FDEMData():
@@ -1,8 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import hashlib
+import tempfile
+import multiprocessing
+
 import numpy as np
 
+import pygimli as pg
+
 #from geomagnetics import GeoMagT0, date
 
 mu0 = 4.0 * np.pi * 1e-7
@@ -13,9 +20,10 @@ G = 6.6742e-11 / 1e-5 # / mGal
 deltaACyl = lambda R__, rho__: 2. * np.pi * R__**2. * rho__ 
 #[m^2 * kg/m^3] = [kg/m]
 deltaMSph = lambda R__, rho__: 4./3. * np.pi * R__**3. * rho__ #[kg]
-rabs   = lambda r__: np.asarray([np.sqrt(x__.dot(x__)) for x__ in r__])
-gradR  = lambda r__: (r__.T / rabs(r__))
-adot = lambda M__, x__: np.asarray([(a__.dot(M__)) for a__ in x__]) 
+rabs   = lambda r__: np.sqrt(np.sum(np.asarray(r__, dtype=float)**2, axis=-1))
+# (dim, N) like the former r__.T / rabs(r__), (dim, N, B) for (B, N, dim)
+gradR  = lambda r__: (r__ / rabs(r__)[..., np.newaxis]).T
+adot = lambda M__, x__: np.sum(np.asarray(x__) * M__, axis=-1)
 
 def magnetization(lat, lon, suszept, dat=(2010,1,1)): 
     '''
@@ -48,6 +56,48 @@ def BZPoly(pnts, poly, M, openPoly=False):
     dg, dgz = calcPolyGz(pnts, poly, 1.0, openPoly)   
     return poissonEoetvoes(adot(M, -dgz))
    
+def _bodyRelative(r, pos, *args):
+    """
+    Stations relative to one or many bodies.
+
+    Parameters
+    ----------
+    r : array (N, dim)
+        Measurement points.
+    pos : array (dim) | (B, dim)
+        Body position(s).
+    *args : float | array (B)
+        Body parameters, e.g., radius and density.
+
+    Returns
+    -------
+    rel : array (N, dim) | (B, N, dim)
+        r - pos for one body or every body.
+    args : list
+        Body parameters shaped (B, 1) to broadcast with rel[..., 0] for many
+        bodies or unchanged for one body.
+    """
+    r = np.asarray(r, dtype=float)
+    pos = np.asarray(pos, dtype=float)
+
+    if pos.ndim > 1:
+        rel = r[np.newaxis, :, :] - pos[:, np.newaxis, :]
+        args = [np.reshape(np.asarray(a, dtype=float), (-1, 1))
+                for a in args]
+    else:
+        rel = r - pos
+
+    return rel, list(args)
+
+
+def _bodyMagnetization(M, pos):
+    """Magnetization M (3) | (B, 3) shaped to broadcast with the fields."""
+    M = np.asarray(M, dtype=float)
+    if M.ndim > 1 and np.asarray(pos).ndim > 1:
+        return M[:, np.newaxis, :]
+    return M
+
+
 def BaZSphere(pnts, R, pos, M):
     """
     Calculate the vertical component of the anomalous magnetic field Bz for a
@@ -60,18 +110,27 @@ def BaZSphere(pnts, R, pos, M):
     pnts :
         measurement points -- array[x,y,z]
     R :
-        radius -- float
+        radius -- float | array (B) for many spheres
     pos :
-        sphere center -- [x,y,z]
+        sphere center -- [x,y,z] | array (B, 3) for many spheres
     M :
-        magnetization -- [Mx, My, Mz]
+        magnetization -- [Mx, My, Mz] | array (B, 3) for many spheres
 
+    Returns
+    -------
+    Bz : array (N) | (B, N)
     """
-    return poissonEoetvoes(adot(M, gradGZSphere(pnts, R, rho=1.0, pos=pos)))
+    return poissonEoetvoes(adot(_bodyMagnetization(M, pos),
+                                gradGZSphere(pnts, R, rho=1.0, pos=pos)))
 
 def BaZCylinderHoriz(pnts, R, pos, M):
-    """"""
-    return poissonEoetvoes(adot(M,
+    """
+    Vertical component of the anomalous magnetic field Bz for one or many
+    horizontal cylinders, see :py:func:`BaZSphere`.
+
+    M is [Mx, Mz] or array (B, 2) for many cylinders.
+    """
+    return poissonEoetvoes(adot(_bodyMagnetization(M, pos),
                                 gradGZCylinderHoriz(pnts, R, rho=1.0, pos=pos)))
     
 def poissonEoetvoes(dg):
@@ -87,9 +146,19 @@ def uSphere(r, R, rho, pos=[0., 0., 0.]):
     
     Parameters
     ----------
-    
+    r : array (N, 3)
+        Measurement points.
+    R, rho : float | array (B)
+        Radius and density of one or many spheres.
+    pos : array (3) | (B, 3)
+        Center of one or many spheres.
+
+    Returns
+    -------
+    u : array (N) | (B, N)
     """
-    return -G * deltaMSph(R, rho) * 1. / rabs(r - pos)
+    rel, (R, rho) = _bodyRelative(r, pos, R, rho)
+    return -G * deltaMSph(R, rho) * 1. / rabs(rel)
 
 def gradUSphere(r, R, rho, pos=[0., 0., 0.]):
     """
@@ -101,16 +170,17 @@ def gradUSphere(r, R, rho, pos=[0., 0., 0.]):
     
     Parameters
     ----------
-    
+    See :py:func:`uSphere`.
+
     Returns
     -------
-    [gx, gy, gz] :
+    [gx, gy, gz] : array (N, 3) | (B, N, 3)
     
     """
-    
+    rel, (R, rho) = _bodyRelative(r, pos, R, rho)
     # gesucht eigentlich g_z aber nach unten als -z
-    return [1., 1., -1.] * (gradR(r - pos) * - \
-        G * deltaMSph(R, rho) * 1. / (rabs(r - pos)**2)).T
+    return [1., 1., -1.] * gradR(rel).T * \
+        (-G * deltaMSph(R, rho) * 1. / (rabs(rel)**2))[..., np.newaxis]
 #def gSphere(...)
     
 def gradGZSphere(r, R, rho, pos=[0., 0., 0.]):
@@ -119,36 +189,52 @@ def gradGZSphere(r, R, rho, pos=[0., 0., 0.]):
     
     Parameters
     ----------
-    
+    See :py:func:`uSphere`.
+
     Returns
     -------
-        [\d g_z /\dx, \d g_z /\dy, \d g_z /\dz]
+        [\d g_z /\dx, \d g_z /\dy, \d g_z /\dz] : array (N, 3) | (B, N, 3)
+
+    Note
+    ----
+    All components use the stations relative to the sphere center. Older
+    versions used the absolute station x and y and the depth of pos, which
+    is only correct for spheres below the origin and stations at z = 0.
     """
-    t = pos[2]
-    
-    gzxyz = np.asarray([-3.0 * t * r[:,0], 
-                        -3.0 * t * r[:,1], 
-                         2.0 * t*t - r[:,0]**2 - r[:,1]**2])
-    return (G * deltaMSph(R, rho) / rabs(r - pos)**5. * gzxyz).T
+    rel, (R, rho) = _bodyRelative(r, pos, R, rho)
+    x = rel[..., 0]
+    y = rel[..., 1]
+    t = -rel[..., 2]
+    
+    gzxyz = np.asarray([-3.0 * t * x,
+                        -3.0 * t * y,
+                         2.0 * t*t - x**2 - y**2])
+    gzxyz = np.rollaxis(gzxyz, 0, gzxyz.ndim)
+    return (G * deltaMSph(R, rho) / rabs(rel)**5.)[..., np.newaxis] * gzxyz
 
 
 def uCylinderHoriz(pnts, R, rho, pos=[0., 0.]):
     """
     Parameters
     ----------
-    
+    pnts : array (N, 2)
+        Measurement points.
+    R, rho : float | array (B)
+        Radius and density of one or many cylinders.
+    pos : array (2) | (B, 2)
+        Center of one or many cylinders.
+
     Returns
     -------
-    
+    u : array (N) | (B, N)
     """
-    u = np.zeros(len(pnts))
-    for i, r in enumerate(rabs(pnts-pos)):
-        if r > R:
-            u[i] = -2 * np.pi * G * R * R * rho * np.log(r / R)
-        else:
-            u[i] =    - np.pi * G * rho(r * r - R * R)
-    
-    return u
+    rel, (R, rho) = _bodyRelative(pnts, pos, R, rho)
+    r = rabs(rel)
+
+    with np.errstate(divide='ignore'):
+        return np.where(r > R,
+                        -2 * np.pi * G * R * R * rho * np.log(r / R),
+                        - np.pi * G * rho * (r * r - R * R))
     
     
 def gradUCylinderHoriz(r, R, rho, pos=[0., 0.]):
@@ -161,18 +247,19 @@ def gradUCylinderHoriz(r, R, rho, pos=[0., 0.]):
     Parameters
     ----------
     R   :
-        Cylinder radius in [meter]
+        Cylinder radius in [meter] | array (B)
     p   :
-        Cylinder center (x, z) 
+        Cylinder center (x, z) | array (B, 2)
     rho :
-        Density in [kg/m^3]
+        Density in [kg/m^3] | array (B)
         
     Returns
     -------
-       
+    [gx, gz] : array (N, 2) | (B, N, 2)
     """
-    return [1., -1.0] * (gradR(r - pos) * -G * \
-        deltaACyl(R, rho) * 1. / (rabs(r - pos))).T 
+    rel, (R, rho) = _bodyRelative(r, pos, R, rho)
+    return [1., -1.0] * gradR(rel).T * \
+        (-G * deltaACyl(R, rho) * 1. / rabs(rel))[..., np.newaxis]
 #def gZylinderHoriz():
 
 
@@ -182,24 +269,27 @@ def gradGZCylinderHoriz(r, R, rho, pos=[0., 0.]):
     
     Parameters
     ----------
-    r   :
-        
-    R   :
-        
-    rho :
-        Density in [kg/m^3]
+    See :py:func:`gradUCylinderHoriz`.
         
     Returns
     -------
-    grad gz, [gz_x, gz_z]
-    
+    grad gz, [gz_x, gz_z] : array (N, 2) | (B, N, 2)
+
+    Note
+    ----
+    Both components use the stations relative to the cylinder center. Older
+    versions used the absolute station x, which is only correct for
+    cylinders at x = 0.
     """
-    t = pos[1]
+    rel, (R, rho) = _bodyRelative(r, pos, R, rho)
+    x = rel[..., 0]
+    t = -rel[..., 1]
     
-    gz_xz = np.asarray([-2.0 * r[:,0]*(t - r[:,1]), 
-                         1.0 * (- r[:,0]**2 + (t - r[:,1])**2)])
+    gz_xz = np.asarray([-2.0 * x * t,
+                         1.0 * (- x**2 + t**2)])
+    gz_xz = np.rollaxis(gz_xz, 0, gz_xz.ndim)
     
-    return (G * deltaACyl(R, rho) / rabs(r - pos)**4. * gz_xz).T
+    return (G * deltaACyl(R, rho) / rabs(rel)**4.)[..., np.newaxis] * gz_xz
 #def gZSphere(...)
 
 
@@ -210,30 +300,26 @@ def gzHalfPlateHoriz(pnts, t, rho, pos=[0.0, 0.0]):
     Parameters
     ----------
     pnts   :
-        
+        Measurement points array (N, 2)
     t   :
-        
+        Plate thickness | array (B)
     rho :
-        Density in [kg/m^3]
+        Density in [kg/m^3] | array (B)
+    pos :
+        Plate edge [x, z] | array (B, 2)
         
     Returns
     -------
-    gz:
+    gz: array (N) | (B, N)
         z-component of g
         .. math:: \\nabla(\\partial u/\\partial \\vec{r})_z
     """
-    gz = np.zeros(len(pnts))
-    
-    for i, q in enumerate(pnts):
-        zz1 = q[1] - pos[1]
-        xx1 = q[0] - pos[0]
-        #gz[i] = G * rho * (np.pi - 2. * \
-        # np.arctan((q[0] - pos[0]) / (q[2] - pos[2])))
-        #in -z richtung
-        gz[i] = -G * rho * t*(np.pi + 2.0 * np.arctan2(xx1, zz1)) * -1.
-        #gz[i] = G * rho * (np.pi)
+    rel, (t, rho) = _bodyRelative(pnts, pos, t, rho)
+    xx1 = rel[..., 0]
+    zz1 = rel[..., 1]
 
-    return gz
+    #in -z richtung
+    return -G * rho * t * (np.pi + 2.0 * np.arctan2(xx1, zz1)) * -1.
 #def gzPlatteHoriz(...)
 
 def gradGZHalfPlateHoriz(pnts, t, rho, pos=[0.0, 0.0]):
@@ -245,29 +331,29 @@ def gradGZHalfPlateHoriz(pnts, t, rho, pos=[0.0, 0.0]):
     
     pnts : array (:math:`n\\times 2`)
         n 2 dimensional measurement points
-    t : float
+    t : float | array (B)
         Plate thickness in :math:`[\\text{m}]`
-    rho : float
+    rho : float | array (B)
         Density in :math:`[\\text{kg}/\\text{m}^3]`
+    pos : array (2) | (B, 2)
+        Plate edge
         
     Returns
     -------
     
-    gz : array
+    gz : array (N, 2) | (B, N, 2)
         Gradient of z-component of g 
         :math:`\\nabla(\\frac{\\partial u}{\\partial \\vec{r}}_z)`
     
     """
-    
-    gz = np.zeros((len(pnts), 2))
-    
-    for i, q in enumerate(pnts):
-        
-        zz1 = q[1] - pos[1]
-        xx1 = q[0] - pos[0]
-        
-        gz[i,0] = -2.0 * G * rho * t *((zz1)/(xx1*xx1 + zz1*zz1))
-        gz[i,1] =  2.0 * G * rho * t *((xx1)/(xx1*xx1 + zz1*zz1))
+    rel, (t, rho) = _bodyRelative(pnts, pos, t, rho)
+    xx1 = rel[..., 0]
+    zz1 = rel[..., 1]
+    r2 = xx1 * xx1 + zz1 * zz1
+
+    gz = np.zeros(rel.shape)
+    gz[..., 0] = -2.0 * G * rho * t * (zz1 / r2)
+    gz[..., 1] =  2.0 * G * rho * t * (xx1 / r2)
 
     return gz
 #def gzPlatteHoriz(...)
@@ -361,6 +447,85 @@ def lineIntegralZ_WonBevis(p1, p2):
     
     return np.asarray((Fx, 0.0, Fz)), np.asarray((Fzx, 0.0, Fzz))
 
+def lineIntegralZ_WonBevisVec(p1, p2):
+    """
+    WonBevis1987 for many line segments at once.
+
+    Vectorized version of :py:func:`lineIntegralZ_WonBevis` including all
+    special cases, i.e., segments that touch the origin, segments collinear
+    with the origin, (nearly) vertical segments and segments crossing the
+    negative x-axis.
+
+    Parameters
+    ----------
+    p1, p2 : array (..., 2)
+        Start and end points of the segments relative to the measurement
+        point. Both arrays need to be broadcastable.
+
+    Returns
+    -------
+    F, dF : array (..., 3)
+        g = -grad u =(Fx, 0.0, Fz), dFz(Fzx, Fzy, Fzz) for every segment
+    """
+    p1 = np.asarray(p1, dtype=float)
+    p2 = np.asarray(p2, dtype=float)
+
+    x1 = p1[..., 0]
+    z1 = p1[..., 1]
+    x2 = p2[..., 0]
+    z2 = p2[..., 1]
+
+    x21 = x2 - x1
+    z21 = z2 - z1
+    z21s = z21 * z21
+    x21s = x21 * x21
+
+    xz12 = x1 * z2 - x2 * z1
+
+    r1s = x1 * x1 + z1 * z1
+    r2s = x2 * x2 + z2 * z2
+    r21s = x21s + z21s
+
+    # segments touching the origin or collinear with it give no contribution
+    valid = (r1s > 0.0) & (r2s > 0.0) & (xz12 != 0.0)
+    vertical = np.abs(x21) < 1e-4
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        theta1 = np.arctan2(z1, x1)
+        theta2 = np.arctan2(z2, x2)
+
+        cross = np.sign(z1) != np.sign(z2)
+        theta1 = np.where(cross & (x1 * z2 < x2 * z1) & (z2 >= 0.0),
+                          theta1 + 2. * np.pi, theta1)
+        theta2 = np.where(cross & (x1 * z2 > x2 * z1) & (z1 >= 0.0),
+                          theta2 + 2. * np.pi, theta2)
+        th12 = theta1 - theta2
+
+        rln = 0.5 * np.log(r2s / r1s)
+
+        p = (xz12 / r21s) * ((x1 * x21 - z1 * z21) / r1s -
+                             (x2 * x21 - z2 * z21) / r2s)
+        q = (xz12 / r21s) * ((x1 * z21 + z1 * x21) / r1s -
+                             (x2 * z21 + z2 * x21) / r2s)
+
+        # default case
+        B = z21 / x21
+        A = (x21 * xz12) / r21s
+        fz = (th12 + B * rln) / r21s
+
+        Fz = np.where(vertical, x1 * rln, A * (th12 + B * rln))
+        Fx = np.where(vertical, 0.0, A * (-th12 * B + rln))
+        Fzz = np.where(vertical, -p, -p + x21s * fz)
+        Fzx = np.where(vertical, q - z21s / r21s * rln, q - x21 * z21 * fz)
+
+    F = np.zeros(Fz.shape + (3,))
+    dF = np.zeros(Fz.shape + (3,))
+    F[..., 0] = np.where(valid, Fx, 0.0)
+    F[..., 2] = np.where(valid, Fz, 0.0)
+    dF[..., 0] = np.where(valid, Fzx, 0.0)
+    dF[..., 2] = np.where(valid, Fzz, 0.0)
+    return F, dF
+
 def calcPolyGz(pnts, poly, density=1, openPoly=False, forceOpen=False):
     """
     Calculate 2D gravimetric response at given points for a polygon with
@@ -373,29 +538,29 @@ def calcPolyGz(pnts, poly, density=1, openPoly=False, forceOpen=False):
     (ötvös beziehung gl (9) ..... !!check this!!
     """
     
-    qpnts = pnts
+    qpnts = np.asarray(pnts, dtype=float)
     N = len(pnts)
     
     if np.size(pnts[0]) == 1:
-        qpnts = list(zip(pnts,np.zeros(N)))
+        qpnts = np.vstack((qpnts, np.zeros(N))).T
+
+    poly = np.asarray(poly, dtype=float)
     
     if not forceOpen:
         if np.linalg.norm(poly[0] - poly[-1], 2) < 1e-8: openPoly=True
-    
-    gz = np.zeros((N,3))
-    gzz = np.zeros((N,3))
-        
-    for i, p in enumerate(qpnts):
-        for j in range(len(poly) - (openPoly)):
-            a = poly[j]
-            b = poly[(j + 1)%len(poly)]
-        #    print "a, b", a, b
-            gzi, gzzi = lineIntegralZ_WonBevis(a - p, b - p)
-         
-          #  print gzi, gzzi
-            gz[i,:] += -gzi *[1.0, 1.0, -1.0]
-            gzz[i,:] += -gzzi 
 
+    # all edges relative to all measurement points: (N, nEdges, 2)
+    nEdges = len(poly) - (openPoly)
+    a = poly[:nEdges]
+    b = poly[(np.arange(nEdges) + 1) % len(poly)]
+
+    gzi, gzzi = lineIntegralZ_WonBevisVec(a[np.newaxis, :, :] -
+                                          qpnts[:, np.newaxis, 0:2],
+                                          b[np.newaxis, :, :] -
+                                          qpnts[:, np.newaxis, 0:2])
+
+    gz = -gzi.sum(axis=1) * [1.0, 1.0, -1.0]
+    gzz = -gzzi.sum(axis=1)
         
     return density * 2.0 * -G * gz, density * 2.0 * -G * gzz 
 # def calcPolydgdz()
@@ -544,33 +709,498 @@ def gravMagBoundarySinghGup(boundary):
     return np.asarray([Fx, Fy, Fz]), np.asarray([Fzx, Fzy, Fzz]), 
 
 
-def grav(mesh, pnts, rho):
-    """Return."""
-    dg = np.zeros((len(pnts), 3))
-    dgz = np.zeros((len(pnts), 3))
-    upoly = np.zeros(len(pnts))
-    
-    for i, p in enumerate(pnts):
-        mesh.translate(-p)
-                    
-        for b in mesh.boundaries():
-            if b.marker() != 0:
-                
-                if mesh.dimension() == 2:
-                    dgi, dgzi = lineIntegralZ_WonBevis(b.node(0).pos(),
-                                                       b.node(1).pos())
-                    dgi *= -2.0
-                    dgzi *= -2.0
-                else:
-                    dgi, dgzi = gravMagBoundarySinghGup(b)
-                
-        
-                dg[i]  += dgi * -G * rho
-                dgz[i] += dgzi * -G * rho
+def angleVec(p1, p2, p3, Un):
+    """
+    Vectorized version of :py:func:`angle` for arrays of points (..., 3)
+    and normals broadcastable to them.
+    """
+    inout = np.sign(np.sum(Un * p1, axis=-1))
+
+    # seen from inside; interchange p1 and p3
+    swap = (inout > 0)[..., np.newaxis]
+    q1 = np.where(swap, p3, p1)
+    q3 = np.where(swap, p1, p3)
+
+    # Normals
+    n1 = np.cross(p2, q1)
+    n2 = np.cross(p2, q3)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n1 = n1 / np.linalg.norm(n1, axis=-1)[..., np.newaxis]
+        n2 = n2 / np.linalg.norm(n2, axis=-1)[..., np.newaxis]
+
+        # sign of perp is -ve if points p1 p2 p3 are in cw order
+        perp = np.sign(np.sum(q3 * n1, axis=-1))
+        ang = np.arccos(np.clip(np.sum(n1 * n2, axis=-1), -1.0, 1.0))
+
+    ang = np.where(perp < 0, 2.0 * np.pi - ang, ang)
+    return np.where(inout == 0, 0.0, ang)
 
-        mesh.translate(p)
+
+def gravMagBoundarySinghGupVec(r, u):
+    """
+    Vectorized version of :py:func:`gravMagBoundarySinghGup`.
+
+    Calculate [Fx, Fy, FZ] and [Fzx, Fzy, Fzz] at the origin for many
+    polygonal faces with the same number of nodes at once.
+    After :cite:`SinghGup2001`
+
+    Parameters
+    ----------
+    r : array (..., k, 3)
+        Face nodes relative to the measurement point(s).
+    u : array (..., 3)
+        Unit normal vectors of the faces, broadcastable to r[..., 0, :].
+
+    Returns
+    -------
+    F, dF : array (..., 3)
+    """
+    r = np.asarray(r, dtype=float)
+    u = np.asarray(u, dtype=float)
+    k = r.shape[-2]
+
+    di = np.sum(r.mean(axis=-2) * u, axis=-1)
+
+    l = u[..., 0]
+    m = u[..., 1]
+    n = u[..., 2]
+
+    # Berechne Raumwinkel
+    W = 0.0
+    for i in range(k):
+        W = W + angleVec(r[..., i, :], r[..., (i + 1) % k, :],
+                         r[..., (i + 2) % k, :], u)
+    W = W - (k - 2) * np.pi
+
+    fsign = np.sign(np.sum(u * r[..., 0, :], axis=-1))
+    Omega = -fsign * W
+
+    P = 0.
+    Q = 0.
+    R = 0.
+    for i in range(k):
+        vr1 = r[..., i, :]
+        Lv = r[..., (i + 1) % k, :] - vr1
+
+        r1 = np.linalg.norm(vr1, axis=-1)
+        L = np.linalg.norm(Lv, axis=-1)
+
+        b = 2. * np.sum(vr1 * Lv, axis=-1)
+        b2 = b / L / 2.
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            I = np.where(r1 + b2 == 0,
+                         (1.0 / L) * np.log((L - r1) / r1),
+                         (1.0 / L) * np.log((np.sqrt(L * L + b + r1 * r1) +
+                                             L + b2) / (r1 + b2)))
+        P = P + I * Lv[..., 0]
+        Q = Q + I * Lv[..., 1]
+        R = R + I * Lv[..., 2]
+
+    Pd = -n # u.dot([0, 0, -1.0])
+
+    F = np.zeros(Omega.shape + (3,))
+    dF = np.zeros(Omega.shape + (3,))
+    # faces in the plane of the station do not contribute to F, but may be
+    # singular for stations on the prolongation of an edge
+    inPlane = di == 0.0
+    F[..., 0] = np.where(inPlane, 0.0, di * (l * Omega + n * Q - m * R))
+    F[..., 1] = np.where(inPlane, 0.0, di * (m * Omega + l * R - n * P))
+    F[..., 2] = np.where(inPlane, 0.0, di * (n * Omega + m * P - l * Q))
+    dF[..., 0] = Pd * (l * Omega + n * Q - m * R)
+    dF[..., 1] = Pd * (m * Omega + l * R - n * P)
+    dF[..., 2] = Pd * (n * Omega + m * P - l * Q)
+    return F, dF
+
+
+def boundaryArrays(mesh, bounds=None):
+    """
+    Read the node positions and normals of the given boundaries once.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+    bounds : list [None]
+        Boundaries to use. Default are all boundaries with marker != 0.
+
+    Returns
+    -------
+    faces : list
+        List of (bIdx, nodes, normals) for every occurring node count with
+        bIdx the position in bounds, nodes (B, k, 3) and normals (B, 3).
+    """
+    if bounds is None:
+        bounds = [b for b in mesh.boundaries() if b.marker() != 0]
+
+    groups = dict()
+    for i, b in enumerate(bounds):
+        nodes = [[n.pos()[0], n.pos()[1], n.pos()[2]] for n in b.nodes()]
+        norm = b.shape().norm()
+        groups.setdefault(len(nodes), []).append((i, nodes,
+                                                  [norm[0], norm[1], norm[2]]))
+
+    faces = []
+    for k in sorted(groups.keys()):
+        bIdx, nodes, normals = zip(*groups[k])
+        faces.append((np.asarray(bIdx, dtype=int),
+                      np.asarray(nodes, dtype=float),
+                      np.asarray(normals, dtype=float)))
+    return faces
+
+
+def boundaryGravKernel(pnts, faces, dim):
+    """
+    Station relative gravimetric kernel for all stations and all boundaries.
+
+    Parameters
+    ----------
+    pnts : array (N, 2|3)
+        Measurement points.
+    faces : list
+        Boundary data from :py:func:`boundaryArrays`.
+    dim : int
+        Mesh dimension. 2D uses :py:func:`lineIntegralZ_WonBevisVec`,
+        3D uses :py:func:`gravMagBoundarySinghGupVec`.
+
+    Returns
+    -------
+    dg, dgz : array (N, B, 3)
+        Contribution of every boundary for a density of 1.
+    """
+    pnts = np.asarray(pnts, dtype=float)
+    nB = sum([len(f[0]) for f in faces])
+
+    dg = np.zeros((len(pnts), nB, 3))
+    dgz = np.zeros((len(pnts), nB, 3))
+
+    for bIdx, nodes, normals in faces:
+        if dim == 2:
+            p = pnts[:, np.newaxis, 0:2]
+            dgi, dgzi = lineIntegralZ_WonBevisVec(
+                nodes[np.newaxis, :, 0, 0:2] - p,
+                nodes[np.newaxis, :, 1, 0:2] - p)
+            dgi *= -2.0
+            dgzi *= -2.0
+        else:
+            p = np.zeros((len(pnts), 3))
+            p[:, 0:pnts.shape[1]] = pnts
+            dgi, dgzi = gravMagBoundarySinghGupVec(
+                nodes[np.newaxis, :, :, :] - p[:, np.newaxis, np.newaxis, :],
+                normals[np.newaxis, :, :])
+
+        dg[:, bIdx] = dgi * -G
+        dgz[:, bIdx] = dgzi * -G
+
+    return dg, dgz
+
+
+def _gravChunk(args):
+    """Process pool worker for :py:func:`grav`."""
+    pnts, faces, dim, rho = args
+    dg, dgz = boundaryGravKernel(pnts, faces, dim)
+    return (np.einsum('nbi,b->ni', dg, rho),
+            np.einsum('nbi,b->ni', dgz, rho))
+
+
+def grav(mesh, pnts, rho, chunkSize=256, nProcs=1):
+    """
+    Gravimetric response of all marked boundaries (marker != 0) of the mesh.
+
+    The boundary node positions are read once and all stations are
+    evaluated in batches of chunkSize stations, optionally distributed on a
+    process pool.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+        2D mesh with edges or 3D mesh with faces that describe the body.
+    pnts : array (N, 2|3)
+        Measurement points.
+    rho : float | array
+        Density (contrast) for all or for each marked boundary.
+    chunkSize : int [256]
+        Number of stations evaluated at once.
+    nProcs : int [1]
+        Number of worker processes. Values > 1 distribute the chunks on a
+        multiprocessing pool.
+
+    Returns
+    -------
+    dg, dgz : array (N, 3)
+    """
+    faces = boundaryArrays(mesh)
+    nB = sum([len(f[0]) for f in faces])
+    rho = np.ones(nB) * rho
+
+    pnts = np.asarray(pnts, dtype=float)
+    chunks = [(pnts[i:i + chunkSize], faces, mesh.dimension(), rho)
+              for i in range(0, len(pnts), chunkSize)]
+
+    if nProcs > 1 and len(chunks) > 1:
+        pool = multiprocessing.Pool(nProcs)
+        try:
+            results = pool.map(_gravChunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_gravChunk(c) for c in chunks]
+
+    if len(results) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+
+    dg = np.vstack([r[0] for r in results])
+    dgz = np.vstack([r[1] for r in results])
 
     return dg * [1.0, 1.0, -1.0], dgz
+
+def cellFaceArrays(mesh):
+    """
+    Read the outward oriented faces of all mesh cells once.
+
+    In 2D the cell edges are ordered counterclockwise (x to the right, y
+    upwards), in 3D the nodes of every cell boundary are ordered such that
+    the face normal points out of the cell. So a positive density gives a
+    positive gz at stations above the cell in both cases.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+
+    Returns
+    -------
+    faces : list
+        List of (cIdx, nodes, normals) for every occurring face node count
+        with cIdx the cell of each face, nodes (F, k, 3) and normals (F, 3).
+        Normals are None in 2D where every face is an edge (F, 2, 3).
+    """
+    groups = dict()
+    for c in mesh.cells():
+        pos = np.asarray([[n.pos()[0], n.pos()[1], n.pos()[2]]
+                          for n in c.nodes()])
+
+        if mesh.dimension() == 2:
+            x, y = pos[:, 0], pos[:, 1]
+            if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0.0:
+                pos = pos[::-1]
+            for i in range(len(pos)):
+                groups.setdefault(2, []).append(
+                    (c.id(), [pos[i], pos[(i + 1) % len(pos)]], None))
+        else:
+            center = pos.mean(axis=0)
+            for i in range(c.boundaryCount()):
+                nodes = np.asarray([[n.pos()[0], n.pos()[1], n.pos()[2]]
+                                    for n in c.boundaryNodes(i)])
+                norm = np.cross(nodes[1] - nodes[0], nodes[2] - nodes[0])
+                norm /= np.linalg.norm(norm)
+                if norm.dot(nodes.mean(axis=0) - center) < 0.0:
+                    nodes = nodes[::-1]
+                    norm *= -1.0
+                groups.setdefault(len(nodes), []).append((c.id(), nodes,
+                                                          norm))
+
+    faces = []
+    for k in sorted(groups.keys()):
+        cIdx, nodes, normals = zip(*groups[k])
+        if normals[0] is None:
+            normals = None
+        else:
+            normals = np.asarray(normals, dtype=float)
+        faces.append((np.asarray(cIdx, dtype=int),
+                      np.asarray(nodes, dtype=float), normals))
+    return faces
+
+
+def cellGravKernel(pnts, faces, dim, nCells=None):
+    """
+    Gravimetric kernel for all stations and all cells.
+
+    Parameters
+    ----------
+    pnts : array (N, 2|3)
+        Measurement points.
+    faces : list
+        Cell faces from :py:func:`cellFaceArrays`.
+    dim : int
+        Mesh dimension.
+    nCells : int [None]
+        Number of cells. Default is the largest cell index + 1.
+
+    Returns
+    -------
+    dg, dgz : array (N, C, 3)
+        Response of every cell for a density of 1, with the sign
+        conventions of :py:func:`gradUSphere` and
+        :py:func:`gradUCylinderHoriz`, i.e., gz is positive above a cell.
+    """
+    pnts = np.asarray(pnts, dtype=float)
+    if pnts.ndim == 1:
+        pnts = np.vstack((pnts, np.zeros(len(pnts)))).T
+
+    if nCells is None:
+        nCells = max([f[0].max() for f in faces]) + 1
+
+    # accumulated (C, N, 3) so the cell index is the leading axis for add.at
+    dg = np.zeros((nCells, len(pnts), 3))
+    dgz = np.zeros((nCells, len(pnts), 3))
+
+    for cIdx, nodes, normals in faces:
+        if dim == 2:
+            p = pnts[:, np.newaxis, 0:2]
+            dgi, dgzi = lineIntegralZ_WonBevisVec(
+                nodes[np.newaxis, :, 0, 0:2] - p,
+                nodes[np.newaxis, :, 1, 0:2] - p)
+            dgi *= 2.0 * G
+            dgzi *= 2.0 * G
+        else:
+            p = np.zeros((len(pnts), 3))
+            p[:, 0:pnts.shape[1]] = pnts
+            dgi, dgzi = gravMagBoundarySinghGupVec(
+                nodes[np.newaxis, :, :, :] - p[:, np.newaxis, np.newaxis, :],
+                normals[np.newaxis, :, :])
+            dgi *= -G
+            dgzi *= -G
+
+        np.add.at(dg, cIdx, dgi.transpose(1, 0, 2))
+        np.add.at(dgz, cIdx, dgzi.transpose(1, 0, 2))
+
+    dg = dg.transpose(1, 0, 2) * [1.0, 1.0, -1.0]
+    return dg, dgz.transpose(1, 0, 2)
+
+
+class KernelMatrix(pg.MatrixBase):
+    """
+    Matrix interface for a (memory-mapped) numpy kernel.
+
+    Used as jacobian by :py:class:`GravMagModelling` so that the kernel is
+    never copied into a :gimliapi:`GIMLI::RMatrix`.
+    """
+    def __init__(self, kernel):
+        pg.MatrixBase.__init__(self)
+        self.kernel = kernel
+
+    def rows(self):
+        return self.kernel.shape[0]
+
+    def cols(self):
+        return self.kernel.shape[1]
+
+    def mult(self, b):
+        return pg.RVector(self.kernel.dot(np.asarray(b)))
+
+    def transMult(self, b):
+        return pg.RVector(self.kernel.T.dot(np.asarray(b)))
+
+
+class GravMagModelling(pg.ModellingBase):
+    """
+    Linear gravimetric or magnetic forward operator for cell-wise models.
+
+    The kernel (sensitivity) matrix is assembled once and every response is
+    a single matrix-vector product. The kernel is stored as .npy file,
+    keyed by a hash of the cell geometry, the stations and the component,
+    and reopened memory-mapped, so repeated setups with the same mesh and
+    stations load it from disk without recalculation.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+        2D or 3D mesh. The model holds one value per cell.
+    pnts : array (N, 2|3)
+        Measurement points.
+    M : array [None]
+        Magnetization [Mx, My, Mz]. If given the kernel computes the
+        vertical component of the anomalous magnetic field (see
+        :py:func:`BZPoly`), else the vertical gravity gz in mGal.
+    cacheDir : str [None]
+        Directory for the kernel files. Default is the system temp dir.
+        Set cache=False to keep the kernel in memory only.
+    cache : bool [True]
+    chunkSize : int [256]
+        Number of stations evaluated at once.
+    verbose : bool [False]
+    """
+    def __init__(self, mesh, pnts, M=None, cacheDir=None, cache=True,
+                 chunkSize=256, verbose=False):
+        super(GravMagModelling, self).__init__(verbose)
+        self.mesh_ = mesh
+        self.setMesh(self.mesh_)
+
+        self.pnts = np.asarray(pnts, dtype=float)
+        self.M = M
+        self.chunkSize = chunkSize
+        self.kernelFile = None
+
+        faces = cellFaceArrays(mesh)
+
+        if cache:
+            if cacheDir is None:
+                cacheDir = tempfile.gettempdir()
+            self.kernelFile = os.path.join(cacheDir, 'gravMagKernel-' +
+                                           self.kernelHash(faces) + '.npy')
+
+        if self.kernelFile is not None and os.path.exists(self.kernelFile):
+            if verbose:
+                print("Loading kernel: " + self.kernelFile)
+            self.kernel = np.load(self.kernelFile, mmap_mode='r')
+        else:
+            self.kernel = self.createKernel(faces)
+
+        self.J = KernelMatrix(self.kernel)
+        self.setJacobian(self.J)
+
+    def kernelHash(self, faces):
+        """Hash of cell geometry, stations and component."""
+        sha = hashlib.sha1()
+        sha.update(str(self.mesh_.dimension()).encode())
+        for cIdx, nodes, normals in faces:
+            sha.update(np.ascontiguousarray(cIdx).tobytes())
+            sha.update(np.ascontiguousarray(nodes).tobytes())
+        sha.update(np.ascontiguousarray(self.pnts).tobytes())
+        if self.M is not None:
+            sha.update(np.asarray(self.M, dtype=float).tobytes())
+        return sha.hexdigest()
+
+    def createKernel(self, faces):
+        """Assemble the kernel station chunk wise, on disk if cached."""
+        shape = (len(self.pnts), self.mesh_.cellCount())
+
+        if self.kernelFile is not None:
+            tmpName = self.kernelFile + '.' + str(os.getpid()) + '.tmp'
+            kernel = np.lib.format.open_memmap(tmpName, mode='w+',
+                                               dtype=float, shape=shape)
+        else:
+            kernel = np.zeros(shape)
+
+        for i in range(0, len(self.pnts), self.chunkSize):
+            dg, dgz = cellGravKernel(self.pnts[i:i + self.chunkSize], faces,
+                                     self.mesh_.dimension(), shape[1])
+            if self.M is None:
+                kernel[i:i + self.chunkSize] = dg[:, :, 2]
+            else:
+                kernel[i:i + self.chunkSize] = \
+                    poissonEoetvoes(-dgz.dot(np.asarray(self.M, dtype=float)))
+
+        if self.kernelFile is not None:
+            kernel.flush()
+            del kernel
+            os.rename(tmpName, self.kernelFile)
+            kernel = np.load(self.kernelFile, mmap_mode='r')
+
+        return kernel
+
+    def response(self, model):
+        """Kernel times cell-wise density (or susceptibility) model."""
+        return pg.RVector(self.kernel.dot(np.asarray(model)))
+
+    def createJacobian(self, model):
+        """The problem is linear, the jacobian is the kernel itself."""
+        pass
+
+    def jacobian(self):
+        return self.J
+
     
 def buildCircle(pos, radius, segments=12, leftDirection=True):
     """
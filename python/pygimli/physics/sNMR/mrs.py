@@ -23,48 +23,99 @@ import time
 class MRS1dBlockQTModelling( pg.ModellingBase ):
     """
     MRS1dBlockQTModelling - pygimli modelling class for block-mono QT inversion
-    f=MRS1dBlockQTModelling(lay, KR, KI, zvec, t, verbose = False  )
+    f=MRS1dBlockQTModelling(lay, K, zvec, t, verbose = False  )
+
+    The kernel is integrated over the layers by one matrix product and the
+    mono-exponential decays enter as outer product, i.e.
+    A = (K W) diag(wc) E with the layer weights W (nz-1 x nlay) and the
+    decays E (nlay x nt). The jacobian is computed analytically.
     """
     def __init__( self, nlay, K, zvec, t, verbose = False  ):
         """ constructor with number of layers, kernel, z and t vectors """
         mesh = pg.createMesh1DBlock( nlay, 2 ) # thk, wc, T2*
-        pg.ModellingBase.__init__( self, mesh )
-        self.K_ = K
+        pg.ModellingBase.__init__( self, mesh, verbose )
+        self.K_ = np.asarray( K )
         self.zv_ = np.array( zvec )
         self.nl_ = nlay
         self.nq_ = len(K)
         self.t_  = np.array(t)
         self.nt_ = len(t)
+        self.J_ = pg.RMatrix()
+        self.setJacobian( self.J_ )
 
-    def response( self, par ):
-        """ yield model response cube as vector """
-        nl=self.nl_
-        thk = par( 0, nl-1 )
-        wc  = par( nl-1, 2*nl-1 )
-        t2  = par( 2*nl-1, 3*nl-1 )
+    def layerWeights( self, thk ):
+        """ weights W of the kernel cells for every layer (wc=1) and their
+        derivatives dW with respect to the depth of every layer boundary """
+        nl = self.nl_
         zthk = np.cumsum(thk)
         zv = self.zv_
         lzv = len(zv)
         izvec = np.zeros(nl+1,np.int32)
         rzvec = np.zeros(nl+1)
+        drzvec = np.zeros(nl+1)
         for i in range(nl-1):
             ii = (zv<zthk[i]).argmin()
             izvec[i+1] = ii
             if ii <= len(zv):
-                rzvec[i+1]=(zthk[i]-zv[ii-1])/(zv[ii]-zv[ii-1])
+                drzvec[i+1] = 1.0 / (zv[ii]-zv[ii-1])
+                rzvec[i+1]=(zthk[i]-zv[ii-1]) * drzvec[i+1]
 
         izvec[-1] = lzv-1
-        A = np.zeros((self.nq_,self.nt_),dtype=complex)
+        W = np.zeros((lzv-1, nl))
+        dW = np.zeros((nl-1, lzv-1, nl))
         for i in range(nl):
-            wcvec = np.zeros(lzv-1)
-            wcvec[izvec[i]:izvec[i+1]] = wc[i]
-            if izvec[i+1]<lzv: wcvec[izvec[i+1]-1]=wc[i]*rzvec[i+1]
-            if izvec[i]>0: wcvec[izvec[i]-1]=wc[i]*(1-rzvec[i])
-            amps=np.dot(self.K_,wcvec)
-            for ii,a in enumerate(A): a += np.exp(-self.t_/t2[i])*amps[ii]
+            W[izvec[i]:izvec[i+1], i] = 1.0
+            if izvec[i+1]<lzv:
+                W[izvec[i+1]-1, i] = rzvec[i+1]
+                dW[:, izvec[i+1]-1, i] = 0.0
+                if i < nl-1: dW[i, izvec[i+1]-1, i] = drzvec[i+1]
+            if izvec[i]>0:
+                W[izvec[i]-1, i] = 1.0 - rzvec[i]
+                dW[:, izvec[i]-1, i] = 0.0
+                dW[i-1, izvec[i]-1, i] = -drzvec[i]
+
+        return W, dW
+
+    def splitModel( self, par ):
+        """ thickness, water content and decay time vectors """
+        par = np.asarray( par )
+        nl = self.nl_
+        return par[:nl-1], par[nl-1:2*nl-1], par[2*nl-1:3*nl-1]
 
+    def response( self, par ):
+        """ yield model response cube as vector """
+        thk, wc, t2 = self.splitModel( par )
+        W, dW = self.layerWeights( thk )
+        E = np.exp( -np.outer( 1.0 / t2, self.t_ ) )
+        A = np.dot( np.dot( self.K_, W ) * wc, E )
         return pg.asvector( np.abs(A).ravel() )
 
+    def createJacobian( self, par ):
+        """ analytic jacobian of the amplitudes (thk, wc, t2 columns) """
+        thk, wc, t2 = self.splitModel( par )
+        nl = self.nl_
+        W, dW = self.layerWeights( thk )
+        E = np.exp( -np.outer( 1.0 / t2, self.t_ ) )
+        KW = np.dot( self.K_, W ) # nq x nl
+        A = np.dot( KW * wc, E )
+
+        dA = np.zeros( (3*nl-1, self.nq_, self.nt_), dtype=complex )
+        # layer boundary depths, then cumulative for the thicknesses
+        KdW = np.einsum( 'qz,kzl->kql', self.K_, dW )
+        dAdz = np.einsum( 'kql,lt->kqt', KdW * wc, E )
+        dA[:nl-1] = np.cumsum( dAdz[::-1], axis=0 )[::-1]
+        dA[nl-1:2*nl-1] = KW.T[:, :, np.newaxis] * E[:, np.newaxis, :]
+        dA[2*nl-1:] = dA[nl-1:2*nl-1] * \
+            ( wc[:, np.newaxis] * self.t_ / t2[:, np.newaxis]**2 )[:, np.newaxis, :]
+
+        absA = np.abs( A )
+        absA[absA == 0.0] = np.inf
+        J = ( np.real( np.conj(A) * dA ) / absA ).reshape( 3*nl-1, -1 ).T
+
+        self.J_.setArray( J )
+
+        self.setJacobian( self.J_ )
+
 # plotting functions (just a copy for now, later from pygimli.mplviewer)
 def drawModel1D(ax, thickness, values, plotfunction='plot',
                 xlabel='', *args, **kwargs):
@@ -227,9 +278,7 @@ class MRS():
         else: # try load real/imag parts (backward compat.)
             KR = pg.RMatrix(name + 'KR.bmat')
             KI = pg.RMatrix(name + 'KI.bmat')
-            self.K = np.zeros( (KR.rows(),KR.cols()), dtype='complex' )
-            for i in range(KR.rows()):
-                self.K[i] = np.array(KR[i]) + np.array(KI[i])*1j
+            self.K = gmat2numpy(KR) + gmat2numpy(KI)*1j
 
     def loadZVector(self,filename='zkernel.vec'):
         ''' load the kernel discretisation '''
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Shot-parallel Dijkstra traveltime modelling.
+
+Same rays and sensitivities as :gimliapi:`GIMLI::TravelTimeDijkstraModelling`
+but the graph is a read-only scipy.sparse matrix that is shared by all shots.
+The shortest path trees of the shots are calculated in a process pool and are
+cached, so a model that only differs by a factor from the last one, e.g.,
+during a line search, needs no new graph and no new shortest paths.
+"""
+
+import os
+import time
+import multiprocessing
+
+import numpy as np
+import pygimli as pg
+
+from pygimli.utils import toSparseMapMatrix
+
+from .fastMarching import TravelTimeFMMModelling
+
+
+def _pairKeys(cellNodes, k, tetra=False):
+    """
+    Node pairs (a < b) of cells with k nodes: the graph edges, i.e.,
+    consecutive nodes plus the two tetrahedron diagonals, and all pairs.
+    """
+    edges = [(j, (j + 1) % k) for j in range(k)]
+    if tetra:
+        edges += [(0, 2), (1, 3)]
+    pairs = [(i, j) for i in range(k) for j in range(i + 1, k)]
+
+    def _keys(idx):
+        a = cellNodes[:, [i for i, j in idx]]
+        b = cellNodes[:, [j for i, j in idx]]
+        return np.minimum(a, b), np.maximum(a, b)
+
+    return _keys(edges), _keys(pairs)
+
+
+class DijkstraGraph(object):
+    """
+    Edge structure of a mesh for Dijkstra's shortest paths.
+
+    The edges are the same as in
+    :gimliapi:`GIMLI::TravelTimeDijkstraModelling::createGraph`. The
+    weight of an edge is its length times the smallest slowness of the
+    cells defining the edge. Unlike createGraph, this also holds for the
+    tetrahedron edges 0-2 and 1-3, whose weights createGraph overwrites
+    with the one of the last cell. So for tetrahedral meshes with varying
+    slowness the traveltimes can be smaller than the C++ ones.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+
+    adjacency : :py:class:`pygimli.meshtools.MeshAdjacency`
+        Topology of the mesh.
+
+    Attributes
+    ----------
+    edgeA, edgeB : array
+        Node ids of the edges with edgeA < edgeB.
+
+    length : array
+        Length of the edges.
+    """
+    def __init__(self, mesh, adjacency):
+        nNodes = mesh.nodeCount()
+        self.nNodes = nNodes
+
+        nCellNodes = np.diff(adjacency.cellPtr)
+
+        defA, defB, defCell = [], [], []
+        shareA, shareB, shareCell = [], [], []
+        for k in np.unique(nCellNodes):
+            cIds = np.nonzero(nCellNodes == k)[0]
+            cn = adjacency.cellNodes[adjacency.cellPtr[cIds][:, None] +
+                                     np.arange(k)]
+            # 3D cells with 4 or 10 nodes are (quadratic) tetrahedrons
+            tetra = mesh.dimension() == 3 and k in (4, 10)
+            (a, b), (pa, pb) = _pairKeys(cn, k, tetra)
+            defA.append(a.ravel())
+            defB.append(b.ravel())
+            defCell.append(np.repeat(cIds, a.shape[1]))
+            shareA.append(pa.ravel())
+            shareB.append(pb.ravel())
+            shareCell.append(np.repeat(cIds, pa.shape[1]))
+
+        defKeys = np.concatenate(defA) * nNodes + np.concatenate(defB)
+        self.keys, defEdge = np.unique(defKeys, return_inverse=True)
+        self.defEdge = defEdge.ravel()
+        self.defCell = np.concatenate(defCell)
+
+        self.edgeA = self.keys // nNodes
+        self.edgeB = self.keys % nNodes
+        d = adjacency.pos[self.edgeA] - adjacency.pos[self.edgeB]
+        self.length = np.sqrt(np.sum(d**2, axis=1))
+
+        # cells that contain both nodes of an edge (for the jacobian)
+        shareKeys = np.concatenate(shareA) * nNodes + np.concatenate(shareB)
+        shareCell = np.concatenate(shareCell)
+        shareEdge = np.searchsorted(self.keys, shareKeys)
+        shareEdge[shareEdge == len(self.keys)] = 0
+        isEdge = self.keys[shareEdge] == shareKeys
+        self.shareEdge = shareEdge[isEdge]
+        self.shareCell = shareCell[isEdge]
+
+    def edgeIds(self, a, b):
+        """Edge ids for the node pairs (a, b)."""
+        return np.searchsorted(self.keys, np.minimum(a, b) * self.nNodes +
+                               np.maximum(a, b))
+
+    def matrix(self, slowness):
+        """
+        Weighted graph for cell slowness as upper triangular
+        scipy.sparse.csr_matrix to be used with directed=False.
+        """
+        from scipy.sparse import csr_matrix
+
+        w = np.full(len(self.keys), np.inf)
+        np.minimum.at(w, self.defEdge,
+                      self.length[self.defEdge] * slowness[self.defCell])
+        return csr_matrix((w, (self.edgeA, self.edgeB)),
+                          shape=(self.nNodes, self.nNodes))
+
+    def edgeSensitivity(self, slowness, markers, nModel, dequal=1e-3):
+        """
+        Sensitivity of every edge as CSR (ptr, model index, value).
+
+        The edge length is shared equally by the cells of the edge with
+        the smallest slowness.
+        """
+        e, c = self.shareEdge, self.shareCell
+        s = slowness[c]
+        sMin = np.full(len(self.keys), np.inf)
+        np.minimum.at(sMin, e, s)
+
+        fast = (s > 0.0) & (np.abs(s / sMin[e] - 1.0) < dequal)
+        nFast = np.bincount(e[fast], minlength=len(self.keys))
+        valid = fast & (markers[c] >= 0) & (markers[c] < nModel)
+
+        e, m = e[valid], markers[c[valid]]
+        perm = np.argsort(e, kind='mergesort')
+        e, m = e[perm], m[perm]
+        ptr = np.zeros(len(self.keys) + 1, dtype=int)
+        ptr[1:] = np.cumsum(np.bincount(e, minlength=len(self.keys)))
+        return ptr, m, self.length[e] / nFast[e]
+
+
+def shotPaths(pred, shot, receivers):
+    """
+    Trace the shortest paths from the receivers back to the shot.
+
+    Parameters
+    ----------
+    pred : array
+        Predecessor of every node in the shortest path tree of the shot.
+
+    shot : int
+        Shot node.
+
+    receivers : array
+        Receiver nodes.
+
+    Returns
+    -------
+    idx, a, b : array
+        Index into receivers and the two nodes for every path segment.
+    """
+    idx, a, b = [], [], []
+    active = np.arange(len(receivers))
+    node = np.asarray(receivers, dtype=int)
+
+    while len(active) > 0:
+        keep = (node != shot) & (pred[node] >= 0)
+        active, node = active[keep], node[keep]
+        parent = pred[node]
+        idx.append(active)
+        a.append(node)
+        b.append(parent)
+        node = parent
+
+    return np.concatenate(idx), np.concatenate(a), np.concatenate(b)
+
+
+__DijkstraShared__ = None
+
+
+def _initDijkstraWorker(G, shots, times, pred, shape):
+    """Graph and shared result arrays, once per worker process."""
+    global __DijkstraShared__
+    __DijkstraShared__ = (G, shots,
+                          np.ctypeslib.as_array(times).reshape(shape),
+                          np.ctypeslib.as_array(pred).reshape(shape))
+
+
+def _dijkstraChunk(c):
+    """
+    Shortest paths of the shots c, written into the shared arrays.
+    Returns (process id, number of shots, start, end time).
+    """
+    from scipy.sparse.csgraph import dijkstra
+
+    G, shots, times, pred = __DijkstraShared__
+    tic = time.time()
+    times[c], pred[c] = dijkstra(G, directed=False, indices=shots[c],
+                                 return_predecessors=True)
+    return os.getpid(), len(c), tic, time.time()
+
+
+class TravelTimeDijkstraParallelModelling(TravelTimeFMMModelling):
+    """
+    Shot-parallel Dijkstra traveltime modelling.
+
+    Replacement for :gimliapi:`GIMLI::TravelTimeDijkstraModelling` with the
+    same results, except for the tetrahedron edges described in
+    :py:class:`DijkstraGraph`. Shot and receiver nodes, mesh and region
+    handling are shared with :py:class:`TravelTimeFMMModelling`.
+
+    The shots are distributed over nProcs worker processes that run
+    scipy.sparse.csgraph.dijkstra on the same read-only graph (dijkstra holds
+    the GIL, so threads would run one after another). The graph is passed
+    once per worker and the distances and shortest path trees are written
+    into shared memory. They are cached for all shots. If the next model is
+    the last one times a factor, the traveltimes are scaled and the jacobian
+    is kept, since the rays do not change.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+
+    data : :gimliapi:`GIMLI::DataContainer`
+
+    verbose : bool [False]
+
+    nProcs : int [0]
+        Number of worker processes, 0 uses all cpus.
+
+    Attributes
+    ----------
+    workerStats : list
+        (process id, number of shots, start, end time) for every chunk of
+        shots of the last shortest path calculation.
+    """
+    def __init__(self, mesh, data, verbose=False, nProcs=0):
+        TravelTimeFMMModelling.__init__(self, mesh, data, verbose)
+        self.nProcs = nProcs or multiprocessing.cpu_count()
+        self._graph = None
+        self._shots = None
+        self._jacobianKey = None
+        self.graphCount = 0
+        self.dijkstraCount = 0
+        self.workerStats = []
+
+    def graph(self):
+        """Edge structure of the forward mesh, rebuilt if the mesh changes."""
+        adj = self.adjacency()
+        if self._graph is None or self._graph[0] is not adj:
+            self._graph = (adj, DijkstraGraph(self.mesh(), adj))
+            self._shots = None
+        return self._graph[1]
+
+    def _scale(self, s):
+        """Factor between s and the cached slowness or None."""
+        if self._shots is None:
+            return None
+
+        s0 = self._shots['slowness']
+        if len(s) != len(s0):
+            return None
+
+        bg = s0 >= 1e16
+        if np.any((s >= 1e16) != bg):
+            return None
+
+        a = s[~bg].dot(s0[~bg]) / s0[~bg].dot(s0[~bg])
+        if a > 0.0 and np.allclose(s[~bg], a * s0[~bg], rtol=1e-12, atol=0):
+            return a
+        return None
+
+    def shortestPaths(self, slowness):
+        """
+        Distances and predecessors of all shots for the slowness model.
+
+        Returns
+        -------
+        times : array (nShots, nNodes)
+            Traveltimes from every shot to all nodes.
+
+        pred : array (nShots, nNodes)
+            Predecessor of every node in the shortest path tree.
+
+        s : array
+            Cell slowness used for the shortest paths.
+        """
+        from multiprocessing.sharedctypes import RawArray
+
+        s = self.cellSlowness(slowness)
+        graph = self.graph()
+        shotNodes = self.shotReceiverNodes()[0]
+
+        shots = np.asarray(shotNodes, dtype=int)
+
+        a = self._scale(s)
+        if a is not None and np.array_equal(self._shots['shots'], shots):
+            sh = self._shots
+            if a != 1.0:
+                self._shots = dict(slowness=sh['slowness'] * a,
+                                   times=sh['times'] * a, pred=sh['pred'],
+                                   shots=shots, key=sh['key'])
+            return self._shots['times'], self._shots['pred'], \
+                self._shots['slowness']
+
+        G = graph.matrix(s)
+        self.graphCount += 1
+
+        nProcs = min(self.nProcs, max(len(shots), 1))
+        chunks = np.array_split(np.arange(len(shots)), nProcs)
+
+        shape = (len(shots), graph.nNodes)
+        rawTimes = RawArray('d', shape[0] * shape[1])
+        rawPred = RawArray('i', shape[0] * shape[1])
+        initArgs = (G, shots, rawTimes, rawPred, shape)
+
+        if nProcs > 1:
+            pool = multiprocessing.Pool(nProcs, _initDijkstraWorker,
+                                        initArgs)
+            try:
+                self.workerStats = pool.map(_dijkstraChunk, chunks,
+                                            chunksize=1)
+            finally:
+                pool.terminate()
+        else:
+            _initDijkstraWorker(*initArgs)
+            self.workerStats = [_dijkstraChunk(c) for c in chunks]
+
+        times = np.ctypeslib.as_array(rawTimes).reshape(shape)
+        pred = np.ctypeslib.as_array(rawPred).reshape(shape)
+
+        self.dijkstraCount += len(shots)
+        self._shots = dict(slowness=s, times=times, pred=pred, shots=shots,
+                           key=self.dijkstraCount)
+        return times, pred, s
+
+    def response(self, slowness):
+        """Traveltimes for the given slowness model."""
+        times, pred, s = self.shortestPaths(slowness)
+        shotNodes, shotIdx, recNodes = self.shotReceiverNodes()
+        return pg.RVector(times[shotIdx, recNodes])
+
+    def createJacobian(self, slowness):
+        """
+        Path lengths in every model cell for all data. Nothing is done if
+        the rays did not change since the last call.
+        """
+        from scipy.sparse import csr_matrix
+
+        times, pred, s = self.shortestPaths(slowness)
+        if self._jacobianKey == self._shots['key']:
+            return
+
+        graph = self.graph()
+        shotNodes, shotIdx, recNodes = self.shotReceiverNodes()
+        markers = np.asarray(self.mesh().cellMarker(), dtype=int)
+        nModel = self.regionManager().parameterCount()
+        ePtr, eCol, eVal = graph.edgeSensitivity(s, markers, nModel)
+
+        rows, cols, vals = [], [], []
+        for i, shot in enumerate(shotNodes):
+            data = np.nonzero(shotIdx == i)[0]
+            idx, a, b = shotPaths(pred[i], shot, recNodes[data])
+            e = graph.edgeIds(a, b)
+            n = ePtr[e + 1] - ePtr[e]
+            pos = np.repeat(ePtr[e] - np.cumsum(n) + n, n) + \
+                np.arange(n.sum())
+            rows.append(np.repeat(data[idx], n))
+            cols.append(eCol[pos])
+            vals.append(eVal[pos])
+
+        J = csr_matrix((np.concatenate(vals),
+                        (np.concatenate(rows), np.concatenate(cols))),
+                       shape=(len(recNodes), nModel))
+        J.sum_duplicates()
+        toSparseMapMatrix(J, self.J)
+
+        self._jacobianKey = self._shots['key']
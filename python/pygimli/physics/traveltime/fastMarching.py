@@ -0,0 +1,459 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Fast marching solver for the Eikonal equation
+
+.. math::
+    |\\nabla t| = s
+
+on unstructured 2D and 3D meshes, where :math:`t` denote traveltime for a
+cell wise constant slowness :math:`s`.
+
+The mesh topology is taken from the compressed (CSR) index arrays of
+:py:class:`pygimli.meshtools.MeshAdjacency` and the narrow band is a single
+binary heap with decrease-key, so every node is accepted exactly once.
+"""
+
+import numpy as np
+import pygimli as pg
+
+from pygimli.meshtools import meshAdjacency
+from pygimli.utils import toSparseMapMatrix
+
+
+class NodeHeap(object):
+    """
+    Binary min-heap of node ids with decrease-key.
+
+    Parameters
+    ----------
+    n : int
+        Number of nodes (maximum heap size).
+    """
+    def __init__(self, n):
+        self.heap = []
+        self.key = [np.inf] * n
+        self.pos = [-1] * n
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, node, key):
+        """
+        Insert node with key or decrease its key if it is already in the
+        heap. Return False if the node is in the heap with a smaller key.
+        """
+        i = self.pos[node]
+        if i < 0:
+            self.heap.append(node)
+            i = len(self.heap) - 1
+            self.pos[node] = i
+        elif key >= self.key[node]:
+            return False
+
+        self.key[node] = key
+        self._siftUp(i)
+        return True
+
+    def pop(self):
+        """Remove and return (node, key) with the smallest key."""
+        heap = self.heap
+        node = heap[0]
+        last = heap.pop()
+        self.pos[node] = -1
+
+        if len(heap) > 0:
+            heap[0] = last
+            self.pos[last] = 0
+            self._siftDown(0)
+        return node, self.key[node]
+
+    def _siftUp(self, i):
+        heap, key, pos = self.heap, self.key, self.pos
+        node = heap[i]
+        k = key[node]
+        while i > 0:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if key[p] <= k:
+                break
+            heap[i] = p
+            pos[p] = i
+            i = parent
+        heap[i] = node
+        pos[node] = i
+
+    def _siftDown(self, i):
+        heap, key, pos = self.heap, self.key, self.pos
+        n = len(heap)
+        node = heap[i]
+        k = key[node]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and key[heap[child + 1]] < key[heap[child]]:
+                child += 1
+            c = heap[child]
+            if k <= key[c]:
+                break
+            heap[i] = c
+            pos[c] = i
+            i = child
+        heap[i] = node
+        pos[node] = i
+
+
+def _segmentTime(xa, xb, x, ta, tb, s):
+    """
+    Smallest traveltime to x over the segment [xa, xb] with linear
+    interpolated traveltimes ta, tb and slowness s.
+
+    Returns
+    -------
+    t : float
+        Traveltime.
+    w : float
+        Position of the ray point q = xa + w (xb - xa) on the segment.
+    l : float
+        Distance |x - q|.
+    """
+    e = xb - xa
+    r = x - xa
+    E = e.dot(e)
+    p = r.dot(e)
+    W = r.dot(r)
+    dT = tb - ta
+    k = (dT / s)**2
+
+    w = 0.0
+    if E > k:
+        # minimum of ta + w dT + s |r - w e|
+        w = p / E - np.sign(dT) * np.sqrt(max(k * (E * W - p * p), 0.0) /
+                                          (E - k)) / E
+        w = min(1.0, max(0.0, w))
+    elif dT < 0:
+        w = 1.0
+
+    q = r - w * e
+    l = np.sqrt(q.dot(q))
+    return ta + w * dT + s * l, w, l
+
+
+def _faceTime(xa, xb, xc, x, ta, tb, tc, s):
+    """
+    Smallest traveltime to x over the inside of the triangle [xa, xb, xc]
+    with linear interpolated traveltimes ta, tb, tc and slowness s.
+
+    The minimum on the triangle edges is left to :py:func:`_segmentTime`.
+
+    Returns
+    -------
+    t : float
+        Traveltime, inf if the minimum is not inside the triangle.
+    u, v : float
+        Position of the ray point q = xa + u (xb - xa) + v (xc - xa).
+    l : float
+        Distance |x - q|.
+    """
+    e1 = xb - xa
+    e2 = xc - xa
+    r = x - xa
+    M = np.array([[e1.dot(e1), e1.dot(e2)], [e1.dot(e2), e2.dot(e2)]])
+    det = M[0, 0] * M[1, 1] - M[0, 1]**2
+    if det <= 1e-12 * M[0, 0] * M[1, 1]:
+        return np.inf, 0.0, 0.0, 0.0
+
+    Minv = np.array([[M[1, 1], -M[0, 1]], [-M[0, 1], M[0, 0]]]) / det
+    dT = np.array([tb - ta, tc - ta])
+
+    # in plane gradient of the traveltime and projection of x
+    a = Minv.dot(dT)
+    G2 = dT.dot(a)
+    if G2 >= s * s:
+        return np.inf, 0.0, 0.0, 0.0
+
+    c = Minv.dot([r.dot(e1), r.dot(e2)])
+    h = np.sqrt(max(r.dot(r) - c.dot(M.dot(c)), 0.0))
+
+    # minimum of ta + (u, v) dT + s |r - u e1 - v e2|
+    u, v = c - a * h / np.sqrt(s * s - G2)
+    if u <= 0.0 or v <= 0.0 or u + v >= 1.0:
+        return np.inf, 0.0, 0.0, 0.0
+
+    q = r - u * e1 - v * e2
+    l = np.sqrt(q.dot(q))
+    return ta + u * dT[0] + v * dT[1] + s * l, u, v, l
+
+
+def fastMarch(mesh, slowness=None, source=0, ray=False, adjacency=None):
+    """
+    Calculate first arrival traveltimes for all nodes with the fast marching
+    method.
+
+    Every node is accepted once in the order of increasing traveltime. The
+    trial times of the not accepted nodes of all cells of a new accepted
+    node are updated from straight rays inside the cell, either from
+    an accepted node, from the best point on the segment between two
+    accepted nodes or, for 3D meshes, from the best point on the triangle
+    of three accepted nodes of the cell.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+        2D or 3D mesh of arbitrary cell types.
+
+    slowness : array [None]
+        Slowness for each cell. Default are the cell attributes.
+
+    source : int | pos
+        Node id or position of the source. A position inside a cell
+        initializes the nodes of that cell.
+
+    ray : bool [False]
+        Also return the ray information to calculate the sensitivities with
+        :py:func:`rayPathLengths`.
+
+    adjacency : :py:class:`pygimli.meshtools.MeshAdjacency` [None]
+        Topology of the mesh. Default is the cached one for the mesh.
+
+    Returns
+    -------
+    times : np.array
+        Traveltime for each node.
+
+    rays : tuple
+        Only if ray is True. For each node the cell, the (up to) three
+        parent nodes (-1 for unused), their weights and the ray length in
+        the cell of the last ray segment.
+    """
+    if adjacency is None:
+        adjacency = meshAdjacency(mesh)
+
+    pos = adjacency.pos
+    cellPtr, cellNodes = adjacency.cellPtr, adjacency.cellNodes
+    nodePtr, nodeCells = adjacency.nodeCellPtr, adjacency.nodeCells
+
+    if slowness is None:
+        slowness = mesh.cellAttributes()
+    s = np.asarray(slowness, dtype=float)
+
+    nNodes = mesh.nodeCount()
+    times = np.full(nNodes, np.inf)
+    accepted = np.zeros(nNodes, dtype=bool)
+
+    rCell = np.full(nNodes, -1, dtype=int)
+    rParents = np.full((nNodes, 3), -1, dtype=int)
+    rWeights = np.zeros((nNodes, 3))
+    rLen = np.zeros(nNodes)
+    faces = mesh.dimension() == 3
+
+    heap = NodeHeap(nNodes)
+
+    if isinstance(source, (int, np.integer)):
+        heap.push(int(source), 0.0)
+    else:
+        srcPos = pg.RVector3(source)
+        cell = mesh.findCell(srcPos)
+        if cell is None:
+            raise Exception("Source position is outside the mesh: " +
+                            str(srcPos))
+
+        src = np.array([srcPos[0], srcPos[1], srcPos[2]])
+        for n in cell.ids():
+            l = np.sqrt(np.sum((pos[n] - src)**2))
+            heap.push(n, s[cell.id()] * l)
+            rCell[n] = cell.id()
+            rLen[n] = l
+
+    key = heap.key
+    while len(heap) > 0:
+        n, tn = heap.pop()
+        accepted[n] = True
+        times[n] = tn
+        xn = pos[n]
+
+        for c in nodeCells[nodePtr[n]:nodePtr[n + 1]]:
+            sc = s[c]
+            nodes = cellNodes[cellPtr[c]:cellPtr[c + 1]]
+            up = [m for m in nodes if accepted[m] and m != n]
+
+            for x in nodes:
+                if accepted[x]:
+                    continue
+
+                d = pos[x] - xn
+                l = np.sqrt(d.dot(d))
+                best = (tn + sc * l, (n, -1, -1), (1.0, 0.0, 0.0), l)
+
+                for i, m in enumerate(up):
+                    t, w, l = _segmentTime(xn, pos[m], pos[x], tn, times[m],
+                                           sc)
+                    if t < best[0]:
+                        best = (t, (n, m, -1), (1.0 - w, w, 0.0), l)
+
+                    if not faces:
+                        continue
+
+                    for m2 in up[i + 1:]:
+                        t, u, v, l = _faceTime(xn, pos[m], pos[m2], pos[x],
+                                               tn, times[m], times[m2], sc)
+                        if t < best[0]:
+                            best = (t, (n, m, m2), (1.0 - u - v, u, v), l)
+
+                if best[0] < key[x]:
+                    heap.push(x, best[0])
+                    rCell[x] = c
+                    rParents[x], rWeights[x], rLen[x] = best[1:]
+
+    if ray:
+        return times, (rCell, rParents, rWeights, rLen)
+    return times
+
+
+def rayPathLengths(times, rays, node):
+    """
+    Return the ray path lengths per cell from the source to the node, i.e.,
+    the sensitivities :math:`\\partial t / \\partial s` of the node
+    traveltime.
+
+    Parameters
+    ----------
+    times, rays :
+        Results of :py:func:`fastMarch` with ray=True.
+
+    node : int
+        Receiver node.
+
+    Returns
+    -------
+    cells : array
+        Cell ids.
+
+    lengths : array
+        Ray length in each cell.
+    """
+    import heapq
+
+    rCell, rParents, rWeights, rLen = rays
+
+    weights = {node: 1.0}
+    todo = [(-times[node], node)]
+    sens = dict()
+
+    # process nodes by decreasing time, so all weights are collected first
+    while len(todo) > 0:
+        t, n = heapq.heappop(todo)
+        w = weights.pop(n)
+
+        if rCell[n] >= 0:
+            sens[rCell[n]] = sens.get(rCell[n], 0.0) + w * rLen[n]
+
+        for parent, pw in zip(rParents[n], rWeights[n]):
+            if parent < 0 or pw == 0.0:
+                continue
+            if parent not in weights:
+                weights[parent] = 0.0
+                heapq.heappush(todo, (-times[parent], parent))
+            weights[parent] += w * pw
+
+    cells = np.asarray(list(sens.keys()), dtype=int)
+    return cells, np.asarray([sens[c] for c in cells])
+
+
+class TravelTimeFMMModelling(pg.TravelTimeDijkstraModelling):
+    """
+    Traveltime modelling with the fast marching method.
+
+    Alternative to :gimliapi:`GIMLI::TravelTimeDijkstraModelling` with the
+    same region and mesh handling. The rays are not bound to the mesh
+    edges. The jacobian holds the ray path lengths per model cell.
+    """
+    def __init__(self, mesh, data, verbose=False):
+        pg.TravelTimeDijkstraModelling.__init__(self, mesh, data, verbose)
+        self.J = pg.RSparseMapMatrix()
+        self.setJacobian(self.J)
+        self._nodes = None
+        self._adjacency = None
+
+    def adjacency(self):
+        """Topology of the forward mesh, rebuilt if the mesh changes."""
+        if self._adjacency is None or \
+                not self._adjacency.isValid(self.mesh()):
+            self._adjacency = meshAdjacency(self.mesh())
+        return self._adjacency
+
+    def shotReceiverNodes(self):
+        """
+        Return the unique shot nodes and for each datum the index of its
+        shot and the receiver node. Recalculated if the mesh changes.
+        """
+        mesh = self.mesh()
+        data = self.data()
+        signature = (mesh.nodeCount(), mesh.cellCount(), data.size())
+
+        if self._nodes is None or self._nodes[0] != signature:
+            s = np.asarray(data('s'), dtype=int)
+            g = np.asarray(data('g'), dtype=int)
+
+            sensorNode = dict()
+            for i in np.unique(np.concatenate([s, g])):
+                sensorNode[i] = mesh.findNearestNode(data.sensorPosition(
+                    int(i)))
+
+            shots, shotIdx = np.unique(s, return_inverse=True)
+            shotNodes = [sensorNode[i] for i in shots]
+            recNodes = np.asarray([sensorNode[i] for i in g], dtype=int)
+            self._nodes = (signature, (shotNodes, shotIdx, recNodes))
+
+        return self._nodes[1]
+
+    def cellSlowness(self, slowness):
+        """Map the model to the cells of the forward mesh."""
+        self.mapModel(slowness, 1e16)
+        return np.asarray(self.mesh().cellAttributes())
+
+    def response(self, slowness):
+        """Traveltimes for the given slowness model."""
+        s = self.cellSlowness(slowness)
+        shotNodes, shotIdx, recNodes = self.shotReceiverNodes()
+        adj = self.adjacency()
+
+        resp = np.zeros(len(recNodes))
+        for i, shot in enumerate(shotNodes):
+            times = fastMarch(self.mesh(), s, int(shot), adjacency=adj)
+            idx = np.nonzero(shotIdx == i)[0]
+            resp[idx] = times[recNodes[idx]]
+
+        return pg.RVector(resp)
+
+    def createJacobian(self, slowness):
+        """Ray path lengths in every model cell for all data."""
+        from scipy.sparse import csr_matrix
+
+        s = self.cellSlowness(slowness)
+        shotNodes, shotIdx, recNodes = self.shotReceiverNodes()
+        markers = np.asarray(self.mesh().cellMarker(), dtype=int)
+        nModel = self.regionManager().parameterCount()
+        adj = self.adjacency()
+
+        rows, cols, vals = [], [], []
+        for i, shot in enumerate(shotNodes):
+            times, rays = fastMarch(self.mesh(), s, int(shot), ray=True,
+                                    adjacency=adj)
+
+            for d in np.nonzero(shotIdx == i)[0]:
+                cells, lengths = rayPathLengths(times, rays, recNodes[d])
+                rows.append(np.full(len(cells), d, dtype=int))
+                cols.append(markers[cells])
+                vals.append(lengths)
+
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=int)
+        vals = np.concatenate(vals) if vals else np.zeros(0)
+        valid = (cols >= 0) & (cols < nModel)
+
+        J = csr_matrix((vals[valid], (rows[valid], cols[valid])),
+                       shape=(len(recNodes), nModel))
+        J.sum_duplicates()
+        toSparseMapMatrix(J, self.J)
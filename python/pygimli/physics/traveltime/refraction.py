@@ -176,11 +176,30 @@ class Refraction():
         drawMesh(ax, self.mesh)
         plt.show(block=False)
 
-    def createFOP(self, refine=True):  # Dijkstra, later FMM
-        """ create forward operator working on refined mesh """
+    def createFOP(self, refine=True, method='dijkstra', nProcs=1):
+        """
+        create forward operator working on refined mesh
+
+        method : 'dijkstra' (pg.TravelTimeDijkstraModelling) or 'fmm'
+            (fast marching, rays are not bound to mesh edges)
+        nProcs : number of processes for the shots of 'dijkstra' (0 = all
+            cpus), for nProcs != 1 the shot-parallel and shot-cached
+            TravelTimeDijkstraParallelModelling is used
+        """
         if not hasattr(self, 'mesh'):  # self.mesh is None:
             self.makeMesh()
-        self.f = pg.TravelTimeDijkstraModelling(self.mesh, self.data, True)
+        if method == 'fmm':
+            from .fastMarching import TravelTimeFMMModelling
+            self.f = TravelTimeFMMModelling(self.mesh, self.data, True)
+        elif method == 'dijkstra' and nProcs != 1:
+            from .dijkstraModelling import TravelTimeDijkstraParallelModelling
+            self.f = TravelTimeDijkstraParallelModelling(self.mesh, self.data,
+                                                         True, nProcs)
+        elif method == 'dijkstra':
+            self.f = pg.TravelTimeDijkstraModelling(self.mesh, self.data,
+                                                    True)
+        else:
+            raise Exception("Unknown traveltime modelling: " + str(method))
         self.f.regionManager().setConstraintType(1)
         self.f.createRefinedForwardMesh(refine)
         self.pd = self.f.regionManager().paraDomain()  # no idea why needed
@@ -2,6 +2,7 @@
 ## -*- coding: utf-8 -*-
 
 from .solver import *
+from .iterative import IterativeSolver
 from .green import *
 
 # unsorted stuff need
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+    Iterative (Krylov) solver for large sparse systems, e.g., 3D FEM problems
+    where the fill-in of the direct solver exhausts the memory.
+"""
+
+import time
+import zlib
+import warnings
+
+import numpy as np
+import pygimli as pg
+
+from pygimli.utils import sparseMatrix2csr
+
+
+class IterativeSolver(object):
+    """
+    Preconditioned Krylov solver based on scipy.sparse.linalg.
+
+    The preconditioner is calculated once for the given operator and reused
+    for all following solves as long as the matrix does not change.
+
+    Parameters
+    ----------
+    A : pg.RSparseMatrix | pg.CSparseMatrix | pg.RSparseMapMatrix | scipy.sparse
+        System matrix.
+
+    method : str ['cg']
+        'cg' for symmetric positive definite matrices or 'gmres'.
+
+    preconditioner : str ['auto']
+        - 'auto', 'jacobi' for 'cg' and 'ilu' for 'gmres'.
+        - 'ilu', incomplete LU factorization (scipy.sparse.linalg.spilu).
+          The factors are not symmetric, so cg is not guaranteed to
+          converge with it, use it with gmres.
+        - 'amg', algebraic multigrid, needs pyamg.
+        - 'jacobi', diagonal scaling.
+        - None, no preconditioning.
+
+    tol : float [1e-8]
+        Relative residual tolerance.
+
+    maxiter : int [None]
+        Maximum number of iterations.
+
+    verbose : bool [False]
+        Print iteration statistics after every solve.
+
+    checkValues : bool [True]
+        Compare a checksum of the matrix values on every
+        :py:meth:`setMatrix` to detect changes. If False, only the shape and
+        the number of nonzeros are compared, which saves a pass over the
+        matrix if the values are known to be fixed.
+
+    **kwargs :
+        Passed to the preconditioner, e.g., drop_tol, fill_factor for 'ilu'.
+
+    Attributes
+    ----------
+    iterations : int
+        Number of iterations of the last solve.
+
+    residual : float
+        Relative residual norm :math:`\\|b - Ax\\| / \\|b\\|` of the last solve.
+
+    info : int
+        Convergence flag of the last solve, 0 for success.
+
+    converged : bool
+        False if the last solve stopped at maxiter before reaching tol.
+
+    setupTime, solveTime : float
+        Time for the last preconditioner setup and the last solve.
+
+    preconditionerCount : int
+        Number of preconditioner setups.
+    """
+    def __init__(self, A=None, method='cg', preconditioner='auto', tol=1e-8,
+                 maxiter=None, verbose=False, checkValues=True, **kwargs):
+        if method not in ('cg', 'gmres'):
+            raise Exception("Unknown iterative method: " + str(method))
+
+        self.method = method
+        self.preconditioner = defaultPreconditioner(method, preconditioner)
+        self.precOpts = kwargs
+        self.tol = tol
+        self.maxiter = maxiter
+        self.verbose = verbose
+        self.checkValues = checkValues
+
+        self.A = None
+        self.M = None
+        self.signature = None
+
+        self.iterations = 0
+        self.residual = 0.0
+        self.info = 0
+        self.converged = True
+        self.setupTime = 0.0
+        self.solveTime = 0.0
+        self.preconditionerCount = 0
+
+        if A is not None:
+            self.setMatrix(A)
+
+    def setMatrix(self, A):
+        """
+        Set the system matrix. The preconditioner is only recalculated if
+        the sparsity pattern or the values have changed, see checkValues.
+        """
+        if hasattr(A, 'tocsr'):
+            csr = A.tocsr()
+        else:
+            csr = sparseMatrix2csr(A)
+
+        signature = matrixSignature(csr, values=self.checkValues)
+        self.A = csr
+
+        if signature != self.signature:
+            self.signature = signature
+            self.M = None
+
+    def _createPreconditioner(self):
+        """Calculate the preconditioner for the current matrix."""
+        from scipy.sparse.linalg import LinearOperator, spilu
+
+        tic = time.time()
+        A = self.A
+
+        if self.preconditioner is None:
+            M = None
+        elif self.preconditioner == 'ilu':
+            ilu = spilu(A.tocsc(), **self.precOpts)
+            M = LinearOperator(A.shape, matvec=ilu.solve, dtype=A.dtype)
+        elif self.preconditioner == 'amg':
+            try:
+                import pyamg
+            except ImportError:
+                raise Exception("Preconditioner 'amg' needs pyamg.")
+            ml = pyamg.smoothed_aggregation_solver(A, **self.precOpts)
+            M = ml.aspreconditioner()
+        elif self.preconditioner == 'jacobi':
+            d = A.diagonal()
+            d[d == 0.0] = 1.0
+            M = LinearOperator(A.shape, matvec=lambda x: x / d, dtype=A.dtype)
+        else:
+            raise Exception("Unknown preconditioner: " +
+                            str(self.preconditioner))
+
+        self.setupTime = time.time() - tic
+        self.preconditionerCount += 1
+        return M
+
+    def solve(self, b, x0=None):
+        """
+        Solve Ax = b.
+
+        Parameters
+        ----------
+        b : array
+            Right hand side.
+
+        x0 : array [None]
+            Start solution, e.g., the solution of the last time step.
+
+        Returns
+        -------
+        x : np.array
+            Solution vector.
+        """
+        from scipy.sparse.linalg import cg, gmres
+
+        if self.A is None:
+            raise Exception("IterativeSolver: no matrix given.")
+
+        if self.M is None:
+            self.setupTime = 0.0
+            self.M = self._createPreconditioner()
+
+        dtype = np.result_type(self.A.dtype, np.asarray(b).dtype)
+        b = np.asarray(b, dtype=dtype)
+        if x0 is not None:
+            x0 = np.asarray(x0, dtype=dtype)
+
+        self.iterations = 0
+
+        def _count(*args):
+            self.iterations += 1
+
+        tic = time.time()
+        kwargs = dict(x0=x0, M=self.M, maxiter=self.maxiter, callback=_count)
+        if self.method == 'gmres':
+            kwargs['callback_type'] = 'pr_norm'
+
+        solver = cg if self.method == 'cg' else gmres
+        try:
+            x, self.info = solver(self.A, b, rtol=self.tol, **kwargs)
+        except TypeError:
+            # scipy < 1.12
+            kwargs.pop('callback_type', None)
+            x, self.info = solver(self.A, b, tol=self.tol, **kwargs)
+
+        self.solveTime = time.time() - tic
+
+        bNorm = np.linalg.norm(b)
+        self.residual = np.linalg.norm(b - self.A.dot(x)) / \
+            (bNorm if bNorm > 0.0 else 1.0)
+
+        if self.verbose:
+            print(self.method + "(" + str(self.preconditioner) + "): " +
+                  str(self.iterations) + " iterations, residual: " +
+                  str(self.residual) + ", setup: " + str(self.setupTime) +
+                  " s, solve: " + str(self.solveTime) + " s")
+
+        self.converged = self.info == 0
+        if self.info > 0:
+            warnings.warn(self.method + " did not converge after " +
+                          str(self.info) + " iterations, residual: " +
+                          str(self.residual), RuntimeWarning)
+        elif self.info < 0:
+            raise Exception(self.method + ": illegal input or breakdown.")
+
+        return x
+
+    def stats(self):
+        """Return the statistics of the last solve as dictionary."""
+        return dict(method=self.method, preconditioner=self.preconditioner,
+                    iterations=self.iterations, residual=self.residual,
+                    info=self.info, converged=self.converged,
+                    setupTime=self.setupTime,
+                    solveTime=self.solveTime,
+                    preconditionerCount=self.preconditionerCount)
+
+
+def matrixSignature(csr, values=True):
+    """
+    Return a hashable fingerprint of a csr matrix.
+
+    With values=False only shape and number of nonzeros are used, else an
+    adler32 checksum of pattern and values is added.
+    """
+    if not values:
+        return (csr.shape, csr.nnz)
+
+    checksum = 1
+    for arr in (csr.indptr, csr.indices, csr.data):
+        checksum = zlib.adler32(np.ascontiguousarray(arr).view(np.uint8),
+                                checksum)
+    return (csr.shape, csr.nnz, checksum)
+
+
+def defaultPreconditioner(method, preconditioner='auto'):
+    """
+    Return the preconditioner for 'auto', i.e., 'jacobi' for the symmetric
+    cg and 'ilu' for gmres, else the given one.
+    """
+    if preconditioner == 'auto':
+        return 'jacobi' if method == 'cg' else 'ilu'
+    return preconditioner
+
+
+def iterativeSolver(A, method='cg', preconditioner='auto', **kwargs):
+    """
+    Return a cached :py:class:`IterativeSolver` for the operator A.
+
+    The solver is cached per matrix object, method, preconditioner and
+    preconditioner options, so repeated calls with the same operator, e.g.,
+    from :py:func:`pygimli.solver.linsolve`, reuse the preconditioner.
+    tol, maxiter, verbose and checkValues are updated for a cached solver.
+    """
+    solverOpts = dict()
+    for k in ('tol', 'maxiter', 'verbose', 'checkValues'):
+        if k in kwargs:
+            solverOpts[k] = kwargs.pop(k)
+
+    preconditioner = defaultPreconditioner(method, preconditioner)
+    key = (id(A), method, preconditioner,
+           tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+    solver = __iterativeSolverCache__.get(key, None)
+
+    if solver is None:
+        if len(__iterativeSolverCache__) >= __iterativeSolverCacheMaxSize__:
+            __iterativeSolverCache__.pop(list(__iterativeSolverCache__.keys())[0])
+
+        solver = IterativeSolver(method=method, preconditioner=preconditioner,
+                                 **kwargs)
+        __iterativeSolverCache__[key] = solver
+
+    for k, v in solverOpts.items():
+        setattr(solver, k, v)
+
+    solver.setMatrix(A)
+    return solver
+
+__iterativeSolverCache__ = dict()
+__iterativeSolverCacheMaxSize__ = 4
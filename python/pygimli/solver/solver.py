@@ -3,16 +3,44 @@
 
 import pygimli as pg
 
-from pygimli.utils import unique
+from pygimli.utils import unique, coo2SparseMatrix, sparseMatrix2csr
+from .iterative import IterativeSolver, iterativeSolver
 import numpy as np
 
-import copy
+import hashlib
 
-def parseArgToArray(arg, ndof, mesh=None, userData=None):
+def parseArgToArray(arg, ndof, mesh=None, userData=None, vectorized=False):
     """
-        What is this
+    Parse a value, an array or a callable into an array with one value for
+    each node, cell or boundary of the mesh, depending on ndof.
+
+    Parameters
+    ----------
+    arg : value | array | callable
+        A callable is either called for each entity with the node position,
+        the cell or the boundary and optional userData or, if vectorized is
+        True, once with the (N, 3) array of the node positions, cell centers
+        or boundary centers, the N markers and optional userData. The latter
+        needs to return an array of length N (or a scalar).
+
+    ndof : int | list of int
+        Number of values to create. A list gives alternative sizes for
+        array arguments.
+
+    mesh : :gimliapi:`GIMLI::Mesh`
+        Needed for callable arguments. The coordinate arrays are cached
+        per mesh.
+
+    userData : object [None]
+        Passed to the callable.
+
+    vectorized : bool [False]
+        Calling convention for callable arguments.
+
+    Returns
+    -------
+    arr : pg.RVector | array
     """
-  
     if not hasattr(ndof, '__len__'):
         nDofs = [ndof]
     else:
@@ -29,13 +57,30 @@ def parseArgToArray(arg, ndof, mesh=None, userData=None):
                 return arg
         
         raise Exception("Array 'arg' has the wrong size: " + 
-                        len(arg) + " != " +  dof)
+                        str(len(arg)) + " != " + str(ndof))
     elif hasattr(arg, '__call__'):
-        ret = pg.RVector(nDofs[0], 0.0)
-        
         if not mesh:
             raise Exception("Please provide a mesh for the callable"
                             "argument to parse ")
+
+        if vectorized:
+            pos, markers = _entityCoordinates(mesh, nDofs[0])
+            if userData:
+                val = arg(pos, markers, userData)
+            else:
+                val = arg(pos, markers)
+
+            val = np.asarray(val, dtype=float)
+            if val.ndim == 0:
+                val = np.ones(nDofs[0]) * val
+
+            if len(val) != nDofs[0]:
+                raise Exception("Vectorized callable returned the wrong "
+                                "size: " + str(len(val)) + " != " +
+                                str(nDofs[0]))
+            return pg.RVector(val)
+
+        ret = pg.RVector(nDofs[0], 0.0)
         
         if nDofs[0] == mesh.nodeCount():
             for n in mesh.nodes():
@@ -66,55 +111,64 @@ def parseArgToArray(arg, ndof, mesh=None, userData=None):
 
 def triDiagToeplitz(dom, a, l, r, start=0, end=-1):
     """
+    Create a tridiagonal Toeplitz matrix with diagonal a, lower diagonal l and
+    upper diagonal r for the rows start to end.
+
+    The matrix is assembled at once from compressed row arrays.
     """
-    A = pg.RSparseMapMatrix(dom, dom)
-    
     if end == -1: end = dom
-    
-    for i in range(start, end):
-        A.addVal(i, i, a)
-        if i > start: 
-            A.addVal(i, i - 1, l)  
-            
-        if i < end-1: 
-            A.addVal(i, i + 1, r)  
-    return A
-        
+
+    i = np.arange(start, end)
+    rows = np.concatenate([i, i[1:], i[:-1]])
+    cols = np.concatenate([i, i[1:] - 1, i[:-1] + 1])
+    vals = np.concatenate([np.full(len(i), a, dtype=float),
+                           np.full(max(len(i) - 1, 0), l, dtype=float),
+                           np.full(max(len(i) - 1, 0), r, dtype=float)])
+
+    return pg.RSparseMapMatrix(coo2SparseMatrix(rows, cols, vals, dom))
+
+
 def identity(dom, start=0, end=-1):
     """
+    Create an identity matrix with ones for the rows start to end.
     """
-    A = pg.RSparseMapMatrix(dom, dom)
-    
     if end == -1: end = dom
-    
-    for i in range(start, end):
-        A.addVal(i, i, 1)
-    return A
-    
+
+    i = np.arange(start, end)
+    return pg.RSparseMapMatrix(coo2SparseMatrix(i, i, np.ones(len(i)), dom))
+
+
 def showSparseMatrix(A):
     """
         helper function
     """
     S = A
-    #S = pg.RSparseMatrix(A)
-    rows = S.vecRowIdx()
-    cols = S.vecColPtr()
-    vals = S.vecVals()
+    if isinstance(A, pg.RSparseMapMatrix):
+        S = pg.RSparseMatrix(A)
+
+    rows = S.rowIdxArray()
+    cols = S.colPtrArray()
+    vals = S.valsArray()
 
     for i in range(S.rows()):
         for j in range(cols[i], cols[i + 1]):
-            print(i,rows[j],vals[j])
-            
+            print(i, rows[j], vals[j])
 
 
-def linsolve(A, b, verbose=False):
+def linsolve(A, b, verbose=False, method='direct', x0=None, stats=None,
+             nThreads=1, chunkSize=64, **kwargs):
     """
     Direct solution after :math:`\textbf{x}` using cholmod:
     .. math::
         \textbf{A}\textbf{x} = \textbf{b}
         
     If :math:`\textbf{x}` is symmetric, sparse and positive definite.
-        
+
+    For large problems, e.g., 3D meshes with millions of nodes, the fill-in
+    of the direct solver can exhaust the memory. Choose an iterative
+    method then, see :py:class:`pygimli.solver.IterativeSolver`.
+    The preconditioner is cached and reused for repeated calls with the same
+    matrix.
     
     Parameters
     ----------
@@ -122,18 +176,52 @@ def linsolve(A, b, verbose=False):
         System matrix.
     
     b : array
-        Right hand side of the equation.
+        Right hand side of the equation. For a 2D array (dof x nrhs) the
+        matrix is factorized once and all right hand sides are solved in
+        blocks of chunkSize columns, see :py:func:`linsolveBlock`.
         
     verbose : bool[False]
         Be verbose
-        
+
+    method : str ['direct']
+        'direct' for pg.LinSolver or the Krylov methods 'cg' or 'gmres'.
+
+    x0 : array [None]
+        Start solution for the iterative methods (warm start).
+
+    stats : object [None]
+        If given, solverTime and for the iterative methods iterations,
+        residual, converged and setupTime are set as attributes.
+
+    **kwargs :
+        preconditioner ('auto', 'ilu', 'amg', 'jacobi', None), tol, maxiter and
+        preconditioner options for the iterative methods.
+    
     Returns
     -------
     
     x : array
-        Solution vector
+        Solution vector or (dof x nrhs) array for a block of right hand sides.
     
     """
+    if isinstance(b, np.ndarray) and b.ndim == 2:
+        return linsolveBlock(A, b, verbose=verbose, method=method, x0=x0,
+                             stats=stats, nThreads=nThreads,
+                             chunkSize=chunkSize, **kwargs)
+
+    if method != 'direct':
+        solver = iterativeSolver(A, method=method, verbose=verbose, **kwargs)
+        x = solver.solve(b, x0=x0)
+        if not np.iscomplexobj(x):
+            x = pg.RVector(x)
+
+        if stats:
+            for k, v in solver.stats().items():
+                setattr(stats, k, v)
+            stats.solverTime = solver.solveTime
+        return x
+
+    swatch = pg.Stopwatch(True)
     x = pg.RVector(len(b), .0 )
     
     if type(A) == pg.RSparseMapMatrix:
@@ -143,8 +231,119 @@ def linsolve(A, b, verbose=False):
     else:    
         solver = pg.LinSolver(A, verbose=verbose)
         solver.solve(b, x)
+
+    if stats:
+        stats.solverTime = swatch.duration()
     return x
     
+def linsolveBlock(A, B, verbose=False, method='direct', x0=None, stats=None,
+                  nThreads=1, chunkSize=64, **kwargs):
+    """
+    Solve :math:`\textbf{A}\textbf{X} = \textbf{B}` for many right hand
+    sides, e.g., one for every current electrode.
+
+    For the direct method the matrix is LU factorized once
+    (scipy.sparse.linalg.splu) and the right hand sides are solved in blocks
+    of chunkSize columns. The blocks are distributed over nThreads threads.
+    The iterative methods reuse one preconditioner for all columns.
+
+    Parameters
+    ----------
+    A : pg.RSparseMatrix | pg.CSparseMatrix | pg.RSparseMapMatrix | scipy.sparse
+        System matrix.
+
+    B : array (dof x nrhs)
+        Right hand sides.
+
+    method : str ['direct']
+        'direct', 'cg' or 'gmres', see :py:func:`linsolve`.
+
+    x0 : array (dof x nrhs) [None]
+        Start solutions for the iterative methods.
+
+    stats : object [None]
+        If given, factorizationTime, solverTime and nRHS (and iterations and
+        converged for the iterative methods) are set as attributes.
+
+    nThreads : int [1]
+        Number of threads for the direct block solves.
+
+    chunkSize : int [64]
+        Number of right hand sides solved at once.
+
+    Returns
+    -------
+    X : np.array (dof x nrhs)
+        Solution for every right hand side.
+    """
+    B = np.asarray(B)
+    if B.ndim == 1:
+        B = B.reshape(-1, 1)
+
+    nRHS = B.shape[1]
+    swatch = pg.Stopwatch(True)
+
+    if hasattr(A, 'tocsr'):
+        csr = A.tocsr()
+    else:
+        csr = sparseMatrix2csr(A)
+
+    X = np.zeros(B.shape, dtype=np.result_type(csr.dtype, B.dtype))
+    iterations = 0
+    converged = True
+
+    if method == 'direct':
+        from scipy.sparse.linalg import splu
+
+        lu = splu(csr.tocsc())
+        factorizationTime = swatch.duration(True)
+
+        chunks = [np.arange(i, min(i + chunkSize, nRHS))
+                  for i in range(0, nRHS, max(chunkSize, 1))]
+
+        def _solveChunk(c):
+            X[:, c] = lu.solve(np.asarray(B[:, c], dtype=X.dtype))
+
+        if nThreads > 1 and len(chunks) > 1:
+            from multiprocessing.pool import ThreadPool
+
+            pool = ThreadPool(nThreads)
+            pool.map(_solveChunk, chunks)
+            pool.close()
+            pool.join()
+        else:
+            for c in chunks:
+                _solveChunk(c)
+    else:
+        solver = iterativeSolver(A, method=method, verbose=verbose, **kwargs)
+        factorizationTime = swatch.duration(True)
+
+        for i in range(nRHS):
+            X[:, i] = solver.solve(B[:, i],
+                                   x0=None if x0 is None else x0[:, i])
+            iterations += solver.iterations
+            converged = converged and solver.converged
+
+        factorizationTime += solver.setupTime
+
+    solverTime = swatch.duration(True)
+
+    if verbose:
+        print("Solved " + str(nRHS) + " right hand sides (" + method +
+              "): factorization " + str(factorizationTime) + " s, solve " +
+              str(solverTime) + " s")
+
+    if stats:
+        stats.factorizationTime = factorizationTime
+        stats.solverTime = solverTime
+        stats.nRHS = nRHS
+        if method != 'direct':
+            stats.iterations = iterations
+            stats.converged = converged
+
+    return X
+
+
 def assembleForceVector(mesh, f, userData=None):
     """
         Create right hand side vector based on the given mesh and on 
@@ -161,9 +360,7 @@ def assembleForceVector(mesh, f, userData=None):
     """
 
     rhs = pg.RVector(mesh.nodeCount(), 0)
-        
-    b_l = pg.ElementMatrix()
-    
+
     if hasattr(f, '__call__') and type(f) is not pg.RVector:
         for c in mesh.cells():
             if userData is not None:
@@ -173,15 +370,17 @@ def assembleForceVector(mesh, f, userData=None):
     else:
         
         if type(f) == float or type(f) == int:
-            fArray = pg.RVector(mesh.cellCount(), f)
+            fArray = np.ones(mesh.cellCount()) * f
         else:
             fArray = f
             
         if len(fArray) == mesh.cellCount():
-            for c in mesh.cells():
-                b_l.u(c)
-                for i, idx in enumerate(b_l.idx()):
-                    rhs[idx] += b_l.row(0)[i] * fArray[c.id()]
+            nodeIdx, cellIdx, weights = _loadVectorWeights(mesh,
+                                                           _meshCache(mesh))
+            rhs = pg.RVector(np.bincount(nodeIdx,
+                                         weights=weights *
+                                         np.asarray(fArray)[cellIdx],
+                                         minlength=mesh.nodeCount()))
         elif len(fArray) == mesh.nodeCount():
             rhs = pg.RVector(fArray)
         else:
@@ -192,7 +391,7 @@ def assembleForceVector(mesh, f, userData=None):
 # def assembleForceVector()
     
     
-def assembleUDirichlet_(S, rhs, uDirIndex, uDirchlet):
+def assembleUDirichlet_(S, rhs, uDirIndex, uDirchlet, constrainMatrix=True):
     """
         this should be moved directly into gimli
     """
@@ -203,7 +402,8 @@ def assembleUDirichlet_(S, rhs, uDirIndex, uDirchlet):
         rhs -= S * udirTmp
         
     for i in uDirIndex:
-    
+        if not constrainMatrix:
+            break
         S.cleanRow(i)
         S.cleanCol(i)
         S.setVal(i, i, 1.0)
@@ -355,38 +555,690 @@ def assembleBoundaryConditions(mesh, S, rhs, boundArgs, assembler,
     [boundaries, value]
     [[boundaries, value],[boundaries, value]]
     
+    DirichletBC or NeumannBC object(s)
+    
     boundaries can be list of bounds or marker
     value can be float, int or a callable(boundary)
     
+    """
+    if isinstance(boundArgs, (DirichletBC, NeumannBC)):
+        boundArgs = [boundArgs]
+
+    if all(isinstance(b, (DirichletBC, NeumannBC)) for b in boundArgs):
+        for bc in boundArgs:
+            bc.apply(S, rhs, time=time, userData=userData)
+        return
+
+    for bound in _parseBoundaryPairs(mesh, boundArgs):
+        assembler(S, boundaryPair=bound, rhs=rhs, time=time,
+                  userData=userData,
+                  verbose=verbose)
+    
+#def assembleBoundaryConditions(...)
+
+def _parseBoundaryPairs(mesh, boundArgs):
+    """
+    Return a list of [boundaries, value] pairs for the boundArgs as
+    accepted by :py:func:`assembleBoundaryConditions`.
     """
     boundaries = list()
 
     if type(boundArgs[0]) == pg.stdVectorBounds:
-        boundaries.append(boundArgs)
+        boundaries.append(list(boundArgs))
     elif type(boundArgs[0]) == int:
-        #FIXME
-        boundaries.append(copy.deepcopy(boundArgs))
+        boundaries.append(list(boundArgs))
     else:
-        #FIXME
         for i in boundArgs:
-            boundaries.append(copy.copy(i))
-        
+            boundaries.append(list(i))
 
     for bound in boundaries:
-        
-        if type(bound) == list or len(bound) == 2:
-            if type(bound[0]) == int:
-                bound[0] = mesh.findBoundaryByMarker(bound[0])
-
-            assembler(S, boundaryPair=bound, rhs=rhs, time=time,
-                      userData=userData,
-                      verbose=verbose)    
-            
-        else:
+        if len(bound) != 2:
             raise Exception("cannot interpret boundaries sequence: " +
                             str(type(bound)))
-    
-#def assembleBoundaryConditions(...)
+        if type(bound[0]) == int:
+            bound[0] = mesh.findBoundaryByMarker(bound[0])
+
+    return boundaries
+
+
+def _callBoundaryValue(value, arg, time, userData):
+    """Call a boundary value function with the old calling convention."""
+    kwargs = dict()
+    args = [arg]
+    if time != 0.0:
+        args.append(time)
+    if userData:
+        kwargs['userData'] = userData
+    return value(*args, **kwargs)
+
+
+class DirichletBC(object):
+    """
+    Dirichlet boundary condition :math:`u = value` for a set of boundaries.
+
+    The unique node indices and the positions of all affected entries in the
+    sparse system matrix are calculated once, so applying the condition to
+    the system costs one sparse matrix-vector product and one bulk update
+    of the matrix values per time step.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+        Mesh the system matrix was assembled for.
+    boundaries : list | int
+        List of boundaries or a boundary marker.
+    value : float | callable
+        Scalar value or function returning the node value. If vectorized is
+        False the function will be called for each node with the node
+        position, optional time and userData. If vectorized is True it will be
+        called once with the (N, 3) array of node positions, optional time
+        and userData and need to return an array of length N.
+    vectorized : bool [False]
+        Calling convention for callable values.
+    """
+    def __init__(self, mesh, boundaries, value, vectorized=False):
+        self.mesh = mesh
+        self.value = value
+        self.vectorized = vectorized
+
+        if type(boundaries) == int:
+            boundaries = mesh.findBoundaryByMarker(boundaries)
+
+        ids = []
+        for b in boundaries:
+            ids.extend(b.ids())
+
+        self.nodeIdx = np.unique(np.asarray(ids, dtype=int))
+        self.pos = _meshCache(mesh)['pos'][self.nodeIdx]
+        self._valIdx = None
+        self._diagIdx = None
+
+    def values(self, time=0.0, userData=None):
+        """Return the Dirichlet values for all constrained nodes."""
+        if type(self.value) == float or type(self.value) == int:
+            return np.ones(len(self.nodeIdx)) * self.value
+
+        if self.vectorized:
+            u = np.asarray(_callBoundaryValue(self.value, self.pos,
+                                              time, userData), dtype=float)
+            if u.ndim == 0:
+                u = np.ones(len(self.nodeIdx)) * u
+        else:
+            u = np.zeros(len(self.nodeIdx))
+            for i, nId in enumerate(self.nodeIdx):
+                uVal = _callBoundaryValue(self.value,
+                                          self.mesh.node(int(nId)).pos(),
+                                          time, userData)
+                if uVal is None:
+                    raise Exception("cannot find dirichlet value for node ",
+                                    self.mesh.node(int(nId)))
+                u[i] = uVal
+
+        if len(u) != len(self.nodeIdx):
+            raise Exception("Dirichlet values have the wrong size: " +
+                            str(len(u)) + " != " + str(len(self.nodeIdx)))
+        return u
+
+    def _matrixIndices(self, S):
+        """
+        Return the positions in S.vecVals() that need to be cleaned and
+        the positions of the diagonal entries for the constrained nodes.
+        """
+        if self._valIdx is None:
+            colPtr, rowIdx, perm = _sparsityPattern(self.mesh,
+                                                    _meshCache(self.mesh))
+            constrained = np.zeros(self.mesh.nodeCount(), dtype=bool)
+            constrained[self.nodeIdx] = True
+
+            rows = np.repeat(np.arange(self.mesh.nodeCount()),
+                             np.diff(colPtr))
+            self._valIdx = np.nonzero(constrained[rows] |
+                                      constrained[rowIdx])[0]
+            self._diagIdx = _patternIndex(self.mesh, self.nodeIdx,
+                                          self.nodeIdx)
+            self._nVals = len(rowIdx)
+
+        if S.nVals() != self._nVals:
+            return None, None
+        return self._valIdx, self._diagIdx
+
+    def constrain(self, S):
+        """
+        Clean the rows and columns of the constrained nodes in S and set
+        the diagonal to 1 with one bulk update of the matrix values.
+        """
+        if isinstance(S, pg.RSparseMatrix):
+            valIdx, diagIdx = self._matrixIndices(S)
+        else:
+            valIdx = None
+
+        if valIdx is None:
+            for i in self.nodeIdx:
+                S.cleanRow(int(i))
+                S.cleanCol(int(i))
+                S.setVal(int(i), int(i), 1.0)
+            return
+
+        vals = np.asarray(S.vecVals())
+        vals[valIdx] = 0.0
+        vals[diagIdx] = 1.0
+        S.vecVals().setVal(pg.RVector(vals), 0, len(vals))
+
+    def apply(self, S, rhs=None, time=0.0, userData=None,
+              constrainMatrix=True):
+        """
+        Apply the condition to the system matrix S and the right hand side.
+
+        Parameters
+        ----------
+        S : pg.RSparseMatrix
+            System matrix with the sparsity pattern of the mesh.
+        rhs : pg.RVector
+            Right hand side, corrected by the known values.
+        time : float
+            Time passed to callable values.
+        constrainMatrix : bool [True]
+            Set to False to correct the rhs only, e.g., if S was already
+            constrained and factorized in a previous time step. S then need to
+            be the unconstrained system matrix.
+        """
+        _applyDirichletBC([self], S, rhs, time=time, userData=userData,
+                          constrainMatrix=constrainMatrix)
+
+
+def _applyDirichletBC(bcs, S, rhs, time=0.0, userData=None,
+                      constrainMatrix=True):
+    """
+    Apply a list of Dirichlet conditions at once. The rhs is corrected with
+    one sparse matrix-vector product for all known values.
+    """
+    if len(bcs) == 0:
+        return
+
+    if rhs is not None:
+        uDir = np.zeros(S.rows())
+        for bc in bcs:
+            uDir[bc.nodeIdx] = bc.values(time, userData)
+
+        idx = np.unique(np.concatenate([bc.nodeIdx for bc in bcs]))
+        rhs -= S * pg.RVector(uDir)
+        rhs.setVal(pg.RVector(uDir[idx]), [int(i) for i in idx])
+
+    if constrainMatrix:
+        for bc in bcs:
+            bc.constrain(S)
+
+
+class NeumannBC(object):
+    """
+    Neumann boundary condition for a set of boundaries.
+
+    The boundary element matrices and their positions in the sparse system
+    matrix are calculated once, so applying the condition costs one bulk
+    update of the matrix values per time step.
+    See :py:func:`assembleNeumannBC` for the meaning of the value.
+
+    Parameters
+    ----------
+    mesh : :gimliapi:`GIMLI::Mesh`
+        Mesh the system matrix was assembled for.
+    boundaries : list | int
+        List of boundaries or a boundary marker.
+    value : float | array | callable
+        Scalar value, array with one value per boundary or function
+        returning the boundary value. If vectorized
+        is False the function will be called for each boundary with the
+        boundary, optional time and userData. If vectorized is True it will
+        be called once with the (M, 3) array of boundary centers, optional
+        time and userData and need to return an array of length M.
+    vectorized : bool [False]
+        Calling convention for callable values.
+    """
+    def __init__(self, mesh, boundaries, value, vectorized=False):
+        self.mesh = mesh
+        self.value = value
+        self.vectorized = vectorized
+
+        if type(boundaries) == int:
+            boundaries = mesh.findBoundaryByMarker(boundaries)
+
+        self.boundaries = boundaries
+        self.centers = np.asarray([[b.center()[0], b.center()[1],
+                                    b.center()[2]] for b in boundaries])
+        if len(self.centers) == 0:
+            self.centers = np.zeros((0, 3))
+
+        dim = mesh.dimension()
+        pos = _meshCache(mesh)['pos'][:, 0:dim]
+
+        rows, cols, vals, bIdx = [], [], [], []
+        Se = pg.ElementMatrix()
+        for i, b in enumerate(boundaries):
+            ids = np.asarray(b.ids(), dtype=int)
+            k = len(ids)
+
+            if k == 1:
+                Ae = np.ones((1, 1))
+            elif k == 2 and dim == 2:
+                L = np.linalg.norm(pos[ids[1]] - pos[ids[0]])
+                Ae = (np.ones((2, 2)) + np.eye(2)) * L / 6.
+            elif k == 3 and dim == 3:
+                A = 0.5 * np.linalg.norm(np.cross(pos[ids[1]] - pos[ids[0]],
+                                                  pos[ids[2]] - pos[ids[0]]))
+                Ae = (np.ones((3, 3)) + np.eye(3)) * A / 12.
+            else:
+                Se.u2(b)
+                ids = np.asarray(Se.idx(), dtype=int)
+                Ae = np.asarray([np.asarray(Se.row(j)) for j in range(k)])
+
+            rows.append(np.repeat(ids, k))
+            cols.append(np.tile(ids, k))
+            vals.append(Ae.ravel())
+            bIdx.append(np.ones(k * k, dtype=int) * i)
+
+        if len(boundaries) > 0:
+            rows, cols = np.concatenate(rows), np.concatenate(cols)
+            self._vals = np.concatenate(vals)
+            self._bIdx = np.concatenate(bIdx)
+            self._valIdx = _patternIndex(mesh, rows, cols)
+        else:
+            self._vals = np.zeros(0)
+            self._bIdx = np.zeros(0, dtype=int)
+            self._valIdx = np.zeros(0, dtype=int)
+
+        self._nVals = len(_sparsityPattern(mesh, _meshCache(mesh))[1])
+
+    def values(self, time=0.0, userData=None):
+        """Return the Neumann values for all boundaries."""
+        if type(self.value) == float or type(self.value) == int:
+            return np.ones(len(self.boundaries)) * self.value
+
+        if not hasattr(self.value, '__call__'):
+            val = np.asarray(self.value, dtype=float)
+            if len(val) != len(self.boundaries):
+                raise Exception("Neumann values have the wrong size: " +
+                                str(len(val)) + " != " +
+                                str(len(self.boundaries)))
+            return val
+
+        if self.vectorized:
+            val = np.asarray(_callBoundaryValue(self.value, self.centers,
+                                                time, userData), dtype=float)
+            if val.ndim == 0:
+                val = np.ones(len(self.boundaries)) * val
+            return val
+
+        return np.asarray([_callBoundaryValue(self.value, b, time, userData)
+                           for b in self.boundaries], dtype=float)
+
+    def apply(self, S, rhs=None, time=0.0, userData=None):
+        """
+        Add the boundary element matrices scaled with the values to S.
+
+        rhs is unused and for compatibility only.
+        """
+        val = self.values(time, userData)
+
+        if not isinstance(S, pg.RSparseMatrix) or S.nVals() != self._nVals:
+            Se = pg.ElementMatrix()
+            for i, b in enumerate(self.boundaries):
+                if val[i] != 0.0:
+                    Se.u2(b)
+                    Se *= val[i]
+                    S += Se
+            return
+
+        dVals = np.bincount(self._valIdx, weights=self._vals * val[self._bIdx],
+                            minlength=self._nVals)
+        S.vecVals().addVal(pg.RVector(dVals), 0, self._nVals)
+
+
+def createBoundaryConditions(mesh, boundArgs, bcType, vectorized=False):
+    """
+    Create a list of boundary condition objects for the given boundArgs.
+
+    Parameters
+    ----------
+    boundArgs : list | DirichletBC | NeumannBC
+        Boundary conditions in the same form as for
+        :py:func:`assembleBoundaryConditions` or already created
+        boundary condition object(s).
+    bcType : DirichletBC | NeumannBC
+        Type of the boundary conditions to create.
+    """
+    if isinstance(boundArgs, (DirichletBC, NeumannBC)):
+        return [boundArgs]
+
+    if all(isinstance(b, (DirichletBC, NeumannBC)) for b in boundArgs):
+        return list(boundArgs)
+
+    return [bcType(mesh, bound[0], bound[1], vectorized=vectorized)
+            for bound in _parseBoundaryPairs(mesh, boundArgs)]
+
+
+def _meshCache(mesh):
+    """
+    Return the dictionary of cached array data for the given mesh.
+
+    The cache is keyed by the mesh object and invalidated whenever the node,
+    cell or boundary count or any node position changes, so all data stored
+    in it may safely be reused as long as it only depends on the geometry.
+    """
+    p = mesh.positions()
+    pos = np.vstack([np.asarray(pg.x(p)),
+                     np.asarray(pg.y(p)),
+                     np.asarray(pg.z(p))]).T
+
+    signature = (mesh.nodeCount(), mesh.cellCount(), mesh.boundaryCount(),
+                 hashlib.sha1(np.ascontiguousarray(pos)).hexdigest())
+
+    key = id(mesh)
+    cache = __meshCache__.get(key, None)
+
+    if cache is None or cache['signature'] != signature:
+        if len(__meshCache__) >= __meshCacheMaxSize__:
+            __meshCache__.pop(list(__meshCache__.keys())[0])
+
+        cache = dict(signature=signature, pos=pos)
+        __meshCache__[key] = cache
+
+    return cache
+
+__meshCache__ = dict()
+__meshCacheMaxSize__ = 8
+
+
+def _entityCoordinates(mesh, ndof):
+    """
+    Return the (N, 3) coordinates and the N markers of the nodes, cells
+    or boundaries of the mesh, depending on ndof. The coordinates are cached
+    with :py:func:`_meshCache`, the markers are always read from the mesh.
+    """
+    cache = _meshCache(mesh)
+
+    if ndof == mesh.nodeCount():
+        return cache['pos'], np.array(mesh.nodeMarker())
+
+    if ndof == mesh.cellCount():
+        if 'cellCenters' not in cache:
+            c = mesh.cellCenters()
+            cache['cellCenters'] = np.vstack([np.asarray(pg.x(c)),
+                                              np.asarray(pg.y(c)),
+                                              np.asarray(pg.z(c))]).T
+        return cache['cellCenters'], np.array(mesh.cellMarker())
+
+    if ndof == mesh.boundaryCount():
+        if 'boundaryCenters' not in cache:
+            cache['boundaryCenters'] = np.asarray(
+                [[b.center()[0], b.center()[1], b.center()[2]]
+                 for b in mesh.boundaries()], dtype=float).reshape(-1, 3)
+        return cache['boundaryCenters'], np.array(mesh.boundaryMarker())
+
+    raise Exception("Cannot find entities for " + str(ndof) +
+                    " values. nodes: " + str(mesh.nodeCount()) +
+                    " cells: " + str(mesh.cellCount()) +
+                    " boundaries: " + str(mesh.boundaryCount()))
+
+
+def _cellConnectivity(mesh, cache):
+    """
+    Return cell ids and node ids grouped by the number of cell nodes.
+
+    Returns
+    -------
+    groups : dict
+        nodeCount -> (cellIds (M,), nodeIds (M, nodeCount))
+    """
+    if 'cellGroups' not in cache:
+        groups = dict()
+        for c in mesh.cells():
+            groups.setdefault(c.nodeCount(), []).append([c.id()] +
+                                                        list(c.ids()))
+
+        for k, v in groups.items():
+            v = np.asarray(v, dtype=int)
+            groups[k] = (v[:, 0], v[:, 1:])
+
+        cache['cellGroups'] = groups
+
+    return cache['cellGroups']
+
+
+def _simplexGeometry(pos, ids):
+    """
+    Return volume and gradients of the linear shape functions for simplex
+    cells, i.e., edges in 1D, triangles in 2D and tetrahedrons in 3D.
+
+    Parameters
+    ----------
+    pos : array (N, dim)
+        Node positions.
+    ids : array (M, dim + 1)
+        Node ids for every cell.
+
+    Returns
+    -------
+    vol : array (M,)
+        Cell sizes.
+    grad : array (M, dim + 1, dim)
+        Gradients of the shape functions for every cell node.
+    """
+    dim = pos.shape[1]
+    x0 = pos[ids[:, 0]]
+
+    # J[m, i, :] = x_(i+1) - x_0
+    J = pos[ids[:, 1:]] - x0[:, np.newaxis, :]
+
+    detJ = np.linalg.det(J)
+    fac = 1.0
+    for i in range(2, dim + 1):
+        fac *= i
+    vol = np.abs(detJ) / fac
+
+    grad = np.zeros((len(ids), dim + 1, dim))
+    grad[:, 1:, :] = np.linalg.inv(J).transpose(0, 2, 1)
+    grad[:, 0, :] = -grad[:, 1:, :].sum(axis=1)
+    return vol, grad
+
+
+def _elementMatrixTriplets(mesh, cache, kind):
+    """
+    Return COO triplets of the coefficient free element matrices.
+
+    Element matrices for linear simplex cells are calculated at once with
+    NumPy, all other cell types fall back to :gimliapi:`GIMLI::ElementMatrix`.
+    The results only depend on the mesh geometry and are cached.
+
+    Parameters
+    ----------
+    kind : str
+        'stiffness' for :math:`\\int\\nabla u\\nabla v` or
+        'mass' for :math:`\\int u v`.
+
+    Returns
+    -------
+    rows, cols, vals, cellIdx : array
+        Row and column index, value and corresponding cell id of every
+        element matrix entry.
+    """
+    key = 'triplets_' + kind
+    if key in cache:
+        return cache[key]
+
+    dim = mesh.dimension()
+    pos = cache['pos'][:, 0:dim]
+
+    rows, cols, vals, cellIdx = [], [], [], []
+
+    for k, (cIds, ids) in sorted(_cellConnectivity(mesh, cache).items()):
+
+        if k == dim + 1:
+            vol, grad = _simplexGeometry(pos, ids)
+
+            if kind == 'stiffness':
+                Ae = np.einsum('mid,mjd->mij', grad, grad) * \
+                    vol[:, np.newaxis, np.newaxis]
+            else:
+                Ae = (np.ones((k, k)) + np.eye(k)) / ((dim + 1.) * (dim + 2.))
+                Ae = Ae[np.newaxis, :, :] * vol[:, np.newaxis, np.newaxis]
+
+        else:
+            Ae = np.zeros((len(cIds), k, k))
+            A_l = pg.ElementMatrix()
+            for i, cId in enumerate(cIds):
+                if kind == 'stiffness':
+                    A_l.ux2uy2uz2(mesh.cell(int(cId)))
+                else:
+                    A_l.u2(mesh.cell(int(cId)))
+                # idx() follows the cell node order
+                for j in range(k):
+                    Ae[i, j] = np.asarray(A_l.row(j))
+
+        rows.append(np.repeat(ids, k, axis=1).ravel())
+        cols.append(np.tile(ids, (1, k)).ravel())
+        vals.append(Ae.ravel())
+        cellIdx.append(np.repeat(cIds, k * k))
+
+    cache[key] = (np.concatenate(rows), np.concatenate(cols),
+                  np.concatenate(vals), np.concatenate(cellIdx))
+    return cache[key]
+
+
+def _sparsityPattern(mesh, cache):
+    """
+    Return the CSR sparsity pattern for the given mesh.
+
+    The ordering is the same as the one from
+    :gimliapi:`GIMLI::SparseMatrix::buildSparsityPattern`,
+    i.e., sorted column indices for each row.
+
+    Returns
+    -------
+    colPtr, rowIdx : array
+        Compressed pattern.
+    perm : array
+        Map from every element matrix triplet into the value array.
+    """
+    if 'pattern' in cache:
+        return cache['pattern']
+
+    rows, cols, vals, cellIdx = _elementMatrixTriplets(mesh, cache,
+                                                       'stiffness')
+    nNodes = mesh.nodeCount()
+    keys, perm = np.unique(rows * nNodes + cols, return_inverse=True)
+
+    rowIdx = keys % nNodes
+    colPtr = np.zeros(nNodes + 1, dtype=int)
+    colPtr[1:] = np.cumsum(np.bincount(keys // nNodes, minlength=nNodes))
+
+    cache['pattern'] = (colPtr, rowIdx, perm.ravel())
+    cache['patternKeys'] = keys
+    return cache['pattern']
+
+
+def _patternIndex(mesh, rows, cols):
+    """
+    Return the positions of the entries (rows, cols) in the value array of
+    a sparse matrix with the sparsity pattern of the given mesh.
+    """
+    cache = _meshCache(mesh)
+    _sparsityPattern(mesh, cache)
+    keys = cache['patternKeys']
+
+    k = np.asarray(rows, dtype=int) * mesh.nodeCount() + \
+        np.asarray(cols, dtype=int)
+    idx = np.searchsorted(keys, k)
+
+    if np.any(idx >= len(keys)) or np.any(keys[np.minimum(idx,
+                                                          len(keys) - 1)] != k):
+        raise Exception("Entries are not part of the sparsity pattern.")
+    return idx
+
+
+def _loadVectorWeights(mesh, cache):
+    """
+    Return the per cell load vector weights :math:`\\int_{cell} u`.
+
+    Linear simplex cells are calculated at once with NumPy, all other cell
+    types fall back to :gimliapi:`GIMLI::ElementMatrix`.
+
+    Returns
+    -------
+    nodeIdx, cellIdx, weights : array
+        Node id, cell id and weight for every cell node.
+    """
+    if 'loadWeights' in cache:
+        return cache['loadWeights']
+
+    dim = mesh.dimension()
+    pos = cache['pos'][:, 0:dim]
+
+    nodeIdx, cellIdx, weights = [], [], []
+
+    for k, (cIds, ids) in sorted(_cellConnectivity(mesh, cache).items()):
+
+        if k == dim + 1:
+            vol, grad = _simplexGeometry(pos, ids)
+            w = np.repeat(vol[:, np.newaxis] / (dim + 1.), k, axis=1)
+        else:
+            w = np.zeros((len(cIds), k))
+            b_l = pg.ElementMatrix()
+            for i, cId in enumerate(cIds):
+                b_l.u(mesh.cell(int(cId)))
+                w[i] = np.asarray(b_l.row(0))
+
+        nodeIdx.append(ids.ravel())
+        cellIdx.append(np.repeat(cIds, k))
+        weights.append(w.ravel())
+
+    cache['loadWeights'] = (np.concatenate(nodeIdx), np.concatenate(cellIdx),
+                            np.concatenate(weights))
+    return cache['loadWeights']
+
+
+def _assembleSparseMatrix(mesh, kind, a):
+    """
+    Assemble the global matrix of the given kind scaled with the per cell
+    values a by refilling the cached sparsity pattern.
+    """
+    cache = _meshCache(mesh)
+    colPtr, rowIdx, perm = _sparsityPattern(mesh, cache)
+    rows, cols, vals, cellIdx = _elementMatrixTriplets(mesh, cache, kind)
+
+    nVals = len(rowIdx)
+    if isinstance(a, pg.CVector):
+        a = np.asarray(pg.real(a)) + 1j * np.asarray(pg.imag(a))
+    else:
+        a = np.asarray(a)
+
+    if len(a) != mesh.cellCount():
+        raise Exception("Per cell values have the wrong size: " +
+                        str(len(a)) + " != " + str(mesh.cellCount()))
+
+    if np.iscomplexobj(a):
+        w = vals * a[cellIdx]
+        re = np.bincount(perm, weights=w.real, minlength=nVals)
+        im = np.bincount(perm, weights=w.imag, minlength=nVals)
+
+        if 'complexTemplate' not in cache:
+            cache['complexTemplate'] = pg.CSparseMatrix()
+            cache['complexTemplate'].buildSparsityPattern(mesh)
+
+        A = pg.CSparseMatrix(cache['complexTemplate'])
+        A.vecVals().setVal(pg.toComplex(pg.RVector(re), pg.RVector(im)),
+                           0, nVals)
+    else:
+        v = np.bincount(perm, weights=vals * a[cellIdx], minlength=nVals)
+
+        if 'realTemplate' not in cache:
+            cache['realTemplate'] = pg.RSparseMatrix()
+            cache['realTemplate'].buildSparsityPattern(mesh)
+
+        A = pg.RSparseMatrix(cache['realTemplate'])
+        A.vecVals().setVal(pg.RVector(v), 0, nVals)
+
+    return A
+
 
 def createStiffnessMatrix(mesh, a=None):
     """
@@ -395,6 +1247,10 @@ def createStiffnessMatrix(mesh, a=None):
     
     ..math::
             ...
+
+    The element matrices and the sparsity pattern only depend on the mesh
+    geometry, so they are calculated once per mesh and cached. Repeated calls
+    with new values a only refill the matrix values.
     
     Parameters
     ----------
@@ -408,37 +1264,15 @@ def createStiffnessMatrix(mesh, a=None):
     Returns
     -------
     
-    A : pg.RSparseMatrix
+    A : pg.RSparseMatrix | pg.CSparseMatrix
         Stiffness matrix 
     
     """
-    
     if a is None:
-        a = pg.RVector(mesh.cellCount(), 1.0)
-    
-    A = None
-    
-    if type(a[0]) is float or type(a[0]) is np.float64:
-        
-        A = pg.RSparseMatrix()
-        A.fillStiffnessMatrix(mesh, a)
-        return A
-    else:
-        A = pg.CSparseMatrix()
-    
-    # create matrix structure regarding the mesh
-    A.buildSparsityPattern(mesh)
+        a = np.ones(mesh.cellCount())
+
+    return _assembleSparseMatrix(mesh, 'stiffness', a)
 
-    
-    # define a local element matrix 
-    A_l = pg.ElementMatrix()
-    for c in mesh.cells():
-        A_l.ux2uy2uz2(c)
-        #A_l *= a[c.id()] 
-        #A += A_l
-        A.add(A_l, a[c.id()])
-    
-    return A
 
 def createMassMatrix(mesh, b=None):
     """
@@ -446,6 +1280,9 @@ def createMassMatrix(mesh, b=None):
     
     ..math::
             ...
+
+    Uses the same cached element matrices and sparsity pattern like
+    :py:func:`createStiffnessMatrix`.
     
     Parameters
     ----------
@@ -459,28 +1296,13 @@ def createMassMatrix(mesh, b=None):
     -------
     
     A : pg.RSparseMatrix
-        Stiffness matrix 
+        Mass matrix 
     
     """
     if b is None:
-        b = pg.RVector(mesh.cellCount(), 1.0)
-        
-    B = pg.RSparseMatrix()
-    B.fillMassMatrix(mesh, b)
-    return B
+        b = np.ones(mesh.cellCount())
 
-    # create matrix structure regarding the mesh
-    B.buildSparsityPattern(mesh)
-    
-    # define a local element matrix 
-    B_l = pg.ElementMatrix()
-    for c in mesh.cells():
-        B_l.u2(c)
-        # check if b[i] == B*b
-        B_l *= b[c.id()]
-        B += B_l
-    
-    return B
+    return _assembleSparseMatrix(mesh, 'mass', b)
 
     
 
@@ -525,8 +1347,15 @@ def solveFEM(mesh, a=1.0, b=0.0, f=0.0, times=None, userData=None,
     u0 : value | array | callable(pos, userData)
         Node values
         
-    f : value | array(cells) | array(nodes) | callable(args, kwargs)
-        force values 
+    vectorized : bool [False]
+        Calling convention for callable a, b and u0, see
+        :py:func:`parseArgToArray`. If True they are called once with the
+        array of all cell centers or node positions and the markers.
+
+    f : value | array(cells) | array(nodes) | callable(args, kwargs) | list
+        force values. For stationary problems a list of force values
+        (or a 2D array with one force vector per row) is solved with one
+        factorization of the system matrix.
     
     times : array [None]
         solve as time dependent problem for the given times
@@ -544,14 +1373,72 @@ def solveFEM(mesh, a=1.0, b=0.0, f=0.0, times=None, userData=None,
         If unsure choose 0.5 + epsilon, which is probably be stable.
     
     progress : bool
-        Give some calculation progress.
+        Give some calculation progress. For time dependent problems the
+        preparation, factorization and solving time is printed for each step.
+
+    method : str ['direct']
+        Linear solver, 'direct' for pg.LinSolver or the Krylov methods 'cg'
+        or 'gmres' with the additional keywords preconditioner, tol and
+        maxiter, see :py:func:`linsolve`. Time dependent problems use the
+        solution of the last step as start solution and reuse the
+        preconditioner like the factorization.
+
+    nThreads, chunkSize : int [1, 64]
+        Stationary problems with a list of force values only, see
+        :py:func:`linsolveBlock`.
+
+    fTime : callable(t, [userData])
+        Time dependent problems only. Returns the force values f for the
+        time t. It is evaluated lazily for every time step and overrides f.
+
+    output : None | str | callable(t, u) | 'stream' [None]
+        Time dependent problems only. Where to put the time steps:
+        None returns an array with all (stored) time steps, a filename
+        writes them into a memory mapped .npy file which is returned,
+        a callable is called for every step and 'stream' returns a
+        generator yielding (t, u). Except for None and the file only the
+        last step is kept in memory.
+
+    decimate : int [1]
+        Time dependent problems only. Store every decimate-th time step only.
+
+    adaptive : bool [False]
+        Time dependent problems only. Choose the time steps adaptively
+        between times[0] and times[-1] from the difference of implicit
+        Euler and Crank-Nicolson solutions. The solution is returned for
+        the given times (linearly interpolated between the steps).
+        The step sizes are dt0 * 2^k, so factorizations are reused whenever
+        a step size repeats. If stats is given, acceptedSteps,
+        rejectedSteps, factorizations and steps, a list of
+        (time, dt, error, accepted, duration), are set.
+
+    dtTol : float [1e-3]
+        Adaptive time stepping only. Tolerated error per step relative to
+        1 + max(|u|).
+
+    dt0, dtMin, dtMax : float
+        Adaptive time stepping only. Initial (default: smallest step of
+        times), minimal and maximal time step.
+
+    maxSolvers : int [6]
+        Adaptive time stepping only. Number of factorized system matrices
+        kept for repeating step sizes, the least recently used one is
+        dropped first.
+
+    reuseFactorization : bool [True]
+        Time dependent problems only. Reuse the factorized system matrix as
+        long as the time step and the coefficients do not change.
+        Otherwise the system matrix is refilled from the cached sparsity
+        pattern and factorized again, including the symbolic analysis,
+        since pg.LinSolver cannot reuse it. If stats is given,
+        factorizations counts the factorizations.
 
     Returns
     -------
     
     u : array
         Returns the solution u either 1,n array for stationary problems or 
-        for m,n array for m time steps
+        for m,n array for m time steps or m force vectors
         
     See Also
     --------
@@ -560,6 +1447,12 @@ def solveFEM(mesh, a=1.0, b=0.0, f=0.0, times=None, userData=None,
     
     """
     debug = kwargs.pop('debug', False)
+
+    method = kwargs.pop('method', 'direct')
+    iterOpts = dict()
+    for key in ('preconditioner', 'tol', 'maxiter'):
+        if key in kwargs:
+            iterOpts[key] = kwargs.pop(key)
         
     if verbose:
         print("Mesh: ", str(mesh))
@@ -570,8 +1463,9 @@ def solveFEM(mesh, a=1.0, b=0.0, f=0.0, times=None, userData=None,
     swatch2 = pg.Stopwatch(True)
     
     # check for material parameter
-    a = parseArgToArray(a, mesh.cellCount(), mesh, userData)
-    b = parseArgToArray(b, mesh.cellCount(), mesh, userData)
+    vectorized = kwargs.get('vectorized', False)
+    a = parseArgToArray(a, mesh.cellCount(), mesh, userData, vectorized)
+    b = parseArgToArray(b, mesh.cellCount(), mesh, userData, vectorized)
         
     if debug: print("2: ", swatch2.duration(True))
     # assemble the stiffness matrix
@@ -584,23 +1478,30 @@ def solveFEM(mesh, a=1.0, b=0.0, f=0.0, times=None, userData=None,
     S = A + M
     
     if debug: print("5: ", swatch2.duration(True))
+    # node indices and boundary element matrices are precomputed once
+    uBCs, duBCs = [], []
+    if 'uBoundary' in kwargs:
+        uBCs = createBoundaryConditions(mesh, kwargs['uBoundary'],
+                                        DirichletBC)
+    if 'duBoundary' in kwargs:
+        duBCs = createBoundaryConditions(mesh, kwargs['duBoundary'],
+                                         NeumannBC)
+
     if times is None:
         
+        if _isForceList(f, mesh):
+            return _solveFEMMultiRHS(mesh, S, f, uBCs, duBCs, userData,
+                                     verbose, stats, method, iterOpts,
+                                     **kwargs)
+
         rhs = assembleForceVector(mesh, f, userData=userData)
         
         if debug: print("6a: ", swatch2.duration(True))
-        if 'duBoundary' in kwargs:
-            assembleBoundaryConditions(mesh, S, rhs, kwargs['duBoundary'], 
-                                       assembleNeumannBC,
-                                       userData=userData, 
-                                       verbose=verbose)
+        for bc in duBCs:
+            bc.apply(S, rhs, userData=userData)
 
         if debug: print("6b: ", swatch2.duration(True))
-        if 'uBoundary' in kwargs:
-            assembleBoundaryConditions(mesh, S, rhs, kwargs['uBoundary'],
-                                       assembleDirichletBC, 
-                                       userData=userData,
-                                       verbose=verbose)
+        _applyDirichletBC(uBCs, S, rhs, userData=userData)
 
         if debug: print("6c: ", swatch2.duration(True))
         if 'uDirichlet' in kwargs:
@@ -626,102 +1527,440 @@ def solveFEM(mesh, a=1.0, b=0.0, f=0.0, times=None, userData=None,
 
         #showSparseMatrix(S)
         
-        solver = pg.LinSolver(True)
-        solver.setMatrix(S, 0)
-        u = solver.solve(rhs)
+        if method == 'direct':
+            solver = pg.LinSolver(True)
+            solver.setMatrix(S, 0)
+            u = solver.solve(rhs)
+        else:
+            u0 = kwargs.get('u0', None)
+            if u0 is not None:
+                u0 = parseArgToArray(u0, dof, mesh, userData,
+                                     kwargs.get('vectorized', False))
+
+            u = linsolve(S, rhs, verbose=verbose, method=method, x0=u0,
+                         stats=stats, **iterOpts)
         
         solverTime = swatch.duration(True)
+        if stats:
+            stats.solverTime = solverTime
         if verbose:
-            if stats:
-                stats.solverTime = solverTime
             print(("Solving time: ", solverTime))
             
         return u
         
     else:
-        if debug: print("start TL", swatch.duration())
-        M = createMassMatrix(mesh, pg.RVector(mesh.cellCount(), 1.0))
+        if kwargs.get('adaptive', False):
+            steps = _solveFEMAdaptive(mesh, A, f, times, uBCs, duBCs,
+                                      userData, verbose, stats, method,
+                                      iterOpts, **kwargs)
+        else:
+            steps = _solveFEMTransient(mesh, A, f, times, uBCs, duBCs,
+                                       userData, verbose, stats, method,
+                                       iterOpts, debug, **kwargs)
+        return _storeTimeSteps(steps, times, dof,
+                               output=kwargs.get('output', None),
+                               decimate=kwargs.get('decimate', 1))
+# def solvePoisson(..):
 
-        rhs = np.zeros((len(times), dof))
-        # rhs kann zeitabhängig sein ..wird hier nicht berücksichtigt
-        rhs[:] = assembleForceVector(mesh, f) # this is slow: optimize
-        
-        if debug: print("rhs", swatch.duration())
-        U = np.zeros((len(times), dof))
-        #init state
-        u = pg.RVector(dof, 0.0)
-        
-        if 'u0' in kwargs:
-            U[0, :] = parseArgToArray(kwargs['u0'], dof, mesh, userData)
-            
-        theta = 1.0
-        if 'theta' in kwargs:
-             theta = float(kwargs['theta'])
-             
-        if debug: print("u0", swatch.duration())
-             
-        measure = 0.
-        for n in range(1, len(times)):
-            swatch.reset()
-            
-            dt = times[n] - times[n - 1]
-            
-            #u[n] = u[n-1] + dt * theta * L(u[n]) + dt * (1-theta) * L(u[n-1])
-            
-            
-            
-            # previous timestep
-            #print "i: ", i, dt, U[i - 1]
-            
-            if 'duBoundary' in kwargs:
-                # aufschreiben und checken ob neumann auf A oder auf S mit skaliertem val*dt angewendet wird
-                A = createStiffnessMatrix(mesh, a)
-                assembleBoundaryConditions(mesh, A, None, kwargs['duBoundary'],
-                                           assembleNeumannBC,
-                                           time=times[n],
-                                           verbose=verbose)
-
-            swatch.reset()
-            # (A + a*B)u is fastest, followed by A*u + (B*u)*a and finally A*u + a*B*u and 
-            b = (M - (dt*(1.0 - theta)) * A) * U[n - 1] + \
-                dt * ((1.0 - theta) * rhs[n - 1] + theta * rhs[n])
-                       
-            #print ('a',swatch.duration(True))
-            #b = M * U[n - 1] - (A * U[n - 1]) * (dt*(1.0 - theta)) + \
-                #dt * ((1.0 - theta) * rhs[n - 1] + theta * rhs[n])
-            
-            #print ('b',swatch.duration(True))
-            
-            #b = M * U[n - 1] - (dt*(1.0 - theta)) * A * U[n - 1] + \
-                #dt * ((1.0 - theta) * rhs[n - 1] + theta * rhs[n])
-            #print ('c',swatch.duration(True))
-                        
-            measure += swatch.duration()
-            
+def _forceAtTime(mesh, f, fTime=None, userData=None):
+    """
+    Return a function t -> rhs array. Without fTime the rhs for f is
+    assembled once, otherwise the force values fTime(t, [userData]) are
+    assembled on every call.
+    """
+    if fTime is None:
+        rhs = np.asarray(assembleForceVector(mesh, f))
+        return lambda t: rhs
+
+    def _rhs(t):
+        if userData is not None:
+            return np.asarray(assembleForceVector(mesh, fTime(t, userData),
+                                                  userData=userData))
+        return np.asarray(assembleForceVector(mesh, fTime(t)))
+    return _rhs
+
+
+def _solveFEMTransient(mesh, A, f, times, uBCs, duBCs, userData, verbose,
+                       stats, method, iterOpts, debug=False, **kwargs):
+    """
+    Generator for the time steps of solveFEM yielding (time, u).
+
+    Only the solution and the rhs of the last step are kept, a time dependent
+    force (fTime) is assembled per step when it is needed.
+    """
+    swatch = pg.Stopwatch(True)
+    dof = mesh.nodeCount()
+
+    if debug: print("start TL", swatch.duration())
+    M = createMassMatrix(mesh, pg.RVector(mesh.cellCount(), 1.0))
+
+    _rhs = _forceAtTime(mesh, f, kwargs.get('fTime', None), userData)
+
+    if debug: print("rhs", swatch.duration())
+
+    #init state
+    u = pg.RVector(dof, 0.0)
+    uLast = np.zeros(dof)
+    if 'u0' in kwargs:
+        uLast[:] = parseArgToArray(kwargs['u0'], dof, mesh, userData,
+                                   kwargs.get('vectorized', False))
+
+    rhsLast = _rhs(times[0])
+    yield times[0], uLast
+
+    theta = 1.0
+    if 'theta' in kwargs:
+         theta = float(kwargs['theta'])
+
+    if debug: print("u0", swatch.duration())
+
+    A0 = A
+    reuse = kwargs.get('reuseFactorization', True)
+    solver = None
+    S0 = None
+    dtLast = None
+    ALast = None
+    nFactorizations = 0
+    iterations = 0
+    converged = True
+
+    measure = 0.
+    for n in range(1, len(times)):
+        swatch.reset()
+
+        dt = times[n] - times[n - 1]
+
+        #u[n] = u[n-1] + dt * theta * L(u[n]) + dt * (1-theta) * L(u[n-1])
+
+        if len(duBCs) > 0:
+            # aufschreiben und checken ob neumann auf A oder auf S mit skaliertem val*dt angewendet wird
+            A = pg.RSparseMatrix(A0)
+            for bc in duBCs:
+                bc.apply(A, None, time=times[n], userData=userData)
+
+        swatch.reset()
+        rhsNow = _rhs(times[n])
+        # (A + a*B)u is fastest, followed by A*u + (B*u)*a and finally A*u + a*B*u and 
+        b = (M - (dt*(1.0 - theta)) * A) * uLast + \
+            dt * ((1.0 - theta) * rhsLast + theta * rhsNow)
+
+        measure += swatch.duration()
+
+        # The system matrix only changes with dt or with new
+        # coefficients (time dependent Neumann conditions), so we can
+        # reuse the factorization of the last step otherwise.
+        # copy, a view of the reference returned by vecVals() does not
+        # keep A alive, which is rebuilt for time dependent Neumann values
+        AVals = np.array(A.vecVals())
+        newSystem = solver is None or not reuse or \
+            not np.isclose(dt, dtLast, rtol=1e-12, atol=0.0) or \
+            not np.array_equal(AVals, ALast)
+
+        if newSystem:
+            # new system from the cached pattern, pg.LinSolver repeats the
+            # symbolic analysis as well
             S = M + A * dt * theta
-                
-            if 'uBoundary' in kwargs:
-                assembleBoundaryConditions(mesh, S, b, kwargs['uBoundary'], 
-                                           assembleDirichletBC,
-                                           time=times[n],
-                                           verbose=verbose)
-                
-            #u = S/b
-            t_prep = swatch.duration(True)
-            solver = pg.LinSolver(S, verbose)
+            # keep the unconstrained system to correct the rhs for
+            # the Dirichlet values in the following steps
+            if len(uBCs) > 0:
+                S0 = pg.RSparseMatrix(S)
+            _applyDirichletBC(uBCs, S, b, time=times[n],
+                              userData=userData)
+        else:
+            _applyDirichletBC(uBCs, S0, b, time=times[n],
+                              userData=userData, constrainMatrix=False)
+
+        #u = S/b
+        t_prep = swatch.duration(True)
+        if newSystem:
+            if method == 'direct':
+                solver = pg.LinSolver(S, verbose)
+            else:
+                solver = IterativeSolver(S, method=method,
+                                         verbose=verbose, **iterOpts)
+            nFactorizations += 1
+            dtLast = dt
+            ALast = AVals
+        t_fact = swatch.duration(True)
+
+        if method == 'direct':
             solver.solve(b, u)
-            
-            if 'plotTimeStep' in kwargs:
-                kwargs['plotTimeStep'](u, times[n])
-                    
-            U[n,:] = np.asarray(u)
+        else:
+            # warm start with the solution of the last time step
+            u = pg.RVector(solver.solve(b, x0=uLast))
+            iterations += solver.iterations
+            converged = converged and solver.converged
 
-            if 'progress' in kwargs:
-                if kwargs['progress']:
-                    print(("\t" + str(n) +"/" + str(len(times)-1) + 
-                          ": " + str(t_prep) +"/" + str(swatch.duration())))
-        
-        if debug: print("Measure("+str(len(times))+"): ",
-                        measure, measure/len(times))
-        return U
-# def solvePoisson(..):
\ No newline at end of file
+        if 'plotTimeStep' in kwargs:
+            kwargs['plotTimeStep'](u, times[n])
+
+        uLast = np.array(u)
+        rhsLast = rhsNow
+
+        if 'progress' in kwargs:
+            if kwargs['progress']:
+                print(("\t" + str(n) +"/" + str(len(times)-1) + 
+                      ": " + str(t_prep) + "/" + str(t_fact) +
+                      "/" + str(swatch.duration()) +
+                      (" (factorized)" if newSystem else " (reused)")))
+
+        if stats:
+            stats.factorizations = nFactorizations
+            if method != 'direct':
+                stats.iterations = iterations
+                stats.converged = converged
+
+        yield times[n], uLast
+
+    if debug: print("Measure("+str(len(times))+"): ",
+                    measure, measure/len(times))
+
+
+def _solveFEMAdaptive(mesh, A, f, times, uBCs, duBCs, userData, verbose,
+                      stats, method, iterOpts, **kwargs):
+    """
+    Generator for adaptive time stepping yielding (time, u) for the
+    requested output times.
+
+    Every step is solved with implicit Euler (theta=1) and Crank-Nicolson
+    (theta=0.5) and the difference is used as error estimate. Accepted steps
+    are advanced with the Crank-Nicolson solution, the output times are
+    linearly interpolated between the accepted steps.
+
+    The step sizes are dt0 * 2^k, so the system matrices M + theta dt A
+    repeat and their factorizations are cached. Note that the
+    Crank-Nicolson matrix of level k equals the implicit Euler matrix of
+    level k-1. Only the maxSolvers recently used factorizations are kept,
+    since clipped steps, e.g., the last one, do not repeat.
+    """
+    from collections import OrderedDict
+
+    swatch = pg.Stopwatch(True)
+    dof = mesh.nodeCount()
+
+    M = createMassMatrix(mesh, pg.RVector(mesh.cellCount(), 1.0))
+    _rhs = _forceAtTime(mesh, f, kwargs.get('fTime', None), userData)
+
+    t = times[0]
+    tEnd = times[-1]
+    dtTol = kwargs.get('dtTol', 1e-3)
+    dtMax = kwargs.get('dtMax', tEnd - t)
+    dtMin = kwargs.get('dtMin', (tEnd - t) * 1e-10)
+    dt0 = kwargs.get('dt0', np.min(np.diff(times)))
+    maxSolvers = max(int(kwargs.get('maxSolvers', 6)), 2)
+    level = 0
+    progress = kwargs.get('progress', False)
+
+    u = np.zeros(dof)
+    if 'u0' in kwargs:
+        u[:] = parseArgToArray(kwargs['u0'], dof, mesh, userData,
+                               kwargs.get('vectorized', False))
+
+    rhsLast = _rhs(t)
+    yield times[0], u
+    iOut = 1
+
+    A0 = A
+    ALast = None
+    solvers = OrderedDict()
+    # list, so _solve can count without nonlocal
+    nFactorizations = [0]
+    steps = []
+
+    def _solve(c, b, time, x0):
+        """Solve (M + c A) x = b, the factorization is cached for c."""
+        if c in solvers:
+            # mark as recently used
+            solvers[c] = solvers.pop(c)
+        else:
+            if len(solvers) >= maxSolvers:
+                solvers.popitem(last=False)
+
+            S = M + A * c
+            # the unconstrained system corrects the rhs for Dirichlet values
+            S0 = pg.RSparseMatrix(S) if len(uBCs) > 0 else S
+            _applyDirichletBC(uBCs, S, None)
+
+            if method == 'direct':
+                solver = pg.LinSolver(S, verbose)
+            else:
+                solver = IterativeSolver(S, method=method, verbose=verbose,
+                                         **iterOpts)
+            solvers[c] = (solver, S0)
+            nFactorizations[0] += 1
+
+        solver, S0 = solvers[c]
+        _applyDirichletBC(uBCs, S0, b, time=time, userData=userData,
+                          constrainMatrix=False)
+
+        if method == 'direct':
+            x = pg.RVector(dof, 0.0)
+            solver.solve(b, x)
+            return np.asarray(x)
+        return solver.solve(b, x0=x0)
+
+    while tEnd - t > 1e-12 * (tEnd - times[0]):
+        swatch.reset()
+
+        dt = min(dt0 * 2.0**level, dtMax)
+        if t + dt > tEnd:
+            dt = tEnd - t
+        tNew = t + dt
+
+        if len(duBCs) > 0:
+            A = pg.RSparseMatrix(A0)
+            for bc in duBCs:
+                bc.apply(A, None, time=tNew, userData=userData)
+
+        # copy, a view of the reference returned by vecVals() does not
+        # keep A alive, which is rebuilt for time dependent Neumann values
+        AVals = np.array(A.vecVals())
+        if ALast is None or not np.array_equal(AVals, ALast):
+            # new coefficients, all factorizations are invalid
+            solvers.clear()
+            ALast = AVals
+
+        rhsNew = _rhs(tNew)
+
+        bIE = M * u + dt * rhsNew
+        bCN = (M - (0.5 * dt) * A) * u + (0.5 * dt) * (rhsLast + rhsNew)
+
+        uIE = _solve(dt, bIE, tNew, u)
+        uCN = _solve(0.5 * dt, bCN, tNew, u)
+
+        err = np.max(np.abs(uCN - uIE)) / \
+            (dtTol * (1.0 + np.max(np.abs(uCN))))
+
+        accepted = err <= 1.0 or dt <= dtMin
+        steps.append((t, dt, err, accepted, swatch.duration()))
+
+        if progress:
+            print("\t" + ("accepted" if accepted else "rejected") +
+                  " t=" + str(t) + " dt=" + str(dt) + " err=" + str(err) +
+                  " (" + str(swatch.duration()) + " s)")
+
+        if not accepted:
+            # the local error of implicit Euler is O(dt^2)
+            level -= max(1, int(np.ceil(0.5 * np.log2(err))))
+            continue
+
+        while iOut < len(times) and times[iOut] <= tNew + 1e-12 * dt:
+            w = (times[iOut] - t) / dt
+            yield times[iOut], u + w * (uCN - u)
+            iOut += 1
+
+        u = uCN
+        t = tNew
+        rhsLast = rhsNew
+
+        if err < 0.25 and dt0 * 2.0**(level + 1) <= dtMax:
+            level += 1
+
+    if stats:
+        stats.acceptedSteps = sum(1 for st in steps if st[3])
+        stats.rejectedSteps = len(steps) - stats.acceptedSteps
+        stats.factorizations = nFactorizations[0]
+        stats.steps = steps
+
+    if verbose:
+        print("Adaptive time stepping: " +
+              str(sum(1 for st in steps if st[3])) + " accepted, " +
+              str(sum(1 for st in steps if not st[3])) + " rejected steps, " +
+              str(nFactorizations[0]) + " factorizations, " +
+              str(sum(st[4] for st in steps)) + " s")
+
+
+def _storeTimeSteps(steps, times, dof, output=None, decimate=1):
+    """
+    Consume the time steps (time, u) of a transient solveFEM.
+
+    Parameters
+    ----------
+    output : None | str | callable | 'stream'
+        - None, return all stored steps as array
+        - filename (.npy), the stored steps are written into a memory mapped
+          .npy file which is returned
+        - callable(t, u), called for every stored step, nothing is kept
+        - 'stream', return a generator yielding (t, u) for every stored step
+
+    decimate : int [1]
+        Store only every k-th time step (starting with the first).
+    """
+    decimate = max(int(decimate), 1)
+    nStore = (len(times) - 1) // decimate + 1
+
+    def _decimated():
+        for n, (t, u) in enumerate(steps):
+            if n % decimate == 0:
+                yield t, u
+
+    if isinstance(output, str) and output == 'stream':
+        return _decimated()
+
+    if hasattr(output, '__call__'):
+        for t, u in _decimated():
+            output(t, u)
+        return None
+
+    if isinstance(output, str):
+        U = np.lib.format.open_memmap(output, mode='w+', dtype=float,
+                                      shape=(nStore, dof))
+    else:
+        U = np.zeros((nStore, dof))
+
+    for i, (t, u) in enumerate(_decimated()):
+        U[i] = u
+
+    if isinstance(U, np.memmap):
+        U.flush()
+    return U
+
+
+
+
+def _isForceList(f, mesh):
+    """Check if f is a list of force values instead of a single one."""
+    if isinstance(f, np.ndarray):
+        return f.ndim == 2
+
+    if isinstance(f, (list, tuple)) and len(f) > 0:
+        return all(hasattr(fi, '__len__') or hasattr(fi, '__call__')
+                   for fi in f)
+    return False
+
+
+def _solveFEMMultiRHS(mesh, S, fs, uBCs, duBCs, userData, verbose, stats,
+                      method, iterOpts, **kwargs):
+    """
+    Stationary solveFEM for a list of force values. The boundary conditions
+    are applied to every rhs, the matrix is constrained and factorized once.
+    """
+    swatch = pg.Stopwatch(True)
+    rhs = [assembleForceVector(mesh, fi, userData=userData) for fi in fs]
+
+    for bc in duBCs:
+        bc.apply(S, None, userData=userData)
+
+    for r in rhs:
+        _applyDirichletBC(uBCs, S, r, userData=userData, constrainMatrix=False)
+    _applyDirichletBC(uBCs, S, None, userData=userData)
+
+    if 'uDirichlet' in kwargs:
+        for r in rhs:
+            assembleUDirichlet_(S, r, kwargs['uDirichlet'][0],
+                                kwargs['uDirichlet'][1], constrainMatrix=False)
+        assembleUDirichlet_(S, None, kwargs['uDirichlet'][0],
+                            kwargs['uDirichlet'][1])
+
+    B = np.column_stack([np.asarray(r) for r in rhs])
+
+    assembleTime = swatch.duration(True)
+    if stats:
+        stats.assembleTime = assembleTime
+    if verbose:
+        print(("Asssemblation time: ", assembleTime))
+
+    U = linsolveBlock(S, B, verbose=verbose, method=method, stats=stats,
+                      nThreads=kwargs.get('nThreads', 1),
+                      chunkSize=kwargs.get('chunkSize', 64), **iterOpts)
+    return U.T
\ No newline at end of file
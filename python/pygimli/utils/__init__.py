@@ -3,4 +3,5 @@
 from .base import *
 from .utils import *
 #from .ipcserver import *
-from .postinversion import *
\ No newline at end of file
+from .postinversion import *
+from .sparseMat import *
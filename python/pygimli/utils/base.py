@@ -13,6 +13,9 @@ from pygimli.mplviewer.colorbar import setMappableData
 
 def gmat2numpy(mat):
     """convert pygimli matrix into numpy.array."""
+    if isinstance( mat, pg.RMatrix ) or isinstance( mat, pg.CMatrix ):
+        return mat.array()
+
     nmat = np.zeros( ( len( mat ), len( mat[ 0 ] ) ) )
     for i, row in enumerate( mat ): 
         nmat[i] = row
@@ -21,8 +24,7 @@ def gmat2numpy(mat):
 def numpy2gmat(nmat):
     """convert numpy.array into pygimli RMatrix."""
     gmat = pg.RMatrix()
-    for arr in nmat:
-        gmat.push_back( pg.asvector( arr ) )
+    gmat.setArray( np.asarray( nmat, dtype=float ) )
     return gmat
 
 def rndig(a, ndig=3):
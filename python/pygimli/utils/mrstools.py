@@ -4,56 +4,26 @@
 import pygimli as pg
 import numpy as N
 import pylab as P
-from .base import draw1dmodel, rndig
+from .base import draw1dmodel, rndig, gmat2numpy
+from pygimli.physics.sNMR.mrs import \
+    MRS1dBlockQTModelling as MRS1dBlockQTModellingK
 
-class MRS1dBlockQTModelling(pg.ModellingBase):
+class MRS1dBlockQTModelling(MRS1dBlockQTModellingK):
     '''
     MRS1dBlockQTModelling - pygimli modelling class for block-mono QT inversion
     f=MRS1dBlockQTModelling(lay, KR, KI, zvec, t, verbose = False )
+
+    Same as :py:class:`pygimli.physics.sNMR.MRS1dBlockQTModelling` with
+    real and imaginary part of the kernel given separately.
     '''
     def __init__(self, nlay, KR, KI, zvec, t, verbose=False ):
         """constructor."""
-        mesh = pg.createMesh1DBlock(nlay, 2) # thk, wc, T2*
-        pg.ModellingBase.__init__(self, mesh, verbose)
+        K = [gmat2numpy(Ki) if isinstance(Ki, pg.RMatrix) else N.asarray(Ki)
+             for Ki in (KR, KI)]
+        MRS1dBlockQTModellingK.__init__(self, nlay, K[0] + K[1] * 1j,
+                                        zvec, t, verbose)
         self.KR_ = KR
         self.KI_ = KI
-        self.zv_ = N.array(zvec)
-        self.nl_ = nlay
-        self.nq_ = len(KR)
-        self.t_  = N.array(t)
-        self.nt_ = len(t)
-
-    def response(self, par):
-        """compute response function."""
-        nl = self.nl_
-        thk = par(0, nl-1)
-        wc  = par(nl-1, 2*nl-1)
-        t2  = par(2*nl-1, 3*nl-1)
-        zthk = N.cumsum(thk)
-        zv = self.zv_
-        lzv = len(zv)
-        izvec = N.zeros(nl + 1, N.int32)
-        rzvec = N.zeros(nl + 1)
-        for i in range(nl-1):
-            ii = (zv<zthk[i]).argmin()
-            izvec[ i + 1 ] = ii
-            if ii <= len(zv):
-                rzvec[i+1] = (zthk[i] - zv[ii-1]) / (zv[ii] - zv[ii-1])
-        izvec[-1] = lzv - 1
-        A = N.zeros((self.nq_, self.nt_), dtype=complex)
-        for i in range(nl):
-            wcvec = N.zeros(lzv-1)
-            wcvec[ izvec[i]:izvec[i+1] ] = wc[i]
-            if izvec[i+1] < lzv:
-                wcvec[ izvec[i+1] - 1 ] = wc[i] * rzvec[ i + 1 ]
-            if izvec[i] > 0:
-                wcvec[ izvec[i] - 1 ] = wc[i] * (1 - rzvec[i])
-            amps = N.dot(self.KR_, wcvec) + N.dot(self.KI_, wcvec) * 1j
-            
-            for ii in range(len(A)):
-                a += N.exp(-self.t_ / t2[i]) * amps[ii]
-
-        return pg.asvector(N.abs(A).ravel())
 
 def loadmrsproject(mydir):
     """
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+    Conversion between pygimli sparse matrices and scipy.sparse.
+
+    :gimliapi:`GIMLI::SparseMatrix` stores its values in compressed row
+    format (colPtr, rowIdx, vals), i.e., the same layout as
+    scipy.sparse.csr_matrix (indptr, indices, data). The exporters therefore
+    return scipy matrices sharing the memory of the pygimli matrix, the
+    importers fill the pygimli matrix with one bulk copy.
+"""
+
+import numpy as np
+import pygimli as pg
+
+
+def sparseMatrix2csr(A, copy=False):
+    """
+    Convert a pygimli sparse matrix into scipy.sparse.csr_matrix.
+
+    Parameters
+    ----------
+    A : pg.RSparseMatrix | pg.CSparseMatrix | pg.RSparseMapMatrix
+        Matrix to convert. A RSparseMapMatrix is compressed first.
+
+    copy : bool [False]
+        If False, data, indices and indptr of the returned matrix are views
+        of the pygimli matrix, so changes to the values are seen from both
+        sides. The pygimli matrix is kept alive by the views.
+
+    Returns
+    -------
+    csr : scipy.sparse.csr_matrix
+    """
+    from scipy.sparse import csr_matrix
+
+    if isinstance(A, pg.RSparseMapMatrix):
+        A = pg.RSparseMatrix(A)
+
+    if A.stype() != 0:
+        raise Exception("Only full sparse matrices (stype=0) can be "
+                        "converted: stype=" + str(A.stype()))
+
+    return csr_matrix((A.valsArray(), A.rowIdxArray(), A.colPtrArray()),
+                      shape=(A.rows(), A.cols()), copy=copy)
+
+
+def sparseMatrix2csc(A):
+    """Convert a pygimli sparse matrix into scipy.sparse.csc_matrix."""
+    return sparseMatrix2csr(A).tocsc()
+
+
+def sparseMatrix2coo(A):
+    """
+    Convert a pygimli sparse matrix into scipy.sparse.coo_matrix.
+
+    The column indices and the values share the memory of the pygimli matrix,
+    only the row indices are expanded.
+    """
+    from scipy.sparse import coo_matrix
+
+    csr = sparseMatrix2csr(A)
+    rows = np.repeat(np.arange(csr.shape[0], dtype=csr.indices.dtype),
+                     np.diff(csr.indptr))
+    return coo_matrix((csr.data, (rows, csr.indices)), shape=csr.shape,
+                      copy=False)
+
+
+def csr2SparseMatrix(indptr, indices, data, stype=0):
+    """
+    Create a pygimli sparse matrix from compressed row arrays.
+
+    Parameters
+    ----------
+    indptr : array (n + 1)
+        Row pointer.
+
+    indices : array
+        Column index for every value. Needs to be sorted for each row.
+
+    data : array, real or complex
+        Values.
+
+    stype : int [0]
+        Symmetry type of the pygimli matrix.
+
+    Returns
+    -------
+    A : pg.RSparseMatrix | pg.CSparseMatrix
+    """
+    if len(indices) and np.max(indices) >= len(indptr) - 1:
+        raise Exception("pygimli sparse matrices need to be square: "
+                        "column index " + str(np.max(indices)) + " >= " +
+                        str(len(indptr) - 1))
+
+    if np.iscomplexobj(data):
+        A = pg.CSparseMatrix()
+        data = np.asarray(data, dtype=complex)
+    else:
+        A = pg.RSparseMatrix()
+        data = np.asarray(data, dtype=float)
+
+    A.setArrayData(np.asarray(indptr, dtype=np.int32),
+                   np.asarray(indices, dtype=np.int32), data, stype)
+    return A
+
+
+def coo2SparseMatrix(rows, cols, vals, n=None):
+    """
+    Create a pygimli sparse matrix from coordinate (triplet) arrays.
+
+    Duplicate entries are summed up.
+
+    Parameters
+    ----------
+    rows, cols : array
+        Row and column index for every value.
+
+    vals : array, real or complex
+        Values.
+
+    n : int [None]
+        Matrix size. Default is the largest index + 1.
+
+    Returns
+    -------
+    A : pg.RSparseMatrix | pg.CSparseMatrix
+    """
+    rows = np.asarray(rows, dtype=int)
+    cols = np.asarray(cols, dtype=int)
+    vals = np.asarray(vals)
+
+    if n is None:
+        n = max(rows.max(), cols.max()) + 1 if len(rows) else 0
+
+    keys, perm = np.unique(rows * n + cols, return_inverse=True)
+
+    if np.iscomplexobj(vals):
+        v = np.bincount(perm, weights=vals.real, minlength=len(keys)) + \
+            1j * np.bincount(perm, weights=vals.imag, minlength=len(keys))
+    else:
+        v = np.bincount(perm, weights=vals, minlength=len(keys))
+
+    indptr = np.zeros(n + 1, dtype=int)
+    indptr[1:] = np.cumsum(np.bincount(keys // n, minlength=n))
+
+    return csr2SparseMatrix(indptr, keys % n, v)
+
+
+def toSparseMatrix(A):
+    """
+    Convert a scipy.sparse matrix into pg.RSparseMatrix or pg.CSparseMatrix.
+
+    Parameters
+    ----------
+    A : scipy.sparse matrix
+        Any square scipy.sparse matrix, e.g., csr, csc or coo.
+
+    Returns
+    -------
+    S : pg.RSparseMatrix | pg.CSparseMatrix
+        Complex values lead to a pg.CSparseMatrix.
+    """
+    if A.shape[0] != A.shape[1]:
+        raise Exception("pygimli sparse matrices need to be square: " +
+                        str(A.shape))
+
+    csr = A.tocsr()
+    if not csr.has_canonical_format:
+        csr = csr.copy()
+        csr.sum_duplicates()
+
+    return csr2SparseMatrix(csr.indptr, csr.indices, csr.data)
+
+
+def toSparseMapMatrix(A, S=None):
+    """
+    Convert a scipy.sparse matrix into pg.RSparseMapMatrix.
+
+    Parameters
+    ----------
+    A : scipy.sparse matrix
+        Any real valued scipy.sparse matrix, it does not need to be square.
+
+    S : pg.RSparseMapMatrix [None]
+        Matrix to be filled, e.g., the jacobian of a modelling operator.
+        A new one is created by default.
+
+    Returns
+    -------
+    S : pg.RSparseMapMatrix
+    """
+    if np.issubdtype(A.dtype, np.complexfloating):
+        raise Exception("There is no complex valued SparseMapMatrix.")
+
+    coo = A.tocoo()
+    if S is None:
+        S = pg.RSparseMapMatrix(coo.shape[0], coo.shape[1])
+    else:
+        S.clear()
+        S.setRows(coo.shape[0])
+        S.setCols(coo.shape[1])
+
+    S.addArrayData(coo.row, coo.col, np.asarray(coo.data, dtype=float))
+    return S
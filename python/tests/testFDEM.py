@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+from pygimli.physics.em.fdem import FDEMData, FDEM2dFOP
+from pygimli.utils import gmat2numpy
+
+import numpy as np
+
+
+def createFOPs(nx=7, nlay=2):
+    freqs = np.array([110., 440., 1770., 7070., 28200.])
+    x = np.arange(nx, dtype=float)
+    data = FDEMData(x=x, freqs=freqs, coilSpacing=50.,
+                    inphase=np.zeros((nx, len(freqs))),
+                    outphase=np.zeros((nx, len(freqs))))
+
+    serial = FDEM2dFOP(data, nlay=nlay)
+    pooled = FDEM2dFOP(data, nlay=nlay, nProcs=2)
+    return serial, pooled
+
+
+def testFDEM2dPool():
+    nx, nlay = 7, 2
+    serial, pooled = createFOPs(nx, nlay)
+    assert serial.pool is None and pooled.pool is not None
+
+    # thickness and resistivities varying along the profile
+    thk = np.linspace(5., 20., nx)
+    res = np.vstack([np.linspace(50., 200., nx), np.linspace(500., 20., nx)])
+    model = pg.RVector(np.concatenate([thk, res.ravel()]))
+
+    np.testing.assert_allclose(np.asarray(pooled.response(model)),
+                               np.asarray(serial.response(model)))
+
+    serial.createJacobian(model)
+    pooled.createJacobian(model)
+    assert pooled.J.rows() == serial.J.rows()
+    assert pooled.J.cols() == serial.J.cols()
+    for Js, Jp in zip(serial.FOP1d, pooled.FOP1d):
+        np.testing.assert_allclose(gmat2numpy(Jp.jacobian()),
+                                   gmat2numpy(Js.jacobian()))
+
+    x = pg.RVector(np.random.RandomState(5).rand(serial.J.cols()))
+    np.testing.assert_allclose(np.asarray(pooled.J * x),
+                               np.asarray(serial.J * x))
+
+if __name__ == '__main__':
+    testFDEM2dPool()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+import pygimli.solver as solver
+
+import numpy as np
+
+
+def compareWithNative(mesh):
+    a = np.linspace(1.0, 2.0, mesh.cellCount())
+
+    A = solver.createStiffnessMatrix(mesh, a)
+    ARef = pg.RSparseMatrix()
+    ARef.fillStiffnessMatrix(mesh, pg.RVector(a))
+
+    M = solver.createMassMatrix(mesh, a)
+    MRef = pg.RSparseMatrix()
+    MRef.fillMassMatrix(mesh, pg.RVector(a))
+
+    x = np.random.rand(mesh.nodeCount())
+    assert np.allclose(A * pg.RVector(x), ARef * pg.RVector(x))
+    assert np.allclose(M * pg.RVector(x), MRef * pg.RVector(x))
+
+
+def testAssembly1D():
+    mesh = pg.Mesh(1)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)))
+    compareWithNative(mesh)
+
+
+def testAssembly2D():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 6)))
+    compareWithNative(mesh)
+    mesh = mesh.createH2()
+    compareWithNative(mesh)
+
+
+def createTetMesh(n=3):
+    """Unit cube of n^3 cubes, each split into 6 tetrahedrons."""
+    from itertools import permutations
+    from pygimli.meshtools import createMeshFromArrays
+
+    x = np.linspace(0., 1., n + 1)
+    X, Y, Z = np.meshgrid(x, x, x, indexing='ij')
+    nodes = np.vstack([X.ravel(), Y.ravel(), Z.ravel()]).T
+    nodes[:, 2] += 0.1 * nodes[:, 0] * nodes[:, 1]
+
+    cells = []
+    for i, j, k in np.ndindex(n, n, n):
+        for perm in permutations(range(3)):
+            corner = np.array([i, j, k])
+            tet = [corner.copy()]
+            for axis in perm:
+                corner[axis] += 1
+                tet.append(corner.copy())
+            cells.append([np.ravel_multi_index(c, (n + 1,) * 3) for c in tet])
+    return createMeshFromArrays(nodes, cells)
+
+
+def forceVectorLoop(mesh, f):
+    """The former per cell assembly of the force vector."""
+    rhs = np.zeros(mesh.nodeCount())
+    b_l = pg.ElementMatrix()
+    for c in mesh.cells():
+        b_l.u(c)
+        for i, idx in enumerate(b_l.idx()):
+            rhs[idx] += b_l.row(0)[i] * f[c.id()]
+    return rhs
+
+
+def testForceVector():
+    from pygimli.meshtools import createMeshFromArrays
+
+    quads = pg.Mesh(2)
+    quads.createGrid(pg.RVector(np.linspace(0., 1., 6)),
+                     pg.RVector(np.linspace(0., 1., 4)))
+    q = quads.cellNodeIdArray()
+    tris = createMeshFromArrays(quads.positionArray(),
+                                np.vstack([q[:, [0, 1, 2]], q[:, [0, 2, 3]]]),
+                                dim=2)
+    hexs = pg.Mesh(3)
+    hexs.createGrid(pg.RVector(np.linspace(0., 1., 4)),
+                    pg.RVector(np.linspace(0., 1., 3)),
+                    pg.RVector(np.linspace(0., 1., 3)))
+
+    # linear simplex cells are vectorized, quads and hexahedrons fall back
+    for mesh in (tris, quads, createTetMesh(), hexs):
+        nC, nN = mesh.cellCount(), mesh.nodeCount()
+        fCell = np.linspace(1., 2., nC)
+
+        np.testing.assert_allclose(solver.assembleForceVector(mesh, 2.0),
+                                   forceVectorLoop(mesh, np.ones(nC) * 2.))
+        np.testing.assert_allclose(solver.assembleForceVector(mesh, fCell),
+                                   forceVectorLoop(mesh, fCell))
+        np.testing.assert_allclose(
+            solver.assembleForceVector(mesh, pg.RVector(fCell)),
+            forceVectorLoop(mesh, fCell))
+
+        # values per node are taken as they are
+        fNode = np.linspace(1., 2., nN)
+        np.testing.assert_allclose(solver.assembleForceVector(mesh, fNode),
+                                   fNode)
+
+
+def testNeumannBC():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 6)),
+                    pg.RVector(np.linspace(0., 1., 4)))
+    bounds = [b for b in mesh.boundaries() if b.leftCell() is None or
+              b.rightCell() is None]
+    x = np.linspace(1., 2., mesh.nodeCount())
+    perBoundary = np.linspace(0.5, 1.5, len(bounds))
+
+    for value in (2.0, 3, lambda b: b.center()[1], perBoundary):
+        S1 = solver.createStiffnessMatrix(mesh)
+        S2 = solver.createStiffnessMatrix(mesh)
+
+        solver.NeumannBC(mesh, bounds, value).apply(S1)
+        if isinstance(value, np.ndarray):
+            for b, val in zip(bounds, value):
+                solver.assembleNeumannBC(S2, [[b], float(val)], None)
+        else:
+            solver.assembleNeumannBC(S2, [bounds, value], None)
+
+        np.testing.assert_allclose(np.asarray(S1 * pg.RVector(x)),
+                                   np.asarray(S2 * pg.RVector(x)))
+
+
+def testAssemblyRefill():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 6)))
+    mesh = mesh.createH2()
+
+    A1 = solver.createStiffnessMatrix(mesh, np.ones(mesh.cellCount()))
+    A2 = solver.createStiffnessMatrix(mesh, np.ones(mesh.cellCount()) * 2.)
+
+    x = pg.RVector(np.random.rand(mesh.nodeCount()))
+    assert np.allclose(np.asarray(A1 * x) * 2., A2 * x)
+
+    # geometry changes must not reuse the cached element matrices, compare
+    # with a fresh assembly on a copy of the mesh
+    mesh.scale(pg.RVector3(2.0, 1.0))
+    A3 = solver.createStiffnessMatrix(mesh, np.ones(mesh.cellCount()))
+    A4 = solver.createStiffnessMatrix(pg.Mesh(mesh),
+                                      np.ones(mesh.cellCount()))
+    assert not np.allclose(A1 * x, A3 * x)
+    assert np.allclose(A3 * x, A4 * x)
+
+    node = mesh.node(mesh.nodeCount() // 2)
+    node.setPos(node.pos() + pg.RVector3(0.05, 0.03))
+    A5 = solver.createStiffnessMatrix(mesh, np.ones(mesh.cellCount()))
+    A6 = solver.createStiffnessMatrix(pg.Mesh(mesh),
+                                      np.ones(mesh.cellCount()))
+    assert not np.allclose(A3 * x, A5 * x)
+    assert np.allclose(A5 * x, A6 * x)
+
+
+def testDirichletBC():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 6)))
+    mesh = mesh.createH2()
+    bounds = [b for b in mesh.boundaries() if b.center()[0] == 0.0]
+
+    S1 = solver.createStiffnessMatrix(mesh)
+    rhs1 = pg.RVector(mesh.nodeCount(), 1.0)
+    solver.assembleDirichletBC(S1, [bounds, lambda p: p[1]], rhs1)
+
+    S2 = solver.createStiffnessMatrix(mesh)
+    rhs2 = pg.RVector(mesh.nodeCount(), 1.0)
+    bc = solver.DirichletBC(mesh, bounds, lambda p: p[:, 1], vectorized=True)
+    bc.apply(S2, rhs2)
+
+    x = pg.RVector(np.random.rand(mesh.nodeCount()))
+    assert np.allclose(S1 * x, S2 * x)
+    assert np.allclose(rhs1, rhs2)
+
+
+def testIterativeSolve():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 21)),
+                    pg.RVector(np.linspace(0., 1., 21)))
+    bounds = [b for b in mesh.boundaries() if b.center()[0] == 0.0]
+
+    uDirect = solver.solveFEM(mesh, f=1.0, uBoundary=[bounds, 0.0])
+
+    stats = type('Stats', (object,), {})()
+    uCG = solver.solveFEM(mesh, f=1.0, uBoundary=[bounds, 0.0],
+                          method='cg', tol=1e-12, stats=stats)
+    assert np.allclose(uDirect, uCG)
+    assert stats.iterations > 0
+
+    # ilu is not symmetric, so cg defaults to jacobi
+    assert solver.IterativeSolver(method='cg').preconditioner == 'jacobi'
+    assert solver.IterativeSolver(method='gmres').preconditioner == 'ilu'
+    uGMRES = solver.solveFEM(mesh, f=1.0, uBoundary=[bounds, 0.0],
+                             method='gmres', tol=1e-12)
+    assert np.allclose(uDirect, uGMRES)
+
+    # the preconditioner is reused for the same operator
+    S = solver.createStiffnessMatrix(mesh) + solver.createMassMatrix(mesh)
+    b = pg.RVector(mesh.nodeCount(), 1.0)
+    x1 = solver.linsolve(S, b, method='gmres', tol=1e-12)
+    x2 = solver.linsolve(S, b, method='gmres', tol=1e-12, x0=x1)
+    assert np.allclose(solver.linsolve(S, b), x2)
+    assert solver.iterativeSolver(S, method='gmres').preconditionerCount == 1
+
+
+def testIterativeSolverCache():
+    import warnings
+    from scipy.sparse import diags
+
+    n = 50
+    A = diags([-np.ones(n - 1), 2.1 * np.ones(n), -np.ones(n - 1)],
+              [-1, 0, 1], format='csr')
+    b = np.ones(n)
+
+    # the preconditioner options are part of the cache key
+    s1 = solver.iterativeSolver(A, preconditioner='ilu', drop_tol=1e-4)
+    s2 = solver.iterativeSolver(A, preconditioner='ilu', drop_tol=1e-2)
+    assert s1 is not s2
+    assert s2.precOpts == dict(drop_tol=1e-2)
+    s3 = solver.iterativeSolver(A, preconditioner='ilu', drop_tol=1e-4,
+                                tol=1e-6)
+    assert s3 is s1 and s1.tol == 1e-6
+
+    # changed values are detected unless checkValues is False
+    for checkValues in (True, False):
+        s = solver.IterativeSolver(A, checkValues=checkValues)
+        s.solve(b)
+        s.setMatrix(A * 2.0)
+        s.solve(b)
+        assert s.preconditionerCount == (2 if checkValues else 1)
+
+    s = solver.IterativeSolver(A, preconditioner=None, tol=1e-14, maxiter=2)
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        s.solve(b)
+    assert not s.converged and not s.stats()['converged']
+    assert any(issubclass(wi.category, RuntimeWarning) for wi in w)
+
+    s.maxiter = None
+    s.solve(b)
+    assert s.converged
+
+
+def testMultiRHS():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 11)))
+    bounds = [b for b in mesh.boundaries() if b.center()[0] == 0.0]
+
+    fs = [np.random.rand(mesh.nodeCount()) for i in range(5)]
+    U = solver.solveFEM(mesh, f=fs, uBoundary=[bounds, 1.0], nThreads=2,
+                        chunkSize=2)
+    assert U.shape == (5, mesh.nodeCount())
+
+    for i, f in enumerate(fs):
+        u = solver.solveFEM(mesh, f=f, uBoundary=[bounds, 1.0])
+        assert np.allclose(U[i], u)
+
+    S = solver.createStiffnessMatrix(mesh) + solver.createMassMatrix(mesh)
+    B = np.random.rand(mesh.nodeCount(), 3)
+    X = solver.linsolve(S, B)
+    assert np.allclose(solver.linsolve(S, pg.RVector(B[:, 1])), X[:, 1])
+
+
+def testTransientOutput():
+    import os
+    import tempfile
+
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 11)))
+    times = np.linspace(0., 1., 21)
+    kw = dict(f=1.0, times=times, u0=0.0, theta=0.5)
+
+    stats = type('Stats', (object,), {})()
+    U = solver.solveFEM(mesh, stats=stats, **kw)
+    assert U.shape == (len(times), mesh.nodeCount())
+    # constant dt, the factorization of the first step is reused
+    assert stats.factorizations == 1
+
+    # one factorization for every change of dt
+    stats = type('Stats', (object,), {})()
+    solver.solveFEM(mesh, stats=stats,
+                    **dict(kw, times=[0., 0.1, 0.2, 0.25, 0.3, 0.4]))
+    assert stats.factorizations == 3
+
+    steps = list(solver.solveFEM(mesh, output='stream', **kw))
+    assert np.allclose([t for t, u in steps], times)
+    assert np.allclose([u for t, u in steps], U)
+
+    assert np.allclose(solver.solveFEM(mesh, decimate=5, **kw), U[::5])
+
+    fName = os.path.join(tempfile.mkdtemp(), 'u.npy')
+    solver.solveFEM(mesh, output=fName, **kw)
+    assert np.allclose(np.load(fName, mmap_mode='r'), U)
+
+    # lazily evaluated time dependent force
+    U2 = solver.solveFEM(mesh, fTime=lambda t: 1.0, **kw)
+    assert np.allclose(U2, U)
+
+
+def testTransientIterative():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 11)))
+    bounds = [b for b in mesh.boundaries() if b.center()[0] == 0.0]
+    kw = dict(f=1.0, times=np.linspace(0., 1., 11), u0=0.0, theta=0.5,
+              uBoundary=[bounds, 1.0])
+
+    U = solver.solveFEM(mesh, **kw)
+    for method in ('cg', 'gmres'):
+        stats = type('Stats', (object,), {})()
+        Ui = solver.solveFEM(mesh, method=method, tol=1e-12, stats=stats,
+                             **kw)
+        assert np.allclose(Ui, U)
+        assert stats.converged
+        assert stats.iterations > 0
+        assert stats.factorizations == 1
+
+
+def testAdaptiveTimeStepping():
+    mesh = pg.Mesh(1)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 41)))
+    bounds = [b for b in mesh.boundaries() if b.center()[0] == 0.0]
+    times = np.linspace(0., 0.5, 6)
+
+    uRef = solver.solveFEM(mesh, f=0.0, times=np.linspace(0., 0.5, 2001),
+                           u0=0.0, theta=0.5, uBoundary=[bounds, 1.0])[::400]
+
+    stats = type('Stats', (object,), {})()
+    u = solver.solveFEM(mesh, f=0.0, times=times, u0=0.0, adaptive=True,
+                        dt0=1e-4, dtTol=1e-4, uBoundary=[bounds, 1.0],
+                        stats=stats)
+    assert u.shape == (len(times), mesh.nodeCount())
+    assert np.max(np.abs(u - uRef)) < 1e-2
+    assert stats.acceptedSteps < 2000
+    # step sizes repeat so there are less factorizations than steps
+    assert stats.factorizations < stats.acceptedSteps + stats.rejectedSteps
+
+    # a smaller cache of factorizations gives the same steps
+    stats2 = type('Stats', (object,), {})()
+    u2 = solver.solveFEM(mesh, f=0.0, times=times, u0=0.0, adaptive=True,
+                         dt0=1e-4, dtTol=1e-4, uBoundary=[bounds, 1.0],
+                         stats=stats2, maxSolvers=2)
+    np.testing.assert_allclose(u2, u)
+    assert stats2.acceptedSteps == stats.acceptedSteps
+    assert stats2.factorizations >= stats.factorizations
+
+
+def testParseArgVectorized():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 6)))
+
+    a1 = solver.parseArgToArray(lambda c: c.center()[0] + c.marker(),
+                                mesh.cellCount(), mesh)
+    a2 = solver.parseArgToArray(lambda pos, marker: pos[:, 0] + marker,
+                                mesh.cellCount(), mesh, vectorized=True)
+    assert np.allclose(a1, a2)
+
+    u1 = solver.parseArgToArray(lambda p: p[1], mesh.nodeCount(), mesh)
+    u2 = solver.parseArgToArray(lambda pos, marker: pos[:, 1],
+                                mesh.nodeCount(), mesh, vectorized=True)
+    assert np.allclose(u1, u2)
+
+if __name__ == '__main__':
+    testAssembly1D()
+    testAssembly2D()
+    testForceVector()
+    testNeumannBC()
+    testAssemblyRefill()
+    testDirichletBC()
+    testIterativeSolve()
+    testIterativeSolverCache()
+    testMultiRHS()
+    testTransientOutput()
+    testTransientIterative()
+    testAdaptiveTimeStepping()
+    testParseArgVectorized()
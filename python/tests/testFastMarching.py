@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+from pygimli.meshtools import createMeshFromArrays
+from pygimli.physics.traveltime.fastMarching import fastMarch, \
+    rayPathLengths, TravelTimeFMMModelling
+from pygimli.physics.traveltime.refraction import Refraction
+
+import numpy as np
+
+
+def createTriangleMesh(n=21, L=20.):
+    x, y = np.meshgrid(np.linspace(0., L, n), np.linspace(-L, 0., n))
+    nodes = np.vstack([x.ravel(), y.ravel()]).T
+    cells = []
+    for j in range(n - 1):
+        for i in range(n - 1):
+            a = j * n + i
+            cells += [[a, a + 1, a + n + 1], [a, a + n + 1, a + n]]
+    return createMeshFromArrays(nodes, cells)
+
+
+def createTetMesh(n=6, L=6.):
+    """Cube of n^3 cubes, each split into 6 tetrahedrons."""
+    from itertools import permutations
+
+    x = np.linspace(0., L, n + 1)
+    X, Y, Z = np.meshgrid(x, x, -x, indexing='ij')
+    nodes = np.vstack([X.ravel(), Y.ravel(), Z.ravel()]).T
+    cells = []
+    for i, j, k in np.ndindex(n, n, n):
+        for perm in permutations(range(3)):
+            corner = np.array([i, j, k])
+            tet = [corner.copy()]
+            for axis in perm:
+                corner[axis] += 1
+                tet.append(corner.copy())
+            cells.append([np.ravel_multi_index(c, (n + 1,) * 3) for c in tet])
+    return createMeshFromArrays(nodes, cells)
+
+
+def relativeErrors(mesh, s, source):
+    """FMM and analytical traveltimes, distances and relative errors."""
+    times, rays = fastMarch(mesh, np.full(mesh.cellCount(), s), source,
+                            ray=True)
+    pos = mesh.positionArray()
+    dist = np.sqrt(np.sum((pos - pos[source])**2, axis=1))
+    far = dist > 0.
+    err = np.abs(times[far] - dist[far] * s) / (dist[far] * s)
+    return times, rays, dist, far, err
+
+
+def testFastMarchHomogeneous():
+    mesh = createTriangleMesh()
+    s = 1. / 1000.
+    pos = mesh.positionArray()
+
+    for source in (0, 10, 220):
+        times, rays, dist, far, err = relativeErrors(mesh, s, source)
+
+        # exact along the mesh lines through the source
+        row = np.abs(pos[:, 1] - pos[source, 1]) < 1e-12
+        np.testing.assert_allclose(times[row], dist[row] * s, atol=1e-12)
+
+        # first order accuracy, the largest error (1 + sqrt(2)) / sqrt(8) - 1
+        # is next to the source, where the wavefront is not plane
+        assert err.max() < 0.21
+        assert err[dist[far] >= 8.].max() < 0.085
+        assert err.mean() < 0.04
+
+        # traveltime is slowness times ray length
+        for node in (20, 440):
+            cells, lengths = rayPathLengths(times, rays, node)
+            np.testing.assert_allclose(lengths.sum() * s, times[node])
+            assert lengths.sum() >= dist[node] - 1e-9
+
+
+def testFastMarchTetrahedrons():
+    mesh = createTetMesh()
+    s = 1. / 1000.
+    pos = mesh.positionArray()
+    nFaceRays = 0
+
+    for source in (0, 6, 171):
+        times, rays, dist, far, err = relativeErrors(mesh, s, source)
+
+        # exact along the cube edges through the source
+        line = np.sum(np.abs(pos - pos[source]) > 1e-12, axis=1) <= 1
+        np.testing.assert_allclose(times[line], dist[line] * s, atol=1e-12)
+
+        assert err.max() < 0.21
+        assert err[dist[far] >= 4.].max() < 0.15
+        assert err.mean() < 0.1
+
+        # rays through the inside of a triangle of three accepted nodes
+        rCell, rParents, rWeights, rLen = rays
+        nFaceRays += np.sum(np.all(rWeights > 0., axis=1))
+
+        for node in (0, 171, mesh.nodeCount() - 1):
+            cells, lengths = rayPathLengths(times, rays, node)
+            np.testing.assert_allclose(lengths.sum() * s, times[node])
+            assert lengths.sum() >= dist[node] - 1e-9
+
+    assert nFaceRays > 0
+
+
+def testRefractionFMM():
+    mesh = createTriangleMesh()
+    for c in mesh.cells():
+        c.setMarker(c.id())
+
+    data = pg.DataContainer()
+    data.registerSensorIndex('s')
+    data.registerSensorIndex('g')
+    for x in np.arange(0., 21., 4.):
+        data.createSensor(pg.RVector3(x, 0.0))
+    nS = data.sensorCount()
+    s, g = np.meshgrid(np.arange(nS), np.arange(nS))
+    s, g = s[s != g], g[s != g]
+    data.resize(len(s))
+    data.set('s', pg.RVector(s.astype(float)))
+    data.set('g', pg.RVector(g.astype(float)))
+    data.set('t', pg.RVector(len(s), 1.0))
+
+    ra = Refraction()
+    ra.data = data
+    ra.mesh = mesh
+    ra.createFOP(refine=False, method='fmm')
+    assert isinstance(ra.f, TravelTimeFMMModelling)
+
+    slowness = pg.RVector(mesh.cellCount(), 1. / 1500.)
+    offset = np.abs(s - g) * 4.
+    t = np.asarray(ra.f.response(slowness))
+    np.testing.assert_allclose(t, offset / 1500., rtol=1e-10)
+
+    ra.f.createJacobian(slowness)
+    np.testing.assert_allclose(ra.f.jacobian() * slowness, t)
+
+if __name__ == '__main__':
+    testFastMarchHomogeneous()
+    testFastMarchTetrahedrons()
+    testRefractionFMM()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+from pygimli.physics.gravimetry.gravMagModelling import \
+    lineIntegralZ_WonBevis, lineIntegralZ_WonBevisVec, calcPolyGz, \
+    buildCircle, gradUCylinderHoriz, gradGZCylinderHoriz, grav, \
+    gravMagBoundarySinghGup, G, gradUSphere, GravMagModelling, rabs, gradR, \
+    adot, uSphere, gradGZSphere, BaZSphere, uCylinderHoriz, deltaMSph
+
+import numpy as np
+
+
+def createGridMesh(x, y, z=None):
+    mesh = pg.Mesh(2 if z is None else 3)
+    if z is None:
+        mesh.createGrid(pg.RVector(x), pg.RVector(y))
+    else:
+        mesh.createGrid(pg.RVector(x), pg.RVector(y), pg.RVector(z))
+
+    for b in mesh.boundaries():
+        outer = b.leftCell() is None or b.rightCell() is None
+        b.setMarker(1 if outer else 0)
+    return mesh
+
+
+def gravScalar(mesh, pnts, rho):
+    """The former station loop of grav with the scalar kernels."""
+    dg = np.zeros((len(pnts), 3))
+    dgz = np.zeros((len(pnts), 3))
+
+    for i, p in enumerate(pnts):
+        shift = pg.RVector3(p[0], p[1], p[2] if len(p) > 2 else 0.0)
+        mesh.translate(-shift)
+        for b in mesh.boundaries():
+            if b.marker() != 0:
+                if mesh.dimension() == 2:
+                    dgi, dgzi = lineIntegralZ_WonBevis(b.node(0).pos(),
+                                                       b.node(1).pos())
+                    dgi *= -2.0
+                    dgzi *= -2.0
+                else:
+                    dgi, dgzi = gravMagBoundarySinghGup(b)
+                dg[i] += dgi * -G * rho
+                dgz[i] += dgzi * -G * rho
+        mesh.translate(shift)
+
+    return dg * [1.0, 1.0, -1.0], dgz
+
+
+def testWonBevisVec():
+    rs = np.random.RandomState(0)
+    p1 = rs.randn(200, 2) * 5.
+    p2 = rs.randn(200, 2) * 5.
+
+    # touching the origin, collinear, vertical, crossing the negative x-axis
+    special = np.array([[[0., 0.], [1., 2.]], [[1., 2.], [0., 0.]],
+                        [[1., 1.], [2., 2.]], [[-2., -2.], [3., 3.]],
+                        [[1., -1.], [1. + 1e-5, 2.]], [[1., -1.], [1., 1.]],
+                        [[-3., -1.], [-2., 1.]], [[-3., 1.], [-2., -1.]],
+                        [[-1., 0.], [-2., 1.]], [[-1., 1.], [-2., 0.]]])
+    p1 = np.vstack([p1, special[:, 0]])
+    p2 = np.vstack([p2, special[:, 1]])
+
+    F, dF = lineIntegralZ_WonBevisVec(p1, p2)
+    for i in range(len(p1)):
+        Fi, dFi = lineIntegralZ_WonBevis(p1[i], p2[i])
+        np.testing.assert_allclose(F[i], Fi, rtol=1e-10, atol=1e-12)
+        np.testing.assert_allclose(dF[i], dFi, rtol=1e-10, atol=1e-12)
+
+
+def testPolyGzCylinder():
+    pnts = np.vstack([np.linspace(-20., 20., 9), np.zeros(9)]).T
+    R, rho, pos = 2., 1000., [1., -5.]
+
+    gz, gzz = calcPolyGz(pnts, buildCircle(pos, R, segments=720), rho)
+    np.testing.assert_allclose(gz[:, 2],
+                               gradUCylinderHoriz(pnts, R, rho, pos)[:, 1],
+                               rtol=1e-4)
+    np.testing.assert_allclose(gzz[:, [0, 2]],
+                               gradGZCylinderHoriz(pnts, R, rho, pos),
+                               rtol=1e-4, atol=1e-9)
+
+def testGrav():
+    pnts = np.vstack([np.linspace(-10., 10., 7), np.zeros(7)]).T
+    mesh = createGridMesh(np.linspace(-2., 2., 3), np.linspace(-6., -4., 3))
+    dg, dgz = grav(mesh, pnts, 1000.)
+    ref, refz = gravScalar(mesh, pnts, 1000.)
+    np.testing.assert_allclose(dg, ref, rtol=1e-10, atol=1e-14)
+    np.testing.assert_allclose(dgz, refz, rtol=1e-10, atol=1e-14)
+
+    pnts = np.vstack([np.linspace(-30., 30., 7), np.linspace(-5., 5., 7),
+                      np.zeros(7)]).T
+    mesh = createGridMesh(np.linspace(-1., 1., 3), np.linspace(-1., 1., 3),
+                          np.linspace(-12., -10., 3))
+    dg, dgz = grav(mesh, pnts, 1000.)
+    ref, refz = gravScalar(mesh, pnts, 1000.)
+    np.testing.assert_allclose(dg, ref, rtol=1e-10, atol=1e-14)
+    np.testing.assert_allclose(dgz, refz, rtol=1e-10, atol=1e-14)
+
+    # station chunks on a process pool
+    dg2, dgz2 = grav(mesh, pnts, 1000., chunkSize=2, nProcs=2)
+    np.testing.assert_allclose(dg2, dg)
+    np.testing.assert_allclose(dgz2, dgz)
+
+def testGravMagModelling():
+    import tempfile
+
+    # 2D: all cells of a grid give the response of its outline
+    pnts = np.vstack([np.linspace(-20., 20., 9), np.zeros(9)]).T
+    mesh = createGridMesh(np.linspace(-2., 2., 5), np.linspace(-6., -4., 3))
+    fop = GravMagModelling(mesh, pnts, cache=False)
+    rect = np.array([[-2., -6.], [2., -6.], [2., -4.], [-2., -4.]])
+    np.testing.assert_allclose(
+        fop.response(pg.RVector(mesh.cellCount(), 1000.)),
+        calcPolyGz(pnts, rect, 1000.)[0][:, 2], rtol=1e-10)
+
+    # 3D: a cube far from the stations acts like a sphere of the same mass
+    pnts = np.vstack([np.linspace(-30., 30., 7), np.linspace(-5., 5., 7),
+                      np.zeros(7)]).T
+    mesh = createGridMesh(np.linspace(-1., 1., 3), np.linspace(-1., 1., 3),
+                          np.linspace(-12., -10., 3))
+    R = (3. * 8. / (4. * np.pi))**(1. / 3.)
+    ana = gradUSphere(pnts, R, 1000., [0., 0., -11.])[:, 2]
+
+    cacheDir = tempfile.mkdtemp()
+    fop = GravMagModelling(mesh, pnts, cacheDir=cacheDir)
+    model = pg.RVector(mesh.cellCount(), 1000.)
+    np.testing.assert_allclose(fop.response(model), ana, rtol=1e-3)
+    np.testing.assert_allclose(fop.jacobian().mult(model),
+                               fop.response(model))
+
+    # the second operator loads the cached kernel
+    fop2 = GravMagModelling(mesh, pnts, cacheDir=cacheDir)
+    assert isinstance(fop2.kernel, np.memmap)
+    np.testing.assert_allclose(fop2.kernel, fop.kernel)
+
+def testArrayHelpers():
+    rs = np.random.RandomState(2)
+    r = rs.randn(10, 3)
+    M = rs.randn(3)
+
+    # the former row loops
+    np.testing.assert_allclose(rabs(r), [np.sqrt(x.dot(x)) for x in r])
+    np.testing.assert_allclose(gradR(r), r.T / rabs(r))
+    assert gradR(r).shape == (3, 10)
+    np.testing.assert_allclose(adot(M, r), [a.dot(M) for a in r])
+
+
+def testManyBodies():
+    pnts = np.vstack([np.linspace(-20., 20., 9), np.linspace(-3., 3., 9),
+                      np.zeros(9)]).T
+    pos = np.array([[0., 0., -5.], [4., -2., -8.], [-3., 1., -6.]])
+    R = np.array([1., 2., 1.5])
+    rho = np.array([500., -300., 1000.])
+    M = np.random.RandomState(3).randn(3, 3)
+
+    for fun in (uSphere, gradUSphere, gradGZSphere):
+        many = fun(pnts, R, rho, pos)
+        for i in range(len(pos)):
+            np.testing.assert_allclose(many[i], fun(pnts, R[i], rho[i],
+                                                    pos[i]))
+
+    many = BaZSphere(pnts, R, pos, M)
+    for i in range(len(pos)):
+        np.testing.assert_allclose(many[i], BaZSphere(pnts, R[i], pos[i],
+                                                      M[i]))
+
+    pnts2 = pnts[:, [0, 2]]
+    many = uCylinderHoriz(pnts2, R, rho, pos[:, [0, 2]])
+    for i in range(len(pos)):
+        np.testing.assert_allclose(many[i], uCylinderHoriz(
+            pnts2, R[i], rho[i], pos[i, [0, 2]]))
+
+
+def testGradGZ():
+    pnts = np.vstack([np.linspace(-20., 20., 9), np.linspace(-3., 3., 9),
+                      np.zeros(9)]).T
+    h = 1e-4
+
+    # g = -grad u, so grad gz is the negative derivative of gz
+    R, rho, pos = 2., 500., np.array([4., -2., -8.])
+    fd = np.zeros((len(pnts), 3))
+    for k in range(3):
+        d = np.zeros(3)
+        d[k] = h
+        fd[:, k] = (gradUSphere(pnts + d, R, rho, pos)[:, 2] -
+                    gradUSphere(pnts - d, R, rho, pos)[:, 2]) / (2. * h)
+    np.testing.assert_allclose(gradGZSphere(pnts, R, rho, pos), -fd,
+                               rtol=1e-5, atol=1e-12)
+
+    pnts2 = pnts[:, [0, 2]]
+    pos2 = np.array([3., -6.])
+    fd = np.zeros((len(pnts2), 2))
+    for k in range(2):
+        d = np.zeros(2)
+        d[k] = h
+        fd[:, k] = (gradUCylinderHoriz(pnts2 + d, R, rho, pos2)[:, 1] -
+                    gradUCylinderHoriz(pnts2 - d, R, rho, pos2)[:, 1]) / \
+            (2. * h)
+    np.testing.assert_allclose(gradGZCylinderHoriz(pnts2, R, rho, pos2), -fd,
+                               rtol=1e-5, atol=1e-12)
+
+    # the former formula for a sphere below the origin
+    pos = [0., 0., -8.]
+    t = pos[2]
+    old = (G * deltaMSph(R, rho) / rabs(pnts - pos)**5. *
+           np.asarray([-3.0 * t * pnts[:, 0], -3.0 * t * pnts[:, 1],
+                       2.0 * t * t - pnts[:, 0]**2 - pnts[:, 1]**2])).T
+    np.testing.assert_allclose(gradGZSphere(pnts, R, rho, pos), old)
+
+if __name__ == '__main__':
+    testWonBevisVec()
+    testPolyGzCylinder()
+    testGrav()
+    testGravMagModelling()
+    testArrayHelpers()
+    testManyBodies()
+    testGradGZ()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Import time report for 'import pygimli' (like python -X importtime).
+
+    Run as script to print the slowest imports or use testImportTime as
+    regression test that a plain 'import pygimli' does not pull in the
+    viewers, the physics modules or matplotlib.
+"""
+import sys
+import subprocess
+
+
+def importTimeReport(module='pygimli', nShow=20):
+    """
+    Return total import time [s] and the nShow slowest (cumulative) imports
+    as list of (seconds, module name), measured in a fresh interpreter.
+    """
+    p = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                          'import ' + module],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = p.communicate()
+    if p.returncode != 0:
+        raise Exception("import " + module + " failed:\n" + stderr.decode())
+
+    times = []
+    for line in stderr.decode().splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative) * 1e-6, name.strip()))
+
+    total = max([t for t, name in times if name == module] + [0.0])
+    times.sort(reverse=True)
+    return total, times[:nShow]
+
+
+def loadedModules(module='pygimli'):
+    """Names of all modules loaded by importing module in a fresh process."""
+    p = subprocess.Popen([sys.executable, '-c',
+                          'import sys; import ' + module +
+                          '; print(" ".join(sys.modules.keys()))'],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = p.communicate()
+    if p.returncode != 0:
+        raise Exception("import " + module + " failed:\n" + stderr.decode())
+    return stdout.decode().split()
+
+
+def testImportTime():
+    if sys.version_info < (3, 7):
+        return  # no lazy imports and no -X importtime
+
+    modules = loadedModules()
+    assert 'pygimli' in modules
+    for lazy in ['matplotlib', 'pygimli.viewer', 'pygimli.mplviewer',
+                 'pygimli.physics', 'pygimli.gui']:
+        assert lazy not in modules, lazy + " is imported by 'import pygimli'"
+
+
+if __name__ == '__main__':
+    total, slowest = importTimeReport()
+    print("import pygimli: %.3f s" % total)
+    for t, name in slowest:
+        print("%8.3f s  %s" % (t, name))
+    testImportTime()
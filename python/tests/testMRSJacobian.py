@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+from pygimli.physics.sNMR.mrs import MRS1dBlockQTModelling
+from pygimli.utils.base import gmat2numpy
+
+import numpy as np
+
+
+def createFOP(nlay=3):
+    rs = np.random.RandomState(1)
+    zvec = np.hstack([0., np.cumsum(np.linspace(0.5, 5., 40))])
+    t = np.linspace(0.01, 0.5, 30)
+    K = rs.randn(20, 40) + 1j * rs.randn(20, 40)
+    return MRS1dBlockQTModelling(nlay, K, zvec, t)
+
+
+def testLayerWeights():
+    fop = createFOP(3)
+    thk = np.array([7.3, 12.1])
+    W, dW = fop.layerWeights(thk)
+    assert W.shape == (40, 3) and dW.shape == (2, 40, 3)
+
+    # dW is with respect to the boundary depths, a thickness moves all
+    # deeper boundaries as well
+    h = 1e-6
+    for k in range(len(thk)):
+        d = thk.copy()
+        d[k] += h
+        Wd = fop.layerWeights(d)[0]
+        np.testing.assert_allclose((Wd - W) / h, dW[k:].sum(axis=0),
+                                   atol=1e-4)
+
+
+def testJacobian():
+    for nlay in (2, 3, 4):
+        fop = createFOP(nlay)
+        rs = np.random.RandomState(nlay)
+        par = np.hstack([rs.rand(nlay - 1) * 15. + 2.,
+                         rs.rand(nlay) * 0.3 + 0.01,
+                         rs.rand(nlay) * 0.3 + 0.05])
+
+        r0 = np.asarray(fop.response(par))
+        fop.createJacobian(par)
+        J = gmat2numpy(fop.jacobian())
+
+        Jfd = np.zeros_like(J)
+        for k in range(len(par)):
+            d = par.copy()
+            h = 1e-7 * par[k]
+            d[k] += h
+            Jfd[:, k] = (np.asarray(fop.response(d)) - r0) / h
+
+        assert np.abs(J - Jfd).max() < 1e-4 * np.abs(Jfd).max()
+
+if __name__ == '__main__':
+    testLayerWeights()
+    testJacobian()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+from pygimli.meshtools import mergeMeshes, weldNodes
+
+import numpy as np
+
+
+def testWeldNodes():
+    pos = np.array([[0., 0., 0.], [1., 0., 0.], [1. + 1e-8, 0., 0.],
+                    [0., 1e-7, 0.], [2., 0., 0.]])
+    ids, first = weldNodes(pos, tol=1e-6)
+
+    np.testing.assert_equal(ids, [0, 1, 1, 0, 2])
+    np.testing.assert_equal(first, [0, 1, 4])
+
+
+def testMergeMeshes():
+    meshes = []
+    for i in range(3):
+        m = pg.createGrid(x=np.linspace(i, i + 1, 5), y=np.linspace(0, 1, 4))
+        m.setCellMarker(pg.RVector(m.cellCount(), i + 1))
+        m.setCellAttributes(pg.RVector(m.cellCount(), 10. * i))
+        m.addExportData('d', pg.RVector(m.cellCount(), float(i)))
+        meshes.append(m)
+
+    mesh = mergeMeshes(meshes)
+
+    assert mesh.nodeCount() == 13 * 4
+    assert mesh.cellCount() == 3 * 12
+    np.testing.assert_equal(np.asarray(mesh.cellMarker()),
+                            np.repeat([1, 2, 3], 12))
+    np.testing.assert_allclose(np.asarray(mesh.cellAttributes()),
+                               np.repeat([0., 10., 20.], 12))
+    np.testing.assert_allclose(np.asarray(mesh.exportData('d')),
+                               np.repeat([0., 1., 2.], 12))
+
+    # inner boundaries between the meshes exist only once
+    assert mesh.boundaryCount() == 12 * 4 + 3 * 13
+
+if __name__ == '__main__':
+    testWeldNodes()
+    testMergeMeshes()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+from pygimli.meshtools import meshAdjacency, createMeshFromArrays
+
+import numpy as np
+
+
+def _checkTopology(mesh, adj):
+    for n in mesh.nodes():
+        ref = sorted(m.id() for m in pg.commonNodes(n.cellSet())
+                     if m.id() != n.id())
+        assert list(adj.nodeNeighbours(n.id())) == ref
+        assert sorted(adj.nodeCellIds(n.id())) == \
+            sorted(c.id() for c in n.cellSet())
+
+    assert len(adj.boundaryLeft) == mesh.boundaryCount()
+    for b in mesh.boundaries():
+        l, r = adj.leftRight(adj.findBoundary(*b.ids()))
+        assert l == (b.leftCell().id() if b.leftCell() else -1)
+        assert r == (b.rightCell().id() if b.rightCell() else -1)
+
+
+def testAdjacency():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 1., 11)),
+                    pg.RVector(np.linspace(0., 1., 6)))
+    # refined quads lack the new inner edges until createNeighbourInfos
+    mesh = mesh.createH2()
+    adj = meshAdjacency(mesh)
+    _checkTopology(mesh, adj)
+
+    # no walking search for quadrangles
+    assert not adj.isSimplex()
+    try:
+        adj.findCell([0.5, 0.5])
+        assert False, "findCell needs a simplex mesh"
+    except Exception as e:
+        assert 'triangles' in str(e)
+
+    assert meshAdjacency(mesh) is adj
+    mesh.translate(pg.RVector3(1.0, 0.0))
+    assert meshAdjacency(mesh) is not adj
+
+
+def testAdjacencyFindCell():
+    x, y = np.meshgrid(np.linspace(0., 1., 11), np.linspace(0., 1., 6))
+    nodes = np.vstack([x.ravel(), y.ravel()]).T
+    cells = []
+    for j in range(5):
+        for i in range(10):
+            a = j * 11 + i
+            cells += [[a, a + 1, a + 12], [a, a + 12, a + 11]]
+    # triangles without boundaries
+    mesh = createMeshFromArrays(nodes, cells)
+    adj = meshAdjacency(mesh)
+    _checkTopology(mesh, adj)
+    assert adj.isSimplex()
+
+    c = None
+    for p in np.random.RandomState(1234).rand(50, 2):
+        c = adj.findCell(p, start=c)
+        assert c == mesh.findCell(pg.RVector3(p[0], p[1])).id()
+
+    assert adj.findCell([2.0, 0.5]) == -1
+
+if __name__ == '__main__':
+    testAdjacency()
+    testAdjacencyFindCell()
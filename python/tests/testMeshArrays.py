@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+from pygimli.meshtools import createMeshFromArrays, meshToArrays
+
+import numpy as np
+
+
+def testMeshArrays():
+    nodes = [[0., 0.], [1., 0.], [1., 1.], [0., 1.]]
+    cells = [[0, 1, 2], [0, 2, 3]]
+    mesh = createMeshFromArrays(nodes, cells, cellMarkers=[1, 2],
+                                boundaries=[[0, 1]], boundaryMarkers=[-1],
+                                nodeMarkers=[-99, 0, 0, 0])
+
+    assert mesh.dimension() == 2
+    assert mesh.nodeCount() == 4
+    assert mesh.cellCount() == 2
+    assert mesh.boundaryCount() == 5
+    assert list(mesh.cellMarker()) == [1, 2]
+    assert mesh.node(0).marker() == -99
+
+    arr = meshToArrays(mesh)
+    np.testing.assert_allclose(arr['nodes'][:, :2], nodes)
+    np.testing.assert_equal(arr['cells'], cells)
+    np.testing.assert_allclose(mesh.cellCenterArray()[0], [2. / 3, 1. / 3, 0.])
+    assert sorted(arr['boundaryMarkers']) == [-1, 0, 0, 0, 0]
+
+    copy = createMeshFromArrays(**arr)
+    np.testing.assert_equal(meshToArrays(copy)['cells'], arr['cells'])
+    np.testing.assert_equal(meshToArrays(copy)['boundaryMarkers'],
+                            arr['boundaryMarkers'])
+
+
+def testMeshArraysInvalidIds():
+    nodes = [[0., 0.], [1., 0.], [1., 1.], [0., 1.]]
+    for cells, bounds in [([[0, 1, 4]], None), ([[0, 1, -2]], None),
+                          ([[0, 1, 2**32 + 1]], None),
+                          ([[0, 1, 2]], [[0, 7]])]:
+        try:
+            createMeshFromArrays(nodes, cells, boundaries=bounds)
+        except IndexError:
+            pass
+        else:
+            assert False, "invalid node id was not detected"
+
+    # -1 pads cells with fewer nodes
+    mesh = createMeshFromArrays(nodes, [[0, 1, 2, -1], [0, 1, 2, 3]])
+    assert mesh.cellCount() == 2
+    assert mesh.cell(0).nodeCount() == 3
+
+if __name__ == '__main__':
+    testMeshArrays()
+    testMeshArraysInvalidIds()
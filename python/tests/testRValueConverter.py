@@ -93,6 +93,94 @@ def testSlices():
     print(a[3:0:-2])
     print(pg.norm(a[0:3:1]))
     
+def testNumpyView():
+    a = pg.RVector(10, 1.1)
+    x = np.asarray(a)
+    x[2] = 3.3
+    assert a[2] == 3.3
+    del a
+    gc.collect()
+    # the view keeps the vector alive
+    assert x[2] == 3.3
+
+    # copies (np.array, NumPy >= 2 copy=True) are independent of the vector
+    a = pg.RVector(10, 1.1)
+    for y in (np.array(a), a.__array__(copy=True),
+              a.__array__(dtype=np.float32, copy=True)):
+        y[0] = 5.0
+        assert a[0] == 1.1
+    assert a.__array__(copy=None).base is not None
+
+    c = pg.CVector(4, 1.0 + 2j)
+    assert np.asarray(c).dtype == complex
+    assert np.allclose(np.asarray(c), 1.0 + 2j)
+
+def testFancyIndexing():
+    x = np.arange(10.)
+    a = pg.RVector(x)
+    assert np.allclose(a[1:9:3], x[1:9:3])
+    assert np.allclose(a[::-1], x[::-1])
+    assert np.allclose(a[[0, 5, 7]], x[[0, 5, 7]])
+    assert np.allclose(a[np.array([1, 2])], x[np.array([1, 2])])
+    assert np.allclose(a[x > 4.5], x[x > 4.5])
+    assert a[-2] == x[-2]
+
+    a[[0, 1]] = 5.0
+    a[x > 7.5] = [1.0, 2.0]
+    assert np.allclose(a[[0, 1, 8, 9]], [5.0, 5.0, 1.0, 2.0])
+
+def testMatrixSlices():
+    x = np.arange(20.).reshape(4, 5)
+    from pygimli.utils import gmat2numpy, numpy2gmat
+    A = numpy2gmat(x)
+    assert np.allclose(np.asarray(A), x)
+    assert np.allclose(gmat2numpy(A), x)
+    assert np.allclose(A[:, 2], x[:, 2])
+    assert np.allclose(A[1:3], x[1:3])
+    assert np.allclose(A[::2, 1::2], x[::2, 1::2])
+    # index arrays for rows and columns select the block
+    assert np.allclose(A[[0, 3], [1, 2, 4]], x[[0, 3]][:, [1, 2, 4]])
+    assert A[-1, -1] == x[-1, -1]
+
+    A[1:3, 0:2] = [[-1., -2.], [-3., -4.]]
+    A[:, 4] = np.ones(4)
+    x[1:3, 0:2] = [[-1., -2.], [-3., -4.]]
+    x[:, 4] = 1.0
+    assert np.allclose(np.asarray(A), x)
+
+def testMatrixSubArrayErrors():
+    import sys
+    from pygimli.utils import numpy2gmat
+    x = np.arange(20.).reshape(4, 5)
+    A = numpy2gmat(x)
+    rows = np.array([0, 3], dtype=np.intp)
+    cols = np.array([1, 5], dtype=np.intp)
+
+    # out of range indices raise and release the converted index arrays
+    for r, c in [(rows, cols), (np.array([0, 4], dtype=np.intp), rows),
+                 (np.array([-1], dtype=np.intp), rows), (rows, 'a')]:
+        for call in (lambda: A.subArray(r, c),
+                     lambda: A.setSubArray(r, c, np.zeros((len(r), 2)))):
+            nRef = sys.getrefcount(r), sys.getrefcount(c)
+            try:
+                call()
+            except (IndexError, ValueError):
+                pass
+            else:
+                assert False, "invalid index was not detected"
+            assert (sys.getrefcount(r), sys.getrefcount(c)) == nRef
+
+    # wrong value shape
+    nRef = sys.getrefcount(rows)
+    try:
+        A.setSubArray(rows, rows, np.zeros((3, 2)))
+    except ValueError:
+        pass
+    else:
+        assert False, "wrong value shape was not detected"
+
+    assert sys.getrefcount(rows) == nRef
+    assert np.allclose(np.asarray(A), x)
 
 #p = g.RVector3(x)
 #print p
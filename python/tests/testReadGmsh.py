@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import struct
+import tempfile
+
+import pygimli as pg
+from pygimli.meshtools import readGmsh, readGmshArrays
+
+import numpy as np
+
+MSH2 = """$MeshFormat
+2.2 0 8
+$EndMeshFormat
+$Nodes
+4
+1 0 0 0
+2 1 0 0
+3 1 1 0
+4 0 1 0
+$EndNodes
+$Elements
+6
+1 15 2 99 1 1
+2 1 2 1 1 1 2
+3 1 2 10001 2 2 3
+4 1 2 2 3 3 4
+5 2 2 2 1 1 2 3
+6 2 2 2 1 1 3 4
+$EndElements
+"""
+
+MSH41 = """$MeshFormat
+4.1 0 8
+$EndMeshFormat
+$Entities
+1 3 1 0
+1 0 0 0 1 99
+1 0 0 0 1 0 0 1 1 0
+2 1 0 0 1 1 0 1 10001 0
+3 0 1 0 1 1 0 1 2 0
+1 0 0 0 1 1 0 1 2 0
+$EndEntities
+$Nodes
+1 4 1 4
+2 1 0 4
+1
+2
+3
+4
+0 0 0
+1 0 0
+1 1 0
+0 1 0
+$EndNodes
+$Elements
+5 6 1 6
+0 1 15 1
+1 1
+1 1 1 1
+2 1 2
+1 2 1 1
+3 2 3
+1 3 1 1
+4 3 4
+2 1 2 2
+5 1 2 3
+6 1 3 4
+$EndElements
+"""
+
+POS = [(0., 0., 0.), (1., 0., 0.), (1., 1., 0.), (0., 1., 0.)]
+
+
+def binaryMSH2(endian='<'):
+    """The mesh of MSH2 in binary MSH 2.2 encoding."""
+    def pack(fmt, *args):
+        return struct.pack(endian + fmt, *args)
+
+    nodes = b''.join(pack('iddd', i + 1, *p) for i, p in enumerate(POS))
+    # header: element type, number of elements, number of tags
+    elements = pack('3i', 15, 1, 2) + pack('4i', 1, 99, 1, 1)
+    elements += pack('3i', 1, 3, 2)
+    for num, phys, n in [(2, 1, (1, 2)), (3, 10001, (2, 3)), (4, 2, (3, 4))]:
+        elements += pack('5i', num, phys, num, *n)
+    elements += pack('3i', 2, 2, 2)
+    for num, n in [(5, (1, 2, 3)), (6, (1, 3, 4))]:
+        elements += pack('6i', num, 2, 1, *n)
+
+    return (b'$MeshFormat\n2.2 1 8\n' + pack('i', 1) +
+            b'\n$EndMeshFormat\n$Nodes\n4\n' + nodes +
+            b'\n$EndNodes\n$Elements\n6\n' + elements +
+            b'\n$EndElements\n')
+
+
+def binaryMSH41(endian='<'):
+    """The mesh of MSH41 in binary MSH 4.1 encoding."""
+    def pack(fmt, *args):
+        return struct.pack(endian + fmt, *args)
+
+    # point with a position, curves and surface with a bounding box
+    entities = pack('4Q', 1, 3, 1, 0)
+    entities += pack('i3dQi', 1, 0., 0., 0., 1, 99)
+    for tag, phys, box in [(1, 1, (0, 0, 0, 1, 0, 0)),
+                           (2, 10001, (1, 0, 0, 1, 1, 0)),
+                           (3, 2, (0, 1, 0, 1, 1, 0))]:
+        entities += pack('i6dQiQ', tag, *(box + (1, phys, 0)))
+    entities += pack('i6dQiQ', 1, 0, 0, 0, 1, 1, 0, 1, 2, 0)
+
+    nodes = pack('4Q', 1, 4, 1, 4) + pack('3iQ', 2, 1, 0, 4)
+    nodes += pack('4Q', 1, 2, 3, 4)
+    nodes += b''.join(pack('3d', *p) for p in POS)
+
+    elements = pack('4Q', 5, 6, 1, 6)
+    elements += pack('3iQ', 0, 1, 15, 1) + pack('2Q', 1, 1)
+    for tag, num, n in [(1, 2, (1, 2)), (2, 3, (2, 3)), (3, 4, (3, 4))]:
+        elements += pack('3iQ', 1, tag, 1, 1) + pack('3Q', num, *n)
+    elements += pack('3iQ', 2, 1, 2, 2)
+    elements += pack('8Q', 5, 1, 2, 3, 6, 1, 3, 4)
+
+    return (b'$MeshFormat\n4.1 1 8\n' + pack('i', 1) +
+            b'\n$EndMeshFormat\n$Entities\n' + entities +
+            b'\n$EndEntities\n$Nodes\n' + nodes +
+            b'\n$EndNodes\n$Elements\n' + elements +
+            b'\n$EndElements\n')
+
+
+def _read(content, reader=readGmsh):
+    fd, fname = tempfile.mkstemp(suffix='.msh')
+    with os.fdopen(fd, 'wb') as fi:
+        fi.write(content if isinstance(content, bytes) else content.encode())
+    try:
+        return reader(fname)
+    finally:
+        os.remove(fname)
+
+
+def testReadGmsh():
+    for content in (MSH2, MSH41, binaryMSH2(), binaryMSH2('>'),
+                    binaryMSH41(), binaryMSH41('>')):
+        mesh = _read(content)
+        assert mesh.nodeCount() == 4
+        assert mesh.cellCount() == 2
+        assert list(mesh.cellMarker()) == [2, 2]
+        assert mesh.node(0).marker() == -99
+
+        markers = dict()
+        for b in mesh.boundaries():
+            markers[tuple(sorted(b.ids()))] = b.marker()
+
+        assert markers[(0, 1)] == pg.MARKER_BOUND_HOMOGEN_NEUMANN
+        assert markers[(1, 2)] == -10001
+        assert markers[(2, 3)] == pg.MARKER_BOUND_MIXED
+        np.testing.assert_allclose(mesh.node(2).pos()[1], 1.0)
+
+
+def testReadGmshArrays():
+    for content in (MSH2, MSH41, binaryMSH2(), binaryMSH41()):
+        nodes, elements = _read(content, readGmshArrays)
+        np.testing.assert_allclose(nodes, POS)
+        np.testing.assert_equal(elements[15][0], [[0]])
+        np.testing.assert_equal(elements[15][1], [99])
+        np.testing.assert_equal(elements[1][0], [[0, 1], [1, 2], [2, 3]])
+        np.testing.assert_equal(elements[1][1], [1, 10001, 2])
+        np.testing.assert_equal(elements[2][0], [[0, 1, 2], [0, 2, 3]])
+        np.testing.assert_equal(elements[2][1], [2, 2])
+
+
+def testReadGmshUnknownNode():
+    # the last triangle refers to a node tag that does not exist
+    for tag in ('7', '0'):
+        content = MSH2.replace('6 2 2 2 1 1 3 4', '6 2 2 2 1 1 3 ' + tag)
+        try:
+            _read(content, readGmshArrays)
+        except Exception as e:
+            assert 'unknown node tag ' + tag in str(e)
+        else:
+            assert False, "unknown node tag was not detected"
+
+if __name__ == '__main__':
+    testReadGmsh()
+    testReadGmshArrays()
+    testReadGmshUnknownNode()
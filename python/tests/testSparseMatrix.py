@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pygimli as pg
+import pygimli.solver as solver
+from pygimli.utils import sparseMatrix2csr, sparseMatrix2coo, toSparseMatrix
+from pygimli.utils import toSparseMapMatrix
+
+import numpy as np
+
+
+def testScipyRoundTrip():
+    from scipy.sparse import random as sprandom
+
+    n = 20
+    S = sprandom(n, n, density=0.2, format='csr') + \
+        sprandom(n, n, density=0.2, format='csr').T
+    A = toSparseMatrix(S)
+
+    x = np.random.rand(n)
+    assert np.allclose(A * pg.RVector(x), S.dot(x))
+    assert np.allclose(sparseMatrix2csr(A).toarray(), S.toarray())
+    assert np.allclose(sparseMatrix2coo(A).toarray(), S.toarray())
+
+    # exported values are views into the pygimli matrix
+    csr = sparseMatrix2csr(A)
+    csr.data *= 2.0
+    assert np.allclose(A * pg.RVector(x), 2.0 * S.dot(x))
+
+
+def testToSparseMapMatrix():
+    from scipy.sparse import random as sprandom
+
+    S = sprandom(30, 12, density=0.2, format='csr')
+    A = toSparseMapMatrix(S)
+    assert A.rows() == 30 and A.cols() == 12
+
+    x = np.random.rand(12)
+    assert np.allclose(A * pg.RVector(x), S.dot(x))
+
+    # refill an existing matrix
+    B = pg.RSparseMapMatrix(2, 2)
+    assert toSparseMapMatrix(S.T, B) is B
+    assert B.rows() == 12 and B.cols() == 30
+    assert np.allclose(B * pg.RVector(np.ones(30)), S.T.dot(np.ones(30)))
+
+
+def testSetArrayDataInvalid():
+    A = pg.RSparseMatrix()
+    A.setArrayData(np.array([0, 1, 3], dtype=np.int32),
+                   np.array([0, 0, 1], dtype=np.int32),
+                   np.array([1., 2., 3.]), 0)
+    x = pg.RVector([1., 1.])
+    assert np.allclose(A * x, [3., 3.])
+
+    # empty colPtr, colPtr[0] != 0, colPtr[-1] != nVals, not monotone colPtr
+    # and row indices out of range
+    for colPtr, rowIdx in (([], []),
+                           ([1, 1, 3], [0, 0, 1]),
+                           ([0, 1, 2], [0, 0, 1]),
+                           ([0, 2, 1, 3], [0, 0, 1]),
+                           ([0, 1, 3], [0, 0, 2]),
+                           ([0, 1, 3], [0, -1, 1])):
+        try:
+            A.setArrayData(np.array(colPtr, dtype=np.int32),
+                           np.array(rowIdx, dtype=np.int32),
+                           np.ones(len(rowIdx)), 0)
+            assert False, "invalid arrays accepted: " + str(colPtr)
+        except ValueError:
+            pass
+
+        # the matrix is left unchanged
+        assert np.allclose(A * x, [3., 3.])
+
+
+def testToeplitz():
+    A = solver.triDiagToeplitz(10, 2.0, -1.0, -0.5, start=1, end=9)
+    B = np.zeros((10, 10))
+    for i in range(1, 9):
+        B[i, i] = 2.0
+        if i > 1:
+            B[i, i - 1] = -1.0
+        if i < 8:
+            B[i, i + 1] = -0.5
+
+    assert np.allclose(sparseMatrix2csr(A).toarray(), B)
+    assert np.allclose(sparseMatrix2csr(solver.identity(5)).toarray(),
+                       np.eye(5))
+
+if __name__ == '__main__':
+    testScipyRoundTrip()
+    testToSparseMapMatrix()
+    testSetArrayDataInvalid()
+    testToeplitz()
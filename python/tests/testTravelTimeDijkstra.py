@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pygimli as pg
+from pygimli.physics.traveltime.dijkstraModelling import \
+    TravelTimeDijkstraParallelModelling
+
+import numpy as np
+
+
+def testParallelDijkstra():
+    mesh = pg.Mesh(2)
+    mesh.createGrid(pg.RVector(np.linspace(0., 20., 21)),
+                    pg.RVector(np.linspace(-10., 0., 11)))
+    mesh = mesh.createH2()
+    for c in mesh.cells():
+        c.setMarker(c.id())
+
+    data = pg.DataContainer()
+    data.registerSensorIndex('s')
+    data.registerSensorIndex('g')
+    for x in np.arange(0., 21., 2.):
+        data.createSensor(pg.RVector3(x, 0.0))
+    nS = data.sensorCount()
+    s, g = np.meshgrid(np.arange(nS), np.arange(nS))
+    s, g = s[s != g], g[s != g]
+    data.resize(len(s))
+    data.set('s', pg.RVector(s.astype(float)))
+    data.set('g', pg.RVector(g.astype(float)))
+    data.set('t', pg.RVector(len(s), 1.0))
+
+    slowness = pg.RVector(1.0 / np.linspace(500., 2000., mesh.cellCount()))
+
+    ref = pg.TravelTimeDijkstraModelling(mesh, data)
+    fop = TravelTimeDijkstraParallelModelling(mesh, data, nProcs=2)
+
+    t = np.asarray(fop.response(slowness))
+    np.testing.assert_allclose(t, ref.response(slowness))
+
+    # the shots ran in two worker processes, i.e., concurrently and not
+    # serialized by the GIL of this process
+    pids = set(st[0] for st in fop.workerStats)
+    assert len(pids) == 2 and os.getpid() not in pids
+    assert sum(st[1] for st in fop.workerStats) == nS
+
+    ref.createJacobian(slowness)
+    fop.createJacobian(slowness)
+    np.testing.assert_allclose(fop.jacobian() * slowness,
+                               ref.jacobian() * slowness)
+
+    # rescaled models reuse the shortest paths
+    np.testing.assert_allclose(fop.response(slowness * 2.0), t * 2.0)
+    assert fop.graphCount == 1
+
+if __name__ == '__main__':
+    testParallelDijkstra()
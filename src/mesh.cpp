@@ -304,6 +304,75 @@ Cell * Mesh::createTetrahedron(Node & n1, Node & n2, Node & n3, Node & n4, int m
     return createCell_< Tetrahedron >(nodes, marker, cellCount());
 }
 
+void Mesh::createNodes(const RVector & x, const RVector & y, const RVector & z,
+                       const IVector & markers){
+    if (y.size() != x.size() || z.size() != x.size() ||
+        (markers.size() && markers.size() != x.size())){
+        throwLengthError(1, WHERE_AM_I + " sizes differ: " + str(x.size()) + " "
+                         + str(y.size()) + " " + str(z.size()) + " " + str(markers.size()));
+    }
+    nodeVector_.reserve(nodeVector_.size() + x.size());
+    for (Index i = 0; i < x.size(); i ++){
+        createNode_(RVector3(x[i], y[i], z[i]),
+                    markers.size() ? markers[i] : 0, -1);
+    }
+}
+
+void Mesh::createCells(const IndexArray & nodeIds, Index nodesPerCell,
+                       const IVector & markers){
+    if (nodesPerCell == 0) return;
+    Index nCells = nodeIds.size() / nodesPerCell;
+    if (markers.size() && markers.size() != nCells){
+        throwLengthError(1, WHERE_AM_I + " sizes differ: " + str(nCells) + " "
+                         + str(markers.size()));
+    }
+    cellVector_.reserve(cellVector_.size() + nCells);
+    // check all ids first, node(id) exits for invalid ids
+    for (Index i = 0; i < nCells * nodesPerCell; i ++){
+        if (nodeIds[i] != Index(-1) && nodeIds[i] >= nodeCount()){
+            throwRangeError(1, WHERE_AM_I + " invalid node id", nodeIds[i],
+                            0, nodeCount());
+        }
+    }
+    std::vector < Node * > nodes;
+    nodes.reserve(nodesPerCell);
+    for (Index i = 0; i < nCells; i ++){
+        nodes.clear();
+        for (Index j = 0; j < nodesPerCell; j ++){
+            Index id = nodeIds[i * nodesPerCell + j];
+            if (id != Index(-1)) nodes.push_back(&node(id));
+        }
+        createCell(nodes, markers.size() ? markers[i] : 0);
+    }
+}
+
+void Mesh::createBoundaries(const IndexArray & nodeIds, Index nodesPerBoundary,
+                            const IVector & markers){
+    if (nodesPerBoundary == 0) return;
+    Index nBounds = nodeIds.size() / nodesPerBoundary;
+    if (markers.size() && markers.size() != nBounds){
+        throwLengthError(1, WHERE_AM_I + " sizes differ: " + str(nBounds) + " "
+                         + str(markers.size()));
+    }
+    // check all ids first, node(id) exits for invalid ids
+    for (Index i = 0; i < nBounds * nodesPerBoundary; i ++){
+        if (nodeIds[i] != Index(-1) && nodeIds[i] >= nodeCount()){
+            throwRangeError(1, WHERE_AM_I + " invalid node id", nodeIds[i],
+                            0, nodeCount());
+        }
+    }
+    std::vector < Node * > nodes;
+    nodes.reserve(nodesPerBoundary);
+    for (Index i = 0; i < nBounds; i ++){
+        nodes.clear();
+        for (Index j = 0; j < nodesPerBoundary; j ++){
+            Index id = nodeIds[i * nodesPerBoundary + j];
+            if (id != Index(-1)) nodes.push_back(&node(id));
+        }
+        createBoundary(nodes, markers.size() ? markers[i] : 0);
+    }
+}
+
 Cell * Mesh::copyCell(const Cell & cell){
     std::vector < Node * > nodes(cell.nodeCount());
     for (uint i = 0; i < nodes.size(); i ++) {
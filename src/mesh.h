@@ -197,6 +197,25 @@ public:
     Cell * createQuadrangle(Node & n1, Node & n2, Node & n3, Node & n4, int marker = 0);
     Cell * createTetrahedron(Node & n1, Node & n2, Node & n3, Node & n4, int marker = 0);
 
+    /*! Create nodes for the coordinates x, y, z at once. An empty marker
+     * vector creates all nodes with marker 0.*/
+    void createNodes(const RVector & x, const RVector & y, const RVector & z,
+                     const IVector & markers);
+
+    /*! Create cells from a flat array of node ids with nodesPerCell ids for
+     * each cell, see \ref createCell for the cell types. Node ids of
+     * Index(-1) (-1 from python) are skipped, so cells with fewer nodes can
+     * be padded. An empty marker vector creates all cells with marker 0.*/
+    void createCells(const IndexArray & nodeIds, Index nodesPerCell,
+                     const IVector & markers);
+
+    /*! Create boundaries from a flat array of node ids with
+     * nodesPerBoundary ids for each boundary, like \ref createCells.
+     * Already existing boundaries, e.g., from \ref createNeighbourInfos,
+     * are reused and only get the marker if it is not 0.*/
+    void createBoundaries(const IndexArray & nodeIds, Index nodesPerBoundary,
+                          const IVector & markers);
+
     /*! Create a cell as a copy of a cell from an alternative mesh. Each Node of cell will be created with check. */
     Cell * copyCell(const Cell & cell);
     /*! Create a boundary as a copy of a boundary from an alternative mesh. Each Node of cell will be created with check. */
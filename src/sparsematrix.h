@@ -642,6 +642,43 @@ public:
     /*! Destructor */
     virtual ~SparseMatrix(){ }
 
+    /*! Set the compressed arrays at once, e.g., from the (indptr, indices, data)
+     * arrays of a scipy.sparse.csr_matrix. The matrix is square with
+     * colPtr.size() - 1 rows. Throws if colPtr does not start with 0, is not
+     * monotone or does not end with the number of values, or if a row index is
+     * out of range. */
+    void setArrays(const std::vector < int > & colPtr,
+                   const std::vector < int > & rowIdx,
+                   const Vector < ValueType > & vals, int stype=0){
+        if (colPtr.size() < 1 || colPtr[0] != 0 ||
+            colPtr.back() != (int)rowIdx.size() ||
+            rowIdx.size() != vals.size()){
+            throwLengthError(EXIT_SPARSE_SIZE, WHERE_AM_I +
+                             " colPtr needs to start with 0 and end with nVals = " +
+                             toStr(rowIdx.size()) + " == vals.size() = " +
+                             toStr(vals.size()));
+        }
+        int dim = (int)colPtr.size() - 1;
+        for (int i = 0; i < dim; i ++){
+            if (colPtr[i] > colPtr[i + 1]){
+                throwLengthError(EXIT_SPARSE_SIZE, WHERE_AM_I +
+                                 " colPtr is not monotone at " + toStr(i));
+            }
+        }
+        for (Index i = 0; i < rowIdx.size(); i ++){
+            if (rowIdx[i] < 0 || rowIdx[i] >= dim){
+                throwLengthError(EXIT_SPARSE_SIZE, WHERE_AM_I +
+                                 " row index " + toStr(rowIdx[i]) +
+                                 " out of range 0.." + toStr(dim));
+            }
+        }
+        colPtr_ = colPtr;
+        rowIdx_ = rowIdx;
+        vals_   = vals;
+        stype_  = stype;
+        valid_  = true;
+    }
+
     /*! Copy assignment operator. */
     SparseMatrix < ValueType > & operator = (const SparseMatrix < ValueType > & S){
         if (this != &S){